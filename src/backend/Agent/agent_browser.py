@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import time
+# LeasedBrowserContext overrides browser_use internals, so requirement.txt pins
+# the 0.1.40 release they were written against (0.2+ is a different API)
+from browser_use import Agent, Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from Agent.browser_pool import BROWSER_HEADLESS
+from metrics import AGENT_RUNS, AGENT_STEP_SECONDS, current_trace
+
+# steps and seconds a fallback agent may use per search type before it is stopped
+AGENT_MAX_STEPS = {
+    "flight": int(os.getenv("FLIGHT_AGENT_MAX_STEPS", 25)),
+    "hotel": int(os.getenv("HOTEL_AGENT_MAX_STEPS", 20)),
+    "restaurant": int(os.getenv("RESTAURANT_AGENT_MAX_STEPS", 25)),
+}
+AGENT_TIME_BUDGET = {
+    "flight": int(os.getenv("FLIGHT_AGENT_TIME_BUDGET", 300)),
+    "hotel": int(os.getenv("HOTEL_AGENT_TIME_BUDGET", 240)),
+    "restaurant": int(os.getenv("RESTAURANT_AGENT_TIME_BUDGET", 300)),
+}
+# failed steps in a row after which the agent gives up, as browser_use's own run() does
+AGENT_MAX_FAILURES = int(os.getenv("AGENT_MAX_FAILURES", 3))
+
+
+class AgentStoppedError(Exception):
+    """The agent used its step or time budget, or failed, without producing a result."""
+
+
+class LeasedBrowserContext(BrowserContext):
+    """A browser_use context over the Playwright context of a BrowserLease.
+
+    browser_use starts on the first page already open in the context, so
+    the agent continues on the page the previous stage loaded instead of
+    opening a new browser and loading it again. Closing is left to the
+    lease.
+    """
+
+    def __init__(self, browser, lease):
+        super().__init__(browser=browser, config=BrowserContextConfig())
+        self.lease = lease
+
+    async def _create_context(self, browser):
+        return self.lease.context
+
+    async def close(self):
+        self.session = None
+
+
+def find_json(text):
+    """Every JSON object or array embedded in `text`, e.g. inside a markdown code block."""
+    found = []
+    decoder = json.JSONDecoder()
+    position = 0
+    text = str(text or "")
+    while position < len(text):
+        starts = [i for i in (text.find("{", position), text.find("[", position)) if i != -1]
+        if not starts:
+            break
+        start = min(starts)
+        try:
+            value, end = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            position = start + 1
+            continue
+        found.append(value)
+        position = end
+    return found
+
+
+def has_fields(record, *fields):
+    """Whether `record` is a dict with a non-empty value under a key containing each of `fields`."""
+    if not isinstance(record, dict):
+        return False
+    return all(
+        any(field in str(key).lower() and value not in (None, "", [], {}) for key, value in record.items())
+        for field in fields
+    )
+
+
+def _history(agent):
+    # browser_use moved the history into agent.state in later 0.1 releases
+    state = getattr(agent, "state", None)
+    return state.history if state is not None and hasattr(state, "history") else agent.history
+
+
+def _consecutive_failures(agent):
+    return getattr(getattr(agent, "state", agent), "consecutive_failures", 0)
+
+
+def _complete_result(history, is_complete):
+    """The newest content the agent extracted that `is_complete` accepts, or None."""
+    if is_complete is None:
+        return None
+    for content in reversed(history.extracted_content()):
+        if content and is_complete(content):
+            return content
+    return None
+
+
+async def run_agent_on_lease(task, llm, lease, search_type, is_complete=None):
+    """Run a browser_use Agent for `task` on the pages of `lease` and return its final result.
+
+    The agent is driven one step at a time, within AGENT_MAX_STEPS and
+    AGENT_TIME_BUDGET for `search_type`. It stops early once any content
+    it extracted passes `is_complete`, so it does not spend more steps
+    re-checking a result it already has. Within a task, each step's LLM
+    and browser time is recorded in the task timings and /metrics. Raises AgentStoppedError
+    when the agent ends without a result.
+    """
+    max_steps = AGENT_MAX_STEPS[search_type]
+    budget = AGENT_TIME_BUDGET[search_type]
+    # the agent reads screenshots, so it gets the images and icon fonts the extractors skipped
+    await lease.unblock_resources()
+    browser = Browser(config=BrowserConfig(headless=BROWSER_HEADLESS))
+    # browser_use launches its own Chromium unless it already has one
+    browser.playwright_browser = lease.browser
+    context = LeasedBrowserContext(browser, lease)
+    agent = Agent(task=task, llm=llm, browser=browser, browser_context=context)
+    trace = current_trace()
+    started = time.monotonic()
+    outcome = "max_steps"
+    result = None
+    step = 0
+    try:
+        while step < max_steps:
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                outcome = "timeout"
+                break
+            step += 1
+            # the LLM calls of the step are timed by LLMMetricsHandler into the trace
+            llm_before = trace.counters.get("llm_seconds", 0) if trace else 0
+            step_started = time.monotonic()
+            try:
+                await asyncio.wait_for(agent.step(), remaining)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                break
+            finally:
+                if trace:
+                    elapsed = time.monotonic() - step_started
+                    think = min(trace.counters.get("llm_seconds", 0) - llm_before, elapsed)
+                    AGENT_STEP_SECONDS.observe(think, agent=search_type, phase="think")
+                    AGENT_STEP_SECONDS.observe(elapsed - think, agent=search_type, phase="act")
+                    trace.record_agent_step(search_type, step, think, elapsed - think)
+                    trace.add("agent_steps")
+
+            history = _history(agent)
+            if history.is_done():
+                outcome = "done"
+                result = history.final_result()
+                break
+            result = _complete_result(history, is_complete)
+            if result is not None:
+                outcome = "early_stop"
+                break
+            if _consecutive_failures(agent) >= AGENT_MAX_FAILURES:
+                outcome = "failed"
+                break
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        AGENT_RUNS.inc(agent=search_type, outcome=outcome)
+        # browser_use closes what it still holds when garbage collected,
+        # the pooled browser and context are not its to close
+        context.session = None
+        browser.playwright_browser = None
+
+    print(f"{search_type} agent finished after {step} steps ({outcome})")
+    if result is None:
+        raise AgentStoppedError(
+            f"The {search_type} agent stopped after {step} steps and "
+            f"{time.monotonic() - started:.0f}s without a result ({outcome})"
+        )
+    return result
@@ -0,0 +1,335 @@
+import asyncio
+import os
+import time
+import weakref
+from playwright.async_api import async_playwright
+from metrics import ACTIVE_BROWSERS, BROWSER_WAIT_SECONDS, current_trace
+from Agent.resource_blocking import block_resources
+
+try:
+    import psutil
+except ImportError:  # RSS based recycling is skipped without psutil
+    psutil = None
+
+# set BROWSER_HEADLESS=false to watch the scrapers work
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() in ("1", "true", "yes")
+# browsers kept open per event loop
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+# tasks sharing one browser at a time, each in its own context
+BROWSER_CONTEXTS_PER_BROWSER = int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", 2))
+# a browser is closed and replaced after this many contexts...
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", 50))
+# ...or once its processes use more memory than this, in MB
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", 1024))
+# a page parked for the next stage of a search is released if not claimed by then, in seconds
+PARKED_PAGE_TTL = float(os.getenv("PARKED_PAGE_TTL", 60))
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.uses = 0
+        self.retiring = False
+
+    def healthy(self):
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserLease:
+    """A fresh BrowserContext on a pooled browser, returned with ``release()``."""
+
+    def __init__(self, pool, entry, context, blocking=False):
+        self.pool = pool
+        self.entry = entry
+        self.context = context
+        # whether block_resources routes the context
+        self.blocking = blocking
+        self._released = False
+
+    @property
+    def browser(self):
+        """The pooled Playwright Browser the context belongs to."""
+        return self.entry.browser
+
+    async def unblock_resources(self, reload=True):
+        """Load every resource in the context from now on, for the browser_use agent.
+
+        The open pages are reloaded to get the images and fonts skipped so
+        far, unless `reload` is false because the caller navigates anyway.
+        """
+        if not self.blocking:
+            return
+        self.blocking = False
+        await self.context.unroute("**/*")
+        if reload:
+            for page in self.context.pages:
+                await page.reload()
+
+    async def release(self):
+        if self._released:
+            return
+        self._released = True
+        await self.pool._release(self)
+
+
+class BrowserPool:
+    """Pre-launched Chromium browsers shared by the Playwright scrapers.
+
+    Launching Chromium takes seconds, so browsers stay open between
+    tasks and each task gets a new BrowserContext (no cookies or cache
+    shared with other tasks). At most `size` browsers are open, each
+    serving up to `contexts_per_browser` tasks at once. Browsers that
+    disconnect are dropped, and browsers past `max_uses` contexts or
+    `max_rss_mb` of memory are closed once idle and replaced.
+
+    A stage that leaves a page open for the next stage of the same search
+    ``park()``s it under its URL; ``open_page()`` hands it over instead of
+    loading the URL again.
+
+    A pool belongs to one event loop, use ``get_browser_pool()``.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, contexts_per_browser=BROWSER_CONTEXTS_PER_BROWSER,
+                 max_uses=BROWSER_MAX_USES, max_rss_mb=BROWSER_MAX_RSS_MB, headless=BROWSER_HEADLESS):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.headless = headless
+        self._playwright = None
+        self._starting = asyncio.Lock()
+        self._browsers = []
+        self._launching = 0
+        self._changed = asyncio.Condition()
+        self._parked = {}
+        self.counters = {
+            'launched': 0,
+            'recycled': 0,
+            'unhealthy': 0,
+            'leases': 0,
+            'parked': 0,
+            'claimed': 0,
+            'parked_expired': 0,
+        }
+        if psutil is None and self.max_rss_mb:
+            print("psutil is not installed, browsers will not be recycled by memory use (BROWSER_MAX_RSS_MB)")
+
+    async def acquire(self, profile=None):
+        """Wait for room on a browser and return a BrowserLease with a new context.
+
+        With `profile` the context skips the resources that scraper does
+        not need, see resource_blocking.py.
+        """
+        started = time.monotonic()
+        entry = await self._checkout()
+        waited = time.monotonic() - started
+        BROWSER_WAIT_SECONDS.observe(waited)
+        trace = current_trace()
+        if trace:
+            trace.add("browser_wait_seconds", waited)
+
+        try:
+            context = await entry.browser.new_context()
+            blocking = bool(profile) and await block_resources(context, profile, trace)
+        except Exception:
+            entry.retiring = True
+            await self._checkin(entry)
+            raise
+        self.counters['leases'] += 1
+        return BrowserLease(self, entry, context, blocking)
+
+    async def open_page(self, url, profile=None):
+        """Return ``(lease, page)`` with `url` loaded.
+
+        The page parked for `url` is handed over when there is one,
+        otherwise a new lease is acquired and the URL loaded in it. The
+        caller releases the lease.
+        """
+        parked = self._parked.pop(url, None)
+        if parked:
+            lease, page, expiry = parked
+            expiry.cancel()
+            if not page.is_closed():
+                self.counters['claimed'] += 1
+                return lease, page
+            await lease.release()
+
+        lease = await self.acquire(profile=profile)
+        try:
+            page = await lease.context.new_page()
+            await page.goto(url)
+        except BaseException:
+            await lease.release()
+            raise
+        return lease, page
+
+    def park(self, url, lease, page):
+        """Keep `lease` and its `page`, showing `url`, for ``open_page(url)`` to claim.
+
+        The lease now belongs to the pool: it is released after
+        PARKED_PAGE_TTL seconds if nobody claims it.
+        """
+        previous = self._parked.pop(url, None)
+        if previous:
+            previous[2].cancel()
+            asyncio.ensure_future(previous[0].release())
+        expiry = asyncio.get_running_loop().call_later(PARKED_PAGE_TTL, self._expire_parked, url)
+        self._parked[url] = (lease, page, expiry)
+        self.counters['parked'] += 1
+
+    def _expire_parked(self, url):
+        parked = self._parked.pop(url, None)
+        if parked:
+            self.counters['parked_expired'] += 1
+            asyncio.ensure_future(parked[0].release())
+
+    async def warm(self, count=None):
+        """Launch browsers up to `count` (default: the pool size) ahead of the first task."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            async with self._changed:
+                if len(self._browsers) + self._launching >= count:
+                    return
+                self._launching += 1
+            await self._launch_reserved()
+
+    async def close(self):
+        for lease, _, expiry in list(self._parked.values()):
+            expiry.cancel()
+            await lease.release()
+        self._parked.clear()
+        for entry in list(self._browsers):
+            await self._close_browser(entry)
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self):
+        return dict(
+            self.counters,
+            browsers=len(self._browsers),
+            active_contexts=sum(entry.active for entry in self._browsers),
+            parked_pages=len(self._parked),
+            size=self.size,
+        )
+
+    async def _checkout(self):
+        async with self._changed:
+            while True:
+                self._drop_disconnected()
+                available = [
+                    entry for entry in self._browsers
+                    if entry.healthy() and entry.active < self.contexts_per_browser
+                ]
+                if available:
+                    entry = min(available, key=lambda e: e.active)
+                    entry.active += 1
+                    entry.uses += 1
+                    return entry
+                if len(self._browsers) + self._launching < self.size:
+                    self._launching += 1
+                    break
+                await self._changed.wait()
+        # launch outside the lock, other tasks can still check in and out
+        return await self._launch_reserved(lease=True)
+
+    def _drop_disconnected(self):
+        for entry in list(self._browsers):
+            if not entry.retiring and not entry.browser.is_connected():
+                self.counters['unhealthy'] += 1
+                entry.retiring = True
+                if entry.active == 0:
+                    self._browsers.remove(entry)
+                    ACTIVE_BROWSERS.dec()
+
+    async def _release(self, lease):
+        try:
+            await lease.context.close()
+        except Exception as e:
+            print(f"Error closing browser context: {str(e)}")
+            lease.entry.retiring = True
+        await self._checkin(lease.entry)
+
+    async def _checkin(self, entry):
+        if not entry.retiring and (entry.uses >= self.max_uses or await self._over_memory(entry)):
+            entry.retiring = True
+            self.counters['recycled'] += 1
+        async with self._changed:
+            entry.active -= 1
+            close = entry.retiring and entry.active == 0
+            if close:
+                self._browsers.remove(entry)
+            self._changed.notify_all()
+        if close:
+            await self._close_browser(entry)
+
+    async def _launch_reserved(self, lease=False):
+        """Launch a browser for a slot reserved with ``_launching`` and add it to the pool."""
+        try:
+            async with self._starting:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+        except BaseException:
+            async with self._changed:
+                self._launching -= 1
+                self._changed.notify_all()
+            raise
+        self.counters['launched'] += 1
+        ACTIVE_BROWSERS.inc()
+        entry = _PooledBrowser(browser)
+        if lease:
+            entry.active = 1
+            entry.uses = 1
+        async with self._changed:
+            self._launching -= 1
+            self._browsers.append(entry)
+            self._changed.notify_all()
+        return entry
+
+    async def _close_browser(self, entry):
+        if entry in self._browsers:
+            self._browsers.remove(entry)
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            print(f"Error closing pooled browser: {str(e)}")
+        ACTIVE_BROWSERS.dec()
+
+    async def _over_memory(self, entry):
+        """Whether the browser's processes together use more than `max_rss_mb`."""
+        if psutil is None or not self.max_rss_mb:
+            return False
+        try:
+            session = await entry.browser.new_browser_cdp_session()
+            try:
+                info = await session.send("SystemInfo.getProcessInfo")
+            finally:
+                await session.detach()
+            rss = 0
+            for process in info.get("processInfo", []):
+                try:
+                    rss += psutil.Process(process["id"]).memory_info().rss
+                except psutil.Error:
+                    continue
+        except Exception as e:
+            print(f"Could not read browser memory: {str(e)}")
+            return False
+        return rss > self.max_rss_mb * 1024 * 1024
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_browser_pool():
+    """The pool of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = BrowserPool()
+    return pool
+
+
+def browser_pool_stats():
+    return [pool.stats() for pool in list(_pools.values())]
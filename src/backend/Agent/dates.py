@@ -0,0 +1,30 @@
+from datetime import datetime
+
+# formats seen in requests: correct_date_field_flight output, LLM output and ISO
+DATE_FORMATS = [
+    "%A, %B %d, %Y",
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+]
+
+
+def parse_travel_date(text):
+    """Parse a travel date string into a datetime, or return None."""
+    if isinstance(text, datetime):
+        return text
+    if not text:
+        return None
+    cleaned = " ".join(str(text).replace(",", ", ").split()).replace(" ,", ",")
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def format_flight_date(dt):
+    """Format a date the way Google Flights labels calendar cells, e.g. "Sunday, May 8, 2025"."""
+    return f"{dt:%A}, {dt:%B} {dt.day}, {dt.year}"
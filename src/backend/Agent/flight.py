@@ -1,12 +1,22 @@
 from playwright.async_api import async_playwright
-from browser_use import Agent, Browser, BrowserConfig
 from config.model import model
+from metrics import current_trace, EXTRACTIONS
+from playwright.async_api import Error as PlaywrightError
+from Agent.browser_pool import get_browser_pool
+from Agent.resource_blocking import block_resources
+from Agent.flight_url import build_flight_url
+from Agent.waits import PageWaiter
+from Agent.prices import parse_price
+from Agent.flight_extractor import extract_flights, ExtractionError
+from Agent.agent_browser import run_agent_on_lease
 from datetime import datetime
+import json
 import os
+import re
 def flight_scrape_task(preferences, url):
     return f"""Follow these steps in order:
-    Go to {url}
-    1. Find and click the 'Search' button on the page
+    The page {url} is already open in the current tab, only go to it if another page is shown.
+    1. If the flight results are not shown yet, find and click the 'Search' button on the page
 
     2. For the outbound flight (first leg of the journey):
         - Identify the best outbound flight based on user preferences: {preferences}
@@ -67,21 +77,77 @@ def flight_scrape_task(preferences, url):
     """
 
 
+def parse_flight_result(result):
+    """Read the outbound_flight/return_flight JSON out of a scrape result.
+
+    The agent's final answer is usually the JSON from flight_scrape_task,
+    sometimes wrapped in a markdown code block. Returns None when no such
+    object can be found.
+    """
+    if isinstance(result, dict):
+        return result
+    if not result:
+        return None
+    match = re.search(r"\{.*\}", str(result), re.DOTALL)
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict) or "outbound_flight" not in parsed:
+        return None
+    return parsed
+
+
+def flight_result_complete(result):
+    """Whether `result` holds both legs with times and prices, so the agent can stop."""
+    parsed = parse_flight_result(result)
+    if not parsed:
+        return False
+    legs = [parsed.get("outbound_flight"), parsed.get("return_flight")]
+    return all(isinstance(leg, dict) and leg.get("price") and leg.get("start_time") for leg in legs)
+
+
+def flight_total_price(parsed):
+    """Total price of an outbound + return pair, as (amount, currency).
+
+    Google Flights shows round-trip totals on both legs, so equal prices
+    are taken as the total rather than summed, matching the rule the
+    flight summary prompt uses.
+    """
+    if not parsed:
+        return None, None
+    outbound, currency = parse_price((parsed.get("outbound_flight") or {}).get("price"))
+    inbound, return_currency = parse_price((parsed.get("return_flight") or {}).get("price"))
+    if outbound is None:
+        return None, None
+    if inbound is None or inbound == outbound:
+        return outbound, currency
+    return outbound + inbound, currency or return_currency
+
+
 class FlightSearchScraper:
-    async def start(self, use_bright_data=True):
-        self.playwright = await async_playwright().start()
+    def __init__(self):
+        self.lease = None
+        self.context = None
+        self.page = None
 
+    async def start(self, use_bright_data=True):
         if use_bright_data:
+            self.playwright = await async_playwright().start()
             self.browser = await self.playwright.chromium.connect(
                 os.getenv("BRIGHTDATA_WSS_URL")
             )
+            self.context = await self.browser.new_context()
+            await block_resources(self.context, "flight", current_trace())
         else:
-            self.browser = await self.playwright.chromium.launch(
-                headless=False,
-            )
+            # trình duyệt dùng chung, mỗi task một context mới
+            self.lease = await get_browser_pool().acquire(profile="flight")
+            self.context = self.lease.context
 
-        self.context = await self.browser.new_context()
         self.page = await self.context.new_page()
+        self.waiter = PageWaiter(self.page, "flight")
 
     async def find_origin_input(self):
         element = await self.page.wait_for_selector(
@@ -98,10 +164,9 @@ class FlightSearchScraper:
             await input_element.press("Control+a")
             await input_element.press("Delete")
             await input_element.type(airport_name, delay=50)
-            await self.page.wait_for_selector(
-                f'li[role="option"][aria-label*="{airport_name}"]', timeout=3000
+            await self.waiter.selector(
+                "airport_options", f'li[role="option"][aria-label*="{airport_name}"]', timeout=3000
             )
-            await self.page.wait_for_timeout(500)
 
             # Try different selectors for the dropdown item
             dropdown_selectors = [
@@ -117,7 +182,10 @@ class FlightSearchScraper:
                     )
                     if dropdown_item:
                         await dropdown_item.click()
-                        await self.page.wait_for_load_state("networkidle")
+                        # danh sách gợi ý đóng lại khi sân bay đã được chọn
+                        await self.waiter.selector(
+                            "airport_selected", 'li[role="option"]', timeout=3000, state="hidden", optional=True
+                        )
                         return True
                 except:
                     continue
@@ -152,27 +220,21 @@ class FlightSearchScraper:
                 'input[aria-label*="Departure"]', timeout=5000
             )
             await departure_input.click()
-            await self.page.wait_for_timeout(1000)
 
             # Chọn ngày đi
-            await self.page.click(f'div[aria-label="{start_date}"]')
-            await self.page.wait_for_timeout(500)  # Directly input the departure date
-            print(f"Return date filled: {start_date}")
-            await self.page.wait_for_timeout(1000)
+            start_cell = await self.waiter.selector("calendar_open", f'div[aria-label="{start_date}"]')
+            await start_cell.click()
+            print(f"Departure date filled: {start_date}")
 
             # Input return date
             return_input = await self.page.wait_for_selector(
                 'input[aria-label*="Return"]', timeout=5000
             )
-            # await return_input.click()
-            await self.page.wait_for_timeout(1000)
-
-            await self.page.click(f'div[aria-label="{end_date}"]')
-            await self.page.wait_for_timeout(500)
+            end_cell = await self.waiter.selector("return_date", f'div[aria-label="{end_date}"]')
+            await end_cell.click()
             print(f"Return date filled: {end_date}")
             await return_input.press("Enter")
-            await self.page.wait_for_timeout(1000)
-            
+
             try:
                 # Tìm nút "Done" với selector chi tiết hơn
                     alternative_done_button = await self.page.wait_for_selector(
@@ -195,6 +257,8 @@ class FlightSearchScraper:
                 except Exception as e:
                     print("No alternative 'Done' button found or required.")
 
+            # the page writes the search into the URL once the form is complete
+            await self.waiter.url("search_params", lambda url: "tfs=" in url, timeout=5000, optional=True)
             print(self.page.url)
             return self.page.url
 
@@ -202,8 +266,22 @@ class FlightSearchScraper:
             print(f"An error occurred: {str(e)}")
             return None
 
+    def hand_off(self, url):
+        """Park the page for scrape_flights to continue on, instead of closing it."""
+        if not self.lease or not self.page:
+            return False
+        get_browser_pool().park(url, self.lease, self.page)
+        self.lease = None
+        self.context = None
+        return True
+
     async def close(self):
         try:
+            if self.context is None:
+                return
+            if self.lease:
+                await self.lease.release()
+                return
             await self.context.close()
             await self.browser.close()
             await self.playwright.stop()
@@ -212,34 +290,65 @@ class FlightSearchScraper:
 
 
 async def scrape_flights(url, preferences):
-    browser = Browser(
-        config=BrowserConfig(
-            chrome_instance_path="C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-        )
-    )
-    initial_actions = [
-        {"open_tab": {"url": url}},
-    ]
-
-    agent = Agent(
-        task=flight_scrape_task(preferences, url),
-        llm=model,
-        initial_actions=initial_actions,
-        browser=browser,
-    )
+    """Read the best outbound and return flights from the results page.
+
+    The DOM extractor handles the usual layout in a few seconds. The LLM
+    agent is only used when the extractor cannot read the page, and
+    continues in the same browser page. A page get_flight_url left open
+    for `url` is picked up instead of loading the URL again.
+    """
+    lease, page = await get_browser_pool().open_page(url, profile="flight")
+    try:
+        loaded_url = page.url
+        try:
+            result = await extract_flights(page, preferences)
+            EXTRACTIONS.inc(extractor="flight", outcome="success")
+            return result
+        except (ExtractionError, PlaywrightError) as e:
+            EXTRACTIONS.inc(extractor="flight", outcome="fallback")
+            print(f"Flight extractor failed, falling back to the agent: {str(e)}")
+        # the extractor may have picked an outbound flight already, start over from the results
+        if page.url != loaded_url:
+            await lease.unblock_resources(reload=False)
+            await page.goto(url)
+        return await scrape_flights_with_agent(url, preferences, lease)
+    finally:
+        # Đóng context, kể cả khi tác vụ bị huỷ hoặc quá hạn
+        await lease.release()
 
+
+async def scrape_flights_with_agent(url, preferences, lease):
+    """Let the LLM agent read the flights on the page already open in `lease`."""
     # Chạy tác vụ và ghi log
     print("Starting flight scraping task...")
-    history = await agent.run()
+    result = await run_agent_on_lease(
+        flight_scrape_task(preferences, url), model, lease, "flight", is_complete=flight_result_complete
+    )
     print("Task completed. Fetching result...")
-
-    # Đóng trình duyệt và trả về kết quả
-    await browser.close()
-    result = history.final_result()
     return result
 
 
-async def get_flight_url(origin, destination, start_date, end_date):
+async def get_flight_url(origin, destination, start_date, end_date, preferences=None):
+    """URL of the Google Flights results for the search.
+
+    Built directly when the airports and dates can be resolved, otherwise
+    by filling in the search form in a browser.
+    """
+    preferences = preferences or {}
+    url = build_flight_url(
+        origin,
+        destination,
+        start_date,
+        end_date,
+        ticket_class=preferences.get("class") or preferences.get("ticket_class"),
+        adults=preferences.get("adults", 1),
+        children=preferences.get("children", 0),
+    )
+    if url:
+        print(f"Built flight search URL: {url}")
+        return url
+
+    print("Could not build the flight URL directly, filling in the search form...")
     try:
         scraper = FlightSearchScraper()
         await scraper.start(use_bright_data=False)
@@ -249,6 +358,9 @@ async def get_flight_url(origin, destination, start_date, end_date):
             start_date=start_date,
             end_date=end_date,
         )
+        # scrape_flights continues on this page rather than loading the URL again
+        if url:
+            scraper.hand_off(url)
         return url
 
     finally:
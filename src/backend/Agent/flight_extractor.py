@@ -0,0 +1,134 @@
+import json
+import re
+from Agent.prices import parse_price
+from Agent.waits import PageWaiter
+
+# every result card carries a full English description of the flight in its
+# aria-label, which changes far less often than the CSS classes around it
+FLIGHT_CARD_SELECTOR = 'li div[aria-label^="From "]'
+
+CURRENCY_CODES = {
+    "us dollars": "USD",
+    "vietnamese dong": "VND",
+    "euros": "EUR",
+    "british pounds": "GBP",
+    "japanese yen": "JPY",
+    "south korean won": "KRW",
+    "thai baht": "THB",
+    "singapore dollars": "SGD",
+    "australian dollars": "AUD",
+    "canadian dollars": "CAD",
+    "chinese yuan": "CNY",
+}
+
+PRICE_RE = re.compile(r"^From ([\d.,]+) (.+?)(?: round trip total| one way)?\.")
+STOPS_RE = re.compile(r"(Nonstop|(\d+) stops?) flight with (.+?)\.")
+LEAVES_RE = re.compile(
+    r"Leaves (.+?) at (\d{1,2}:\d{2} ?[AP]M) on (.+?) and arrives at (.+?) at (\d{1,2}:\d{2} ?[AP]M) on (.+?)\."
+)
+DURATION_RE = re.compile(r"Total duration ((?:\d+ hr)?(?: ?\d+ min)?)\.")
+LAYOVER_RE = re.compile(r"Layover \(\d+ of \d+\) is a (.+?) (?:overnight )?layover at (.+?)(?: in (.+?))?\.")
+
+
+class ExtractionError(Exception):
+    """The results page did not look the way the extractor expects."""
+
+
+def _duration(text):
+    hours = re.search(r"(\d+) hr", text)
+    minutes = re.search(r"(\d+) min", text)
+    return f"{int(hours.group(1)) if hours else 0}h {int(minutes.group(1)) if minutes else 0}m"
+
+
+def duration_minutes(duration):
+    match = re.match(r"(\d+)h (\d+)m", duration or "")
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else float("inf")
+
+
+def parse_flight_label(label):
+    """Turn a result card's aria-label into the flight_scrape_task schema, or None."""
+    label = " ".join(label.replace("\u202f", " ").replace("\xa0", " ").split())
+    price = PRICE_RE.search(label)
+    stops = STOPS_RE.search(label)
+    leaves = LEAVES_RE.search(label)
+    if not (price and stops and leaves):
+        return None
+    currency = price.group(2).strip()
+    duration = DURATION_RE.search(label)
+    layovers = [
+        f"{airport} ({_duration(length)})" for length, airport, _ in LAYOVER_RE.findall(label)
+    ]
+    return {
+        "start_time": f"{leaves.group(2)} on {leaves.group(3)}",
+        "end_time": f"{leaves.group(5)} on {leaves.group(6)}",
+        "origin": leaves.group(1),
+        "destination": leaves.group(4),
+        "price": f"{price.group(1)} {CURRENCY_CODES.get(currency.lower(), currency)}",
+        "num_stops": 0 if stops.group(1) == "Nonstop" else int(stops.group(2)),
+        "duration": _duration(duration.group(1)) if duration else "",
+        "airline": stops.group(3),
+        "stop_locations": ", ".join(layovers),
+    }
+
+
+def pick_best_flight(flights, preferences):
+    """Index of the best flight: preferred airlines and budget first, then price, stops and duration."""
+    candidates = list(enumerate(flights))
+    airlines = [a.lower() for a in (preferences or {}).get("airlines") or [] if a]
+    if airlines:
+        preferred = [(i, f) for i, f in candidates if any(a in f["airline"].lower() for a in airlines)]
+        candidates = preferred or candidates
+    budget, _ = parse_price((preferences or {}).get("budget"))
+    if budget:
+        within = [(i, f) for i, f in candidates if (parse_price(f["price"])[0] or 0) <= budget]
+        candidates = within or candidates
+
+    def rank(item):
+        price, _ = parse_price(item[1]["price"])
+        return (price if price is not None else float("inf"), item[1]["num_stops"], duration_minutes(item[1]["duration"]))
+
+    return min(candidates, key=rank)[0]
+
+
+async def _read_cards(page):
+    cards = await page.query_selector_all(FLIGHT_CARD_SELECTOR)
+    flights = []
+    for card in cards:
+        flight = parse_flight_label(await card.get_attribute("aria-label") or "")
+        if flight:
+            flights.append((card, flight))
+    if not flights:
+        raise ExtractionError("No flight cards could be read from the results page")
+    return flights
+
+
+async def extract_flights(page, preferences):
+    """Pick the outbound and return flights from the results `page` without the LLM agent.
+
+    Returns the same JSON string the agent is asked for in flight_scrape_task.
+    Raises ExtractionError, or Playwright's TimeoutError, when the page
+    does not have the expected layout.
+    """
+    waiter = PageWaiter(page, "flight_results")
+    await waiter.selector("outbound_results", FLIGHT_CARD_SELECTOR, timeout=15000)
+    outbound_cards = await _read_cards(page)
+    best = pick_best_flight([flight for _, flight in outbound_cards], preferences)
+    card, outbound = outbound_cards[best]
+    first_label = await outbound_cards[0][0].get_attribute("aria-label")
+    if "round trip" not in first_label:
+        return json.dumps({"outbound_flight": outbound, "return_flight": None}, ensure_ascii=False)
+
+    await card.click()
+    # the list is replaced by the return flights for the chosen outbound
+    await waiter.function(
+        "return_results",
+        """([selector, previous]) => {
+            const card = document.querySelector(selector);
+            return card && card.getAttribute("aria-label") !== previous;
+        }""",
+        arg=[FLIGHT_CARD_SELECTOR, first_label],
+        timeout=15000
+    )
+    return_cards = await _read_cards(page)
+    inbound = return_cards[pick_best_flight([flight for _, flight in return_cards], preferences)][1]
+    return json.dumps({"outbound_flight": outbound, "return_flight": inbound}, ensure_ascii=False)
@@ -0,0 +1,117 @@
+import base64
+from urllib.parse import urlencode
+from Agent.airports import resolve_airport, search_airport
+from Agent.dates import parse_travel_date
+
+FLIGHTS_SEARCH_URL = "https://www.google.com/travel/flights/search"
+
+# enums of the `tfs` protobuf, as Google Flights writes them
+SEAT_CLASSES = {
+    "economy": 1,
+    "premium economy": 2,
+    "premium": 2,
+    "business": 3,
+    "first": 4,
+}
+PASSENGER_TYPES = {
+    "adults": 1,
+    "children": 2,
+    "infants_in_seat": 3,
+    "infants_on_lap": 4,
+}
+ROUND_TRIP = 1
+ONE_WAY = 2
+# the 64-bit -1 Google Flights sends in field 16, without it results for
+# small airports can come back empty
+ALL_RESULTS = (1 << 64) - 1
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _int_field(number, value):
+    return _varint(number << 3) + _varint(value)
+
+
+def _bytes_field(number, data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return _varint((number << 3) | 2) + _varint(len(data)) + data
+
+
+def _airport(code):
+    # field 1 is the place type, 1 = airport/IATA code
+    return _int_field(1, 1) + _bytes_field(2, code)
+
+
+def _leg(date, origin, destination):
+    return (
+        _bytes_field(2, date)
+        + _bytes_field(13, _airport(origin))
+        + _bytes_field(14, _airport(destination))
+    )
+
+
+def encode_tfs(legs, seat=1, passengers=(1,), trip=ROUND_TRIP):
+    """Encode a search as the base64url `tfs` parameter of Google Flights.
+
+    `legs` is a list of ``(date "YYYY-MM-DD", origin code, destination code)``
+    and `passengers` holds one PASSENGER_TYPES value per traveller. The
+    fields are written in the order and with the constant flags (1, 2, 14
+    and 16) of the URLs Google Flights itself produces.
+    """
+    message = _int_field(1, 28) + _int_field(2, 2)
+    message += b"".join(_bytes_field(3, _leg(*leg)) for leg in legs)
+    message += b"".join(_int_field(8, passenger) for passenger in passengers)
+    message += _int_field(9, seat)
+    message += _int_field(14, 1)
+    message += _bytes_field(16, _int_field(1, ALL_RESULTS))
+    message += _int_field(19, trip)
+    return base64.urlsafe_b64encode(message).decode("ascii").rstrip("=")
+
+
+def seat_class(name):
+    """Map a ticket class such as "Business" or "economy class" to its enum, economy by default."""
+    if not name:
+        return SEAT_CLASSES["economy"]
+    name = " ".join(str(name).lower().replace("class", "").replace("-", " ").split())
+    return SEAT_CLASSES.get(name, SEAT_CLASSES["economy"])
+
+
+def build_flight_url(origin, destination, start_date, end_date=None, ticket_class=None,
+                     adults=1, children=0, infants_in_seat=0, infants_on_lap=0, language="en"):
+    """Build the Google Flights results URL for a search, without a browser.
+
+    Returns None when an airport or a date cannot be resolved, so the
+    caller can fall back to filling in the search form.
+    """
+    origin_code = resolve_airport(origin)
+    destination_code = resolve_airport(destination)
+    start = parse_travel_date(start_date)
+    end = parse_travel_date(end_date) if end_date else None
+    if not origin_code or not destination_code or start is None or (end_date and end is None):
+        return None
+
+    origin_code = search_airport(origin_code)
+    destination_code = search_airport(destination_code)
+    legs = [(f"{start:%Y-%m-%d}", origin_code, destination_code)]
+    if end:
+        legs.append((f"{end:%Y-%m-%d}", destination_code, origin_code))
+    counts = {
+        "adults": max(1, int(adults or 1)),
+        "children": int(children or 0),
+        "infants_in_seat": int(infants_in_seat or 0),
+        "infants_on_lap": int(infants_on_lap or 0),
+    }
+    passengers = [PASSENGER_TYPES[kind] for kind, count in counts.items() for _ in range(count)]
+    tfs = encode_tfs(legs, seat_class(ticket_class), passengers, ROUND_TRIP if end else ONE_WAY)
+    return f"{FLIGHTS_SEARCH_URL}?{urlencode({'tfs': tfs, 'hl': language})}"
@@ -0,0 +1,187 @@
+import json
+import os
+import re
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from Agent.dates import parse_travel_date
+from Agent.prices import parse_price
+from Agent.waits import PageWaiter
+
+# stop paging once this many hotels are collected, or after this many pages
+HOTEL_MIN_RESULTS = int(os.getenv("HOTEL_MIN_RESULTS", 12))
+HOTEL_MAX_PAGES = int(os.getenv("HOTEL_MAX_PAGES", 3))
+
+# hotel names are the h2 headings of the result list, a card is the closest
+# ancestor of the heading that also holds the price
+HOTEL_NAME_SELECTOR = "main h2"
+NEXT_PAGE_SELECTOR = 'button[aria-label="Next"], [role="button"][aria-label="Next"]'
+
+READ_CARDS_JS = """(nameSelector) => {
+    const text = (el) => (el && (el.innerText || el.textContent) || "").trim();
+    const priceRe = /(?:[$€£¥₫₩฿]|\\b(?:USD|EUR|GBP|VND|JPY|KRW|THB|SGD|AUD|CAD)\\b)\\s?[\\d.,]+|[\\d.,]+\\s?(?:[₫€]|\\b(?:USD|EUR|VND)\\b)/;
+    const cards = [];
+    for (const heading of document.querySelectorAll(nameSelector)) {
+        let card = heading.parentElement;
+        while (card && card !== document.body && !priceRe.test(text(card))) {
+            card = card.parentElement;
+        }
+        if (!card || card === document.body) continue;
+        // a section heading of the list only reaches a container holding several hotels
+        if (card.querySelectorAll(nameSelector).length > 1) continue;
+        const rating = card.querySelector('[aria-label*="out of 5"]');
+        const link = card.querySelector("a[href]");
+        // hotel cards link to the hotel or show its rating, banners with a price do neither
+        if (!rating && !link) continue;
+        const labels = [...card.querySelectorAll("[aria-label]")].map((el) => el.getAttribute("aria-label"));
+        const amenities = [...card.querySelectorAll("li")].map(text).filter((t) => t && t.length < 40);
+        cards.push({
+            name: text(heading),
+            text: text(card),
+            rating_label: rating ? rating.getAttribute("aria-label") : null,
+            labels: labels,
+            amenities: amenities,
+            url: link ? link.href : null,
+        });
+    }
+    return cards;
+}"""
+
+
+PRICE_RE = re.compile(r"(?:[$€£¥₫₩฿]|\b[A-Z]{3}\b)\s?\d[\d.,]*|\d[\d.,]*\s?(?:[₫€]|\b[A-Z]{3}\b)")
+
+
+class ExtractionError(Exception):
+    """The hotel list did not look the way the extractor expects."""
+
+
+class HotelRecord(BaseModel):
+    name: str = Field(..., description="Hotel name")
+    price_per_night: Optional[str] = Field(None, description="Nightly price with currency")
+    total_price: Optional[str] = Field(None, description="Price for the whole stay with currency")
+    rating: Optional[float] = Field(None, description="Guest rating out of 5")
+    reviews: Optional[int] = Field(None, description="Number of reviews")
+    address: Optional[str] = Field(None, description="Address or area, when the card shows one")
+    amenities: List[str] = Field(default_factory=list, description="Amenities listed on the card")
+    url: Optional[str] = Field(None, description="Link to the hotel's details")
+
+
+def _nights(check_in, check_out):
+    start = parse_travel_date(check_in)
+    end = parse_travel_date(check_out)
+    if start and end and end > start:
+        return (end - start).days
+    return None
+
+
+def _format_price(amount, currency):
+    if amount is None:
+        return None
+    amount = f"{amount:,.0f}" if amount == int(amount) else f"{amount:,.2f}"
+    return f"{amount} {currency}" if currency else amount
+
+
+def parse_hotel_card(card, nights=None):
+    """Build a HotelRecord from the raw fields READ_CARDS_JS collects for a card, or None."""
+    name = " ".join((card.get("name") or "").split())
+    if not name:
+        return None
+
+    # the nightly price label is the most reliable, the card text the fallback
+    sources = [
+        label for label in card.get("labels") or []
+        if re.search(r"(?i)\b(nightly|per night|prices? starting)", label or "")
+    ] + [card.get("text") or ""]
+    price_text = None
+    for source in sources:
+        match = PRICE_RE.search(source)
+        if match:
+            price_text = match.group(0)
+            break
+    nightly, currency = parse_price(price_text)
+
+    rating = reviews = None
+    rating_label = card.get("rating_label") or ""
+    match = re.search(r"(\d(?:\.\d)?) out of 5", rating_label)
+    if match:
+        rating = float(match.group(1))
+    match = re.search(r"([\d,]+) reviews?", rating_label)
+    if match:
+        reviews = int(match.group(1).replace(",", ""))
+
+    address = None
+    for line in (card.get("text") or "").splitlines():
+        # the list shows the area under the name, e.g. "1.2 km from Hoan Kiem Lake"
+        if re.search(r"(?i)\b(km|mi|miles|min) (from|to)\b|\bstreet\b|\bdistrict\b", line):
+            address = line.strip()
+            break
+
+    return HotelRecord(
+        name=name,
+        price_per_night=_format_price(nightly, currency),
+        total_price=_format_price(nightly * nights, currency) if nightly is not None and nights else None,
+        rating=rating,
+        reviews=reviews,
+        address=address,
+        amenities=list(dict.fromkeys(card.get("amenities") or [])),
+        url=card.get("url"),
+    )
+
+
+def rank_hotels(hotels, preferences):
+    """Sort so hotels within the budget and rating come first, then by rating and price."""
+    preferences = preferences or {}
+    budget, _ = parse_price(preferences.get("price"))
+    match = re.search(r"\d(?:\.\d)?", str(preferences.get("rating") or ""))
+    min_rating = float(match.group(0)) if match else None
+
+    def rank(hotel):
+        price, _ = parse_price(hotel.price_per_night)
+        fits = (budget is None or (price is not None and price <= budget)) and \
+            (min_rating is None or (hotel.rating or 0) >= min_rating)
+        return (not fits, -(hotel.rating or 0), price if price is not None else float("inf"))
+
+    return sorted(hotels, key=rank)
+
+
+async def extract_hotels(page, preferences, check_in=None, check_out=None):
+    """Read every hotel card of the results `page`, following Next until enough are collected.
+
+    Returns the HotelRecords ranked by rank_hotels. Raises ExtractionError,
+    or a Playwright error, when the list cannot be read.
+    """
+    nights = _nights(check_in or (preferences or {}).get("check_in"), check_out or (preferences or {}).get("check_out"))
+    waiter = PageWaiter(page, "hotel_results")
+    await waiter.selector("hotel_list", HOTEL_NAME_SELECTOR, timeout=15000)
+
+    hotels = {}
+    for page_number in range(HOTEL_MAX_PAGES):
+        for card in await page.evaluate(READ_CARDS_JS, HOTEL_NAME_SELECTOR):
+            record = parse_hotel_card(card, nights)
+            if record and record.name not in hotels:
+                hotels[record.name] = record
+        if len(hotels) >= HOTEL_MIN_RESULTS or page_number == HOTEL_MAX_PAGES - 1:
+            break
+        next_button = await page.query_selector(NEXT_PAGE_SELECTOR)
+        if not next_button:
+            break
+        # section headings stay on every page, so wait for a name not shown before
+        previous = await page.eval_on_selector_all(
+            HOTEL_NAME_SELECTOR, "(headings) => headings.map((heading) => heading.innerText.trim())"
+        )
+        await next_button.click()
+        await waiter.function(
+            "next_page",
+            """([selector, previous]) => [...document.querySelectorAll(selector)]
+                .some((heading) => !previous.includes(heading.innerText.trim()))""",
+            arg=[HOTEL_NAME_SELECTOR, previous],
+            timeout=10000
+        )
+
+    priced = [hotel for hotel in hotels.values() if hotel.price_per_night]
+    if not priced:
+        raise ExtractionError("No priced hotel cards could be read from the results page")
+    return rank_hotels(hotels.values(), preferences)
+
+
+def hotels_to_json(hotels):
+    return json.dumps({"hotels": [hotel.model_dump() for hotel in hotels]}, ensure_ascii=False)
@@ -0,0 +1,40 @@
+import re
+from urllib.parse import urlencode
+from Agent.dates import parse_travel_date
+
+HOTELS_SEARCH_URL = "https://www.google.com/travel/search"
+
+
+def hotel_query(location, price=None, rating=None):
+    """The search text, with filters Google Travel understands written out.
+
+    e.g. "hotels in Paris 4 stars under 150 EUR per night"
+    """
+    query = f"hotels in {location}"
+    if rating:
+        match = re.search(r"\d(?:[.,]\d)?", str(rating))
+        if match:
+            query += f" {match.group(0).replace(',', '.')} stars"
+    if price:
+        price = " ".join(str(price).split())
+        if not re.match(r"(?i)(under|below|less than|max|up to)\b", price):
+            price = f"under {price}"
+        query += f" {price} per night"
+    return query
+
+
+def build_hotel_url(location, check_in=None, check_out=None, adults=2, price=None, rating=None, language="en"):
+    """Build the Google Travel hotel results URL for a stay, without a browser.
+
+    Dates that cannot be parsed are left out, Google then shows its
+    default dates.
+    """
+    params = {'q': hotel_query(location, price, rating)}
+    start = parse_travel_date(check_in)
+    end = parse_travel_date(check_out)
+    if start and end and end > start:
+        params['checkin'] = f"{start:%Y-%m-%d}"
+        params['checkout'] = f"{end:%Y-%m-%d}"
+    params['adults'] = max(1, int(adults or 2))
+    params['hl'] = language
+    return f"{HOTELS_SEARCH_URL}?{urlencode(params)}"
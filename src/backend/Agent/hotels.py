@@ -1,13 +1,17 @@
-from playwright.async_api import async_playwright
-from browser_use import Agent, Browser, BrowserConfig
 from config.model import model
+from metrics import EXTRACTIONS
+from playwright.async_api import Error as PlaywrightError
+from Agent.hotel_url import build_hotel_url
+from Agent.hotel_extractor import extract_hotels, hotels_to_json, ExtractionError
+from Agent.agent_browser import run_agent_on_lease, find_json, has_fields
+from Agent.browser_pool import get_browser_pool
 
 def hotel_scrape_task(preferences, url):
     return f"""Follow these steps in order:
-    Go to {url}
+    The page {url} is already open in the current tab, only go to it if another page is shown.
     
     1. Wait for the hotel list to load.
-    2. Identify 4 hotel options based on preferences: {preferences}
+    2. Identify {HOTEL_AGENT_RESULTS} hotel options based on preferences: {preferences}
     3. Extract the following hotel details for each hotel:
         * Hotel name
         * Price per night (include currency)
@@ -18,68 +22,58 @@ def hotel_scrape_task(preferences, url):
         * Check-in and check-out dates
     4. Return the extracted details of each hotels.
     """
-class HotelSearchScraper:
-    async def start(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=False)
-        self.context = await self.browser.new_context()
-        self.page = await self.context.new_page()
 
-    async def fill_hotel_search(self, location, check_in, check_out):
-        try:
-            print("Navigating to Google Travel Hotels...")
-            url = f"https://www.google.com/travel/search?q={location}"
-            await self.page.goto(url)
+# hotel_scrape_task asks the agent for this many hotels
+HOTEL_AGENT_RESULTS = 4
 
-            # Waiting for content to load
-            await self.page.wait_for_timeout(5000)
-            print(self.page.url)
-            return self.page.url
+def hotel_result_complete(result):
+    """Whether `result` lists enough hotels with a name and a price, so the agent can stop."""
+    for value in find_json(result):
+        hotels = value.get("hotels") if isinstance(value, dict) else value
+        if isinstance(hotels, list) and \
+                sum(has_fields(hotel, "name", "price") for hotel in hotels) >= HOTEL_AGENT_RESULTS:
+            return True
+    return False
 
-        except Exception as e:
-            print(f"Error filling hotel search: {str(e)}")
-            return None
+async def scrape_hotels(url, preferences):
+    """Read the hotel cards of the results, as JSON HotelRecords ranked by the preferences.
 
-    async def close(self):
+    The LLM agent is only used when the DOM extractor cannot read the list,
+    and continues in the same browser page.
+    """
+    lease, page = await get_browser_pool().open_page(url, profile="hotel")
+    try:
         try:
-            await self.context.close()
-            await self.browser.close()
-            await self.playwright.stop()
-        except Exception as e:
-            print(f"Error during cleanup: {str(e)}")
+            hotels = await extract_hotels(page, preferences)
+            EXTRACTIONS.inc(extractor="hotel", outcome="success")
+            return hotels_to_json(hotels)
+        except (ExtractionError, PlaywrightError) as e:
+            EXTRACTIONS.inc(extractor="hotel", outcome="fallback")
+            print(f"Hotel extractor failed, falling back to the agent: {str(e)}")
+        return await scrape_hotels_with_agent(url, preferences, lease)
+    finally:
+        # close the context even when the task is cancelled or times out
+        await lease.release()
 
-async def scrape_hotels(url, preferences):
-    browser = Browser(
-        config=BrowserConfig(
-            chrome_instance_path="C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-        )
+async def scrape_hotels_with_agent(url, preferences, lease):
+    """Let the LLM agent read the hotels on the page already open in `lease`."""
+    return await run_agent_on_lease(
+        hotel_scrape_task(preferences, url), model, lease, "hotel", is_complete=hotel_result_complete
     )
 
-    initial_actions = [
-        {"open_tab": {"url": url}},
-    ]
-
-    agent = Agent(
-        task=hotel_scrape_task(preferences, url),
-        llm=model,
-        initial_actions=initial_actions,
-        browser=browser,
+async def get_hotel_url(location, check_in, check_out, preferences=None):
+    """URL of the Google Travel hotel results for the stay, built without a browser."""
+    preferences = preferences or {}
+    url = build_hotel_url(
+        location,
+        check_in,
+        check_out,
+        adults=preferences.get("adults", 2),
+        price=preferences.get("price"),
+        rating=preferences.get("rating"),
     )
-
-    history = await agent.run()
-    await browser.close()
-    result = history.final_result()
-    return result
-
-async def get_hotel_url(location, check_in, check_out):
-    scraper = HotelSearchScraper()
-    try:
-        await scraper.start()
-        url = await scraper.fill_hotel_search(location, check_in, check_out)
-        return url
-    finally:
-        print("Closing hotel browser context...")
-        await scraper.close()
+    print(url)
+    return url
 
 # import asyncio
 # location = "Washington"
@@ -0,0 +1,32 @@
+import re
+
+
+def parse_price(text):
+    """Parse a price such as "$1,234", "₫15,186,108" or "1.234,50 €" into (amount, currency)."""
+    if isinstance(text, (int, float)):
+        return float(text), None
+    if not text:
+        return None, None
+    text = str(text)
+    match = re.search(r"\d[\d.,\s]*", text)
+    if not match:
+        return None, None
+    number = re.sub(r"\s", "", match.group(0)).rstrip(".,")
+    currency = re.sub(r"[\d.,\s]", "", text.replace(match.group(0), "")).strip() or None
+    if "," in number and "." in number:
+        # the right-most separator is the decimal point
+        if number.rfind(",") > number.rfind("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    elif "," in number or "." in number:
+        sep = "," if "," in number else "."
+        groups = number.split(sep)
+        if len(groups) > 2 or len(groups[-1]) == 3:
+            number = number.replace(sep, "")
+        else:
+            number = number.replace(sep, ".")
+    try:
+        return float(number), currency
+    except ValueError:
+        return None, None
@@ -0,0 +1,87 @@
+import os
+from metrics import BLOCKED_REQUESTS
+
+# turn off to load every resource, e.g. when debugging a scraper in a visible browser
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")
+
+# resource types each scraper can do without. The URL builders and DOM
+# extractors only read the DOM, so none of them needs the heavy ones. The
+# browser_use agent does, run_agent_on_lease lifts the blocking before it
+# takes over a page
+RESOURCE_PROFILES = {
+    "flight": {"image", "media", "font"},
+    "hotel": {"image", "media", "font"},
+    "youtube": {"image", "media", "font"},
+    "restaurant": {"image", "media", "font"},
+}
+
+TRACKER_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "amazon-adsystem.com",
+    "scorecardresearch.com",
+    "criteo.com",
+    "adnxs.com",
+    "taboola.com",
+    "outbrain.com",
+    "hotjar.com",
+)
+# beacons on sites we do scrape, matched on the URL path
+TRACKER_PATHS = (
+    "youtube.com/api/stats/",
+    "youtube.com/ptracking",
+    "youtube.com/pagead/",
+    "google.com/gen_204",
+    "google.com/log?",
+)
+
+# aborted requests are never downloaded, so their size is estimated from
+# typical sizes per resource type, in bytes
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "tracker": 20_000,
+}
+
+
+def is_tracker(url):
+    host = url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0]
+    if any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS):
+        return True
+    return any(path in url for path in TRACKER_PATHS)
+
+
+async def block_resources(context, profile, trace=None):
+    """Abort the requests `profile` does not need on every page of `context`.
+
+    Blocked requests are counted in /metrics and, with `trace`, added to
+    the task timings as ``blocked_requests`` and ``blocked_bytes_estimate``.
+    Returns whether the context is routed.
+    """
+    blocked_types = RESOURCE_PROFILES.get(profile)
+    if not BLOCK_RESOURCES or blocked_types is None:
+        return False
+
+    async def handle(route):
+        request = route.request
+        if is_tracker(request.url):
+            kind = "tracker"
+        elif request.resource_type in blocked_types:
+            kind = request.resource_type
+        else:
+            await route.continue_()
+            return
+        BLOCKED_REQUESTS.inc(profile=profile, kind=kind)
+        if trace:
+            trace.add("blocked_requests")
+            trace.add("blocked_bytes_estimate", ESTIMATED_BYTES[kind])
+        await route.abort()
+
+    await context.route("**/*", handle)
+    return True
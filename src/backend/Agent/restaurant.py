@@ -1,11 +1,12 @@
-from playwright.async_api import async_playwright
-from browser_use import Agent, Browser, BrowserConfig
 from config.model import model
+from Agent.agent_browser import run_agent_on_lease, find_json, has_fields
+from Agent.browser_pool import get_browser_pool
+from Agent.waits import PageWaiter
 
 def restaurant_scrape_task(preferences, url):
     return f"""You are an assistant helping scrape restaurant data from TripAdvisor.
 
-    1. Go to the following URL: {url}
+    1. The page {url} is already open in the current tab, only go to it if another page is shown.
     2. Use the search bar to look for restaurants that include {preferences['cuisine']} in their cuisine types and click "Find a table".
     3. Filter results based on the following preferences:
         - Rating: {preferences['rating']}
@@ -25,17 +26,19 @@ def restaurant_scrape_task(preferences, url):
     6. Only return one restaurant that best fits the preferences.
     """
 class RestaurantSearchScraper:
+    def __init__(self):
+        self.lease = None
+
     async def start(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=False)
-        self.context = await self.browser.new_context()
+        self.lease = await get_browser_pool().acquire(profile="restaurant")
+        self.context = self.lease.context
         self.page = await self.context.new_page()
+        self.waiter = PageWaiter(self.page, "restaurant")
     
     async def fill_restaurant_search(self, location=None, date=None, time=None, num_people=None):
         try:
             print("Navigating to OpenTable...")
             await self.page.goto("https://www.opentable.com/")
-            await self.page.wait_for_timeout(2000)
 
             if date:
                 print("Selecting date...")
@@ -47,8 +50,10 @@ class RestaurantSearchScraper:
                 date_selector = f'button[aria-label="{date}"]'
                 selected_date_button = await self.page.wait_for_selector(date_selector, timeout=5000)
                 await selected_date_button.click()
-                
-                await self.page.wait_for_timeout(1000)
+                await self.waiter.selector(
+                    "date_picker_closed", '#search-autocomplete-day-picker-wrapper',
+                    timeout=3000, state="hidden", optional=True
+                )
 
             if time:
                 print("Selecting time...")
@@ -59,8 +64,6 @@ class RestaurantSearchScraper:
                     print(f"Time '{time}' selected successfully.")
                 except Exception as e:
                     print(f"Failed to select time '{time}': {str(e)}")
-                
-                await self.page.wait_for_timeout(1000)
 
             if num_people:
                 print("Selecting number of people...")
@@ -75,9 +78,13 @@ class RestaurantSearchScraper:
                 await location_input.click()
                 await location_input.fill(location)
                 await location_input.press("Enter")
-                await self.page.wait_for_timeout(2000)
+                # leaving the home page means the search has started
+                await self.waiter.url(
+                    "search_results", lambda url: url.rstrip("/") != "https://www.opentable.com",
+                    timeout=8000, optional=True
+                )
 
-            await self.page.wait_for_timeout(1000)
+            await self.waiter.network_idle("results_loaded")
             print(f"Final URL: {self.page.url}")
             return self.page.url
 
@@ -86,32 +93,27 @@ class RestaurantSearchScraper:
             return None
     async def close(self):
         try:
-            await self.context.close()
-            await self.browser.close()
-            await self.playwright.stop()
+            if self.lease:
+                await self.lease.release()
         except Exception as e:
             print(f"Error during cleanup: {str(e)}")
 
     
+def restaurant_result_complete(result):
+    """Whether `result` describes a restaurant with its name, rating and address, so the agent can stop."""
+    return any(has_fields(value, "name", "rating", "address") for value in find_json(result))
+
 async def scrape_restaurant(url, preferences):
-    browser = Browser(
-        config=BrowserConfig(
-            chrome_instance_path="C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+    # only the agent reads the results, so the page loads with every resource
+    lease, _ = await get_browser_pool().open_page(url)
+    try:
+        return await run_agent_on_lease(
+            restaurant_scrape_task(preferences, url), model, lease, "restaurant",
+            is_complete=restaurant_result_complete
         )
-    )
-    initial_actions = [
-        {"open_tab": {"url": url}},
-    ]
-    agent = Agent(
-        task=restaurant_scrape_task(preferences, url),
-        llm=model,
-        initial_actions=initial_actions,
-        browser=browser,
-    )
-    history = await agent.run()
-    await browser.close()
-    result = history.final_result()
-    return result
+    finally:
+        # close the context even when the task is cancelled or times out
+        await lease.release()
 async def get_restaurant_url(date, time, num_people, location):
     try:
         scraper = RestaurantSearchScraper()
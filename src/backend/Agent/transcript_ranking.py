@@ -0,0 +1,107 @@
+import os
+import re
+import numpy as np
+
+# transcript lines are grouped into segments of about this many seconds
+SEGMENT_SECONDS = int(os.getenv("YOUTUBE_SEGMENT_SECONDS", 60))
+# BM25 parameters, the usual defaults
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for", "from", "how",
+    "i", "if", "in", "is", "it", "its", "me", "my", "of", "on", "or", "so", "that", "the",
+    "there", "this", "to", "was", "we", "what", "when", "where", "which", "who", "why", "will",
+    "with", "you", "your", "about", "review", "tell", "should", "would", "some", "any",
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _timestamp(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def split_segments(transcripts, segment_seconds=SEGMENT_SECONDS):
+    """Group the lines of each transcript into segments of about `segment_seconds`.
+
+    `transcripts` maps video IDs to youtube_transcript_api line lists.
+    Every segment keeps its video and start time, so an answer can point
+    back to the part of the video it came from.
+    """
+    segments = []
+    for video_number, (video_id, lines) in enumerate(transcripts.items(), start=1):
+        current = None
+        for line in lines:
+            text = " ".join(line.get('text', "").split())
+            if not text:
+                continue
+            start = float(line.get('start', 0))
+            if current is None or start - current['start'] >= segment_seconds:
+                current = {'video': video_number, 'video_id': video_id, 'start': start, 'lines': []}
+                segments.append(current)
+            current['lines'].append(text)
+    return [
+        {
+            'video': segment['video'],
+            'video_id': segment['video_id'],
+            'start': segment['start'],
+            'label': f"[video {segment['video']} @ {_timestamp(segment['start'])}]",
+            'text': " ".join(segment['lines']),
+        }
+        for segment in segments
+    ]
+
+
+def bm25_scores(query, documents):
+    """BM25 score of every document against `query`, as a numpy array.
+
+    Only the query terms are counted, so the term matrix is
+    documents x query terms however large the transcripts are.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not documents:
+        return np.zeros(0)
+    if not terms:
+        return np.zeros(len(documents))
+    index = {term: column for column, term in enumerate(terms)}
+    frequencies = np.zeros((len(documents), len(terms)))
+    lengths = np.zeros(len(documents))
+    for row, document in enumerate(documents):
+        tokens = tokenize(document)
+        lengths[row] = len(tokens)
+        for token in tokens:
+            column = index.get(token)
+            if column is not None:
+                frequencies[row, column] += 1
+
+    document_frequency = (frequencies > 0).sum(axis=0)
+    idf = np.log(1 + (len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+    return (frequencies * (BM25_K1 + 1) / (frequencies + norm[:, None])) @ idf
+
+
+def select_segments(question, segments, top_k, max_chars):
+    """The `top_k` segments most relevant to `question`, within `max_chars` of text.
+
+    The result is back in video and time order so excerpts read naturally.
+    Ties, e.g. a question with no matching words, keep transcript order.
+    """
+    scores = bm25_scores(question, [segment['text'] for segment in segments])
+    chosen = []
+    used = 0
+    for position in np.argsort(-scores, kind="stable"):
+        if len(chosen) >= top_k:
+            break
+        size = len(segments[position]['text'])
+        if used + size > max_chars:
+            continue
+        chosen.append(position)
+        used += size
+    return [segments[position] for position in sorted(chosen)]
@@ -0,0 +1,77 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+from youtube_transcript_api import YouTubeTranscriptApi
+from metrics import TRANSCRIPT_FETCH_SECONDS, current_trace
+from result_cache import create_result_cache
+
+# transcripts are downloaded this many at a time, shared by all YouTube tasks
+TRANSCRIPT_WORKERS = int(os.getenv("TRANSCRIPT_WORKERS", 4))
+
+# a video's transcript does not change, so keep it for a month on disk,
+# trimmed to TRANSCRIPT_CACHE_MAX_DISK_BYTES (200 MB by default)
+transcript_cache = create_result_cache(
+    "transcript",
+    default_ttl=30 * 24 * 3600,
+    default_disk_dir=os.getenv("TRANSCRIPT_CACHE_DIR", "transcript_cache"),
+    default_max_disk_bytes=200 * 1024 * 1024,
+)
+
+_executor = ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS, thread_name_prefix="transcript")
+
+
+class NoTranscriptsError(Exception):
+    """None of the videos had a transcript that could be fetched."""
+
+
+def video_id_from_url(url):
+    """The v= parameter of a watch URL, or the path of a youtu.be link."""
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("youtu.be"):
+        return parsed.path.lstrip("/")
+    ids = parse_qs(parsed.query).get("v")
+    return ids[0] if ids else url.split("v=")[-1].split("&")[0]
+
+
+def fetch_transcript(video_id):
+    """The transcript segments of one video, from the cache when possible."""
+    cached = transcript_cache.get(video_id)
+    if cached is not None:
+        return cached[0]
+    started = time.monotonic()
+    try:
+        # plain {text, start, duration} dicts, as the cache stores JSON
+        transcript = YouTubeTranscriptApi().fetch(video_id).to_raw_data()
+    except Exception:
+        TRANSCRIPT_FETCH_SECONDS.observe(time.monotonic() - started, outcome="error")
+        raise
+    TRANSCRIPT_FETCH_SECONDS.observe(time.monotonic() - started, outcome="ok")
+    transcript_cache.set(video_id, transcript)
+    return transcript
+
+
+def fetch_transcripts(urls):
+    """Fetch the transcripts of `urls` concurrently, as {video_id: lines} in the order given.
+
+    A video without a transcript is skipped instead of failing the others;
+    NoTranscriptsError is raised only when none could be fetched.
+    """
+    video_ids = list(dict.fromkeys(video_id_from_url(url) for url in urls))
+    futures = [(video_id, _executor.submit(fetch_transcript, video_id)) for video_id in video_ids]
+    transcripts = {}
+    failed = []
+    for video_id, future in futures:
+        try:
+            transcripts[video_id] = future.result()
+        except Exception as e:
+            print(f"No transcript for video {video_id}: {str(e)}")
+            failed.append(video_id)
+
+    trace = current_trace()
+    if trace:
+        trace.add("transcripts_fetched", len(transcripts))
+        trace.add("transcripts_failed", len(failed))
+    if not transcripts:
+        raise NoTranscriptsError(f"No transcript could be fetched for videos {', '.join(failed)}")
+    return transcripts
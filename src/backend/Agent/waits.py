@@ -0,0 +1,57 @@
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from metrics import PAGE_WAIT_SECONDS, current_trace
+
+
+class PageWaiter:
+    """Waits on concrete page conditions instead of fixed sleeps.
+
+    Every wait is named by `step` and timed into /metrics and the task
+    timings, so slow steps are visible. A wait that times out raises
+    Playwright's TimeoutError, or returns None with ``optional=True`` for
+    conditions the scraper can do without.
+    """
+
+    def __init__(self, page, scraper):
+        self.page = page
+        self.scraper = scraper
+
+    async def selector(self, step, selector, timeout=5000, state="visible", optional=False):
+        """Wait until `selector` reaches `state` and return the element handle."""
+        return await self._timed(
+            step, optional,
+            self.page.wait_for_selector(selector, timeout=timeout, state=state)
+        )
+
+    async def url(self, step, predicate, timeout=5000, optional=False):
+        """Wait until the page URL matches `predicate` (a glob, regex or callable)."""
+        await self._timed(step, optional, self.page.wait_for_url(predicate, timeout=timeout))
+        return self.page.url
+
+    async def network_idle(self, step, timeout=3000, optional=True):
+        """Wait until no requests are in flight for 500 ms. Busy pages rarely get there, so optional by default."""
+        return await self._timed(step, optional, self.page.wait_for_load_state("networkidle", timeout=timeout))
+
+    async def function(self, step, expression, arg=None, timeout=5000, optional=False):
+        """Wait until the JavaScript `expression` returns a truthy value."""
+        return await self._timed(
+            step, optional,
+            self.page.wait_for_function(expression, arg=arg, timeout=timeout)
+        )
+
+    async def _timed(self, step, optional, waiting):
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            return await waiting
+        except PlaywrightTimeoutError:
+            outcome = "timeout"
+            if optional:
+                return None
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            PAGE_WAIT_SECONDS.observe(elapsed, scraper=self.scraper, step=step, outcome=outcome)
+            trace = current_trace()
+            if trace:
+                trace.record_wait(f"{self.scraper}.{step}", elapsed)
@@ -1,16 +1,33 @@
-from playwright.async_api import async_playwright
 from langchain_community.document_loaders import YoutubeLoader
 import asyncio
-from youtube_transcript_api import YouTubeTranscriptApi
+import os
 from config.model import model
+from llm_cache import invoke_cached
+from Agent.browser_pool import get_browser_pool
+from Agent.waits import PageWaiter
+from Agent.youtube_search import search_videos
+from Agent.transcripts import fetch_transcripts
+from Agent.transcript_ranking import select_segments, split_segments
+from metrics import EXTRACTIONS, current_trace, time_stage
+import requests
+
+# at most this many transcript segments, and characters of transcript, reach the LLM
+YOUTUBE_TOP_SEGMENTS = int(os.getenv("YOUTUBE_TOP_SEGMENTS", 12))
+YOUTUBE_MAX_CONTEXT_CHARS = int(os.getenv("YOUTUBE_MAX_CONTEXT_CHARS", 24000))
+# segments condensed per map call, and map calls in flight at once
+YOUTUBE_SEGMENTS_PER_CALL = int(os.getenv("YOUTUBE_SEGMENTS_PER_CALL", 4))
+YOUTUBE_MAP_CONCURRENCY = int(os.getenv("YOUTUBE_MAP_CONCURRENCY", 3))
 # Gán API key trực tiếp
 
 class YoutubeSearchScraper:
+    def __init__(self):
+        self.lease = None
+
     async def start(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=False)
-        self.context = await self.browser.new_context()
+        self.lease = await get_browser_pool().acquire(profile="youtube")
+        self.context = self.lease.context
         self.page = await self.context.new_page()
+        self.waiter = PageWaiter(self.page, "youtube")
 
     async def fill_youtube_search(self, title):
         try:
@@ -19,12 +36,12 @@ class YoutubeSearchScraper:
             await self.page.goto(url)
 
             # Update the selector to match the actual search input field
-            search_input = await self.page.wait_for_selector(
-                'input.ytSearchboxComponentInput', timeout=10000
+            search_input = await self.waiter.selector(
+                "search_box", 'input.ytSearchboxComponentInput', timeout=10000
             )
             await search_input.fill(title)
             await search_input.press("Enter")  # Perform search
-            await self.page.wait_for_timeout(5000)  # Wait for results to load
+            await self.waiter.selector("results", 'ytd-video-renderer a#thumbnail', timeout=10000)
 
             # Extract links of the first 3 videos
             video_links = []
@@ -45,9 +62,8 @@ class YoutubeSearchScraper:
 
     async def close(self):
         try:
-            await self.context.close()
-            await self.browser.close()
-            await self.playwright.stop()
+            if self.lease:
+                await self.lease.release()
         except Exception as e:
             print(f"Error during cleanup: {str(e)}")
 def get_title(user_input):
@@ -61,10 +77,29 @@ def get_title(user_input):
 
     Provide a clear and descriptive title:
     """
-    title = model.invoke(prompt).content
+    title = invoke_cached(model, prompt, "youtube_title").content
     return title
 
 async def get_youtube_urls(title):
+    """Links of the first 3 videos for `title`.
+
+    Read from the results page's ytInitialData with one HTTP request. The
+    browser scraper is only used when that fails.
+    """
+    query = title.strip().strip('"*').strip()
+    try:
+        videos = await asyncio.to_thread(search_videos, query)
+        if videos:
+            EXTRACTIONS.inc(extractor="youtube", outcome="success")
+            print("Found videos:", [(video['title'], video['duration']) for video in videos])
+            return [video['url'] for video in videos]
+        print("No videos in the YouTube results payload, searching in a browser...")
+    except (requests.RequestException, ValueError) as e:
+        print(f"YouTube HTTP search failed, searching in a browser: {str(e)}")
+    EXTRACTIONS.inc(extractor="youtube", outcome="fallback")
+    return await search_youtube_in_browser(query)
+
+async def search_youtube_in_browser(title):
     scraper = YoutubeSearchScraper()
     try:
         await scraper.start()
@@ -76,15 +111,22 @@ async def get_youtube_urls(title):
 
 
 def get_content(urls):
-    content = []
-    for url in urls:
-        video_id = url.split("v=")[-1]
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        content.append(transcript)
-    return " ".join([item['text'] for transcript in content for item in transcript])
-
-def get_response(user_input, content):
-    prompt = f"""
+    """The transcripts of `urls`, split into time-stamped segments."""
+    return split_segments(fetch_transcripts(urls))
+
+ANSWER_GUIDELINES = """
+    Guidelines for your response:
+    - Start with a brief summary of the content relevant to the user's question.
+    - Highlight key points, such as specific locations, features, or experiences mentioned in the content.
+    - Provide additional context or insights if applicable.
+    - Conclude with actionable advice or recommendations if relevant.
+"""
+
+def _excerpts(segments):
+    return "\n".join(f"{segment['label']} {segment['text']}" for segment in segments)
+
+def _answer_prompt(user_input, content):
+    return f"""
     You are a highly knowledgeable and detail-oriented travel review assistant. Your task is to provide a comprehensive and insightful response to the user's question based on the following YouTube content. Ensure your response is well-structured, includes relevant details, and addresses the user's query thoroughly.
 
     YouTube Content:
@@ -92,17 +134,58 @@ def get_response(user_input, content):
 
     User Question:
     {user_input}
+    {ANSWER_GUIDELINES}
+    Provide a detailed and helpful response:
+    """
 
-    Guidelines for your response:
-    - Start with a brief summary of the content relevant to the user's question.
-    - Highlight key points, such as specific locations, features, or experiences mentioned in the content.
-    - Provide additional context or insights if applicable.
-    - Conclude with actionable advice or recommendations if relevant.
+def _map_prompt(user_input, segments):
+    return f"""
+    You are helping answer a travel question from YouTube video transcripts.
+    From the excerpts below, write down only the facts, places, prices, tips and opinions that help answer the question,
+    as short bullet points. Keep the [video @ time] label of each fact. Reply NONE if nothing is relevant.
 
-    Provide a detailed and helpful response:
+    Excerpts:
+    {_excerpts(segments)}
+
+    User Question:
+    {user_input}
+    """
+
+def get_response(user_input, segments):
+    """Answer `user_input` from the transcript segments most relevant to it.
+
+    Segments are ranked with BM25 and only the best ones, capped by
+    YOUTUBE_TOP_SEGMENTS and YOUTUBE_MAX_CONTEXT_CHARS, are used. When they
+    fit in one call they are answered directly; otherwise each group is
+    condensed into notes in parallel and the notes are answered in one
+    short final call.
     """
-    response = model.invoke(prompt).content
-    return response
+    selected = select_segments(user_input, segments, YOUTUBE_TOP_SEGMENTS, YOUTUBE_MAX_CONTEXT_CHARS)
+    trace = current_trace()
+    if trace:
+        trace.add("transcript_segments", len(segments))
+        trace.add("transcript_segments_used", len(selected))
+        trace.add("transcript_context_chars", sum(len(segment['text']) for segment in selected))
+
+    if len(selected) <= YOUTUBE_SEGMENTS_PER_CALL:
+        return model.invoke(_answer_prompt(user_input, _excerpts(selected))).content
+
+    groups = [
+        selected[i:i + YOUTUBE_SEGMENTS_PER_CALL]
+        for i in range(0, len(selected), YOUTUBE_SEGMENTS_PER_CALL)
+    ]
+    with time_stage("summarizing_segments"):
+        summaries = model.batch(
+            [_map_prompt(user_input, group) for group in groups],
+            config={'max_concurrency': YOUTUBE_MAP_CONCURRENCY}
+        )
+    notes = [
+        summary.content.strip() for summary in summaries
+        if summary.content.strip() and summary.content.strip().upper() != "NONE"
+    ]
+    # no group had anything relevant: answer from the first excerpts that fit one call
+    content = "\n\n".join(notes) if notes else _excerpts(selected[:YOUTUBE_SEGMENTS_PER_CALL])
+    return model.invoke(_answer_prompt(user_input, content)).content
 
 # if __name__ == "__main__":
 #     user_input = "Review about the Le Bernardin restaurant"
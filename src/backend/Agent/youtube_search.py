@@ -0,0 +1,97 @@
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+YOUTUBE_SEARCH_URL = "https://www.youtube.com/results"
+INITIAL_DATA_MARKERS = ("var ytInitialData = ", 'window["ytInitialData"] = ')
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One shared Session, so searches reuse pooled keep-alive connections to YouTube."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503))
+            session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=16, max_retries=retries))
+            session.headers.update(HEADERS)
+            # skip the EU cookie consent page
+            session.cookies.set("CONSENT", "YES+1", domain=".youtube.com")
+            _session = session
+        return _session
+
+
+def extract_initial_data(html):
+    """Return the ytInitialData object embedded in a YouTube page."""
+    for marker in INITIAL_DATA_MARKERS:
+        start = html.find(marker)
+        if start != -1:
+            data, _ = json.JSONDecoder().raw_decode(html, start + len(marker))
+            return data
+    raise ValueError("No ytInitialData found in the page")
+
+
+def _text(field):
+    if not field:
+        return None
+    if "simpleText" in field:
+        return field["simpleText"]
+    return "".join(run.get("text", "") for run in field.get("runs", [])) or None
+
+
+def _video_renderers(node):
+    if isinstance(node, dict):
+        if "videoRenderer" in node:
+            yield node["videoRenderer"]
+        for value in node.values():
+            yield from _video_renderers(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _video_renderers(value)
+
+
+def parse_video_results(data):
+    """List the videos of a search results ytInitialData, in page order.
+
+    Live streams, which have no duration, are skipped.
+    """
+    videos = []
+    seen = set()
+    for renderer in _video_renderers(data):
+        video_id = renderer.get("videoId")
+        duration = _text(renderer.get("lengthText"))
+        if not video_id or not duration or video_id in seen:
+            continue
+        seen.add(video_id)
+        videos.append({
+            'video_id': video_id,
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'title': _text(renderer.get("title")),
+            'duration': duration,
+            'views': _text(renderer.get("viewCountText")),
+            'channel': _text(renderer.get("ownerText")),
+        })
+    return videos
+
+
+def search_videos(query, limit=3, timeout=10):
+    """Search YouTube with one HTTP request and return the first `limit` videos."""
+    response = get_session().get(
+        YOUTUBE_SEARCH_URL,
+        params={'search_query': query, 'hl': 'en'},
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return parse_video_results(extract_initial_data(response.text))[:limit]
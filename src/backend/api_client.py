@@ -1,11 +1,26 @@
 import requests
+import json
 import time
 
+# how long the server may hold a long-poll request, in seconds
+LONG_POLL_SECONDS = 30
+# the server sends a keep-alive at least every 15 s, so a silent stream is dead
+EVENT_READ_TIMEOUT = 45
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+
 class TravelAPIClient():
     def __init__(self, base_url="http://localhost:5000"):
         self.base_url = base_url
     
-    def search_flights(self, origin, destination, start_date, end_date, preferences):
+    def _cache_options(self, no_cache, max_age):
+        options = {}
+        if no_cache:
+            options["no_cache"] = True
+        if max_age is not None:
+            options["max_age"] = max_age
+        return options
+
+    def search_flights(self, origin, destination, start_date, end_date, preferences, no_cache=False, max_age=None):
         # gửi json cho server (hàm search_flight trong app_fast)
         response = requests.post(
             f"{self.base_url}/search_flights",
@@ -14,26 +29,55 @@ class TravelAPIClient():
                 "destination": destination,
                 "start_date": start_date,
                 "end_date": end_date,
-                "preferences": preferences
+                "preferences": preferences,
+                **self._cache_options(no_cache, max_age)
             }
         )
         if response.status_code != 200:
             raise Exception(f"Failed to search flights: {response.text}")
         return response
 
-    def search_hotels(self, location, check_in, check_out, preferences):
+    def search_flights_grid(self, origin, destination, start_date, end_date, preferences, window=1, max_concurrency=None):
+        payload = {
+            "origin": origin,
+            "destination": destination,
+            "start_date": start_date,
+            "end_date": end_date,
+            "preferences": preferences,
+            "window": window
+        }
+        if max_concurrency is not None:
+            payload["max_concurrency"] = max_concurrency
+        response = requests.post(f"{self.base_url}/search_flights_grid", json=payload)
+        if response.status_code != 200:
+            raise Exception(f"Failed to search flight dates: {response.text}")
+        return response
+
+    def search_hotels(self, location, check_in, check_out, preferences, no_cache=False, max_age=None):
         response = requests.post(
             f"{self.base_url}/search_hotels",
             json={
                 "location": location,
                 "check_in": check_in,
                 "check_out": check_out,
-                "preferences": preferences
+                "preferences": preferences,
+                **self._cache_options(no_cache, max_age)
             }
         )
         if response.status_code != 200:
             raise Exception(f"Failed to search hotels: {response.text}")
         return response
+    def search_trip(self, requirements):
+        response = requests.post(
+            f"{self.base_url}/search_trip",
+            json={
+                "requirements": requirements,
+            }
+        )
+        if response.status_code != 200:
+            raise Exception(f"Failed to search trip: {response.text}")
+        return response
+
     def search_youtube(self, user_input):
         response = requests.post(
             f"{self.base_url}/search_youtube",
@@ -45,31 +89,96 @@ class TravelAPIClient():
             raise Exception(f"Failed to search youtube: {response.text}")
         return response
     
-    def poll_task_status(self, task_id, task_type, progress_container):
+    def cancel_task(self, task_id):
+        """Ask the server to stop a task nobody is waiting for anymore."""
+        try:
+            requests.delete(f"{self.base_url}/task/{task_id}", timeout=5)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to cancel task {task_id}: {str(e)}")
+
+    def _stream_task_events(self, task_id):
+        """Yield (event, record) pairs pushed by the server until the stream ends."""
+        with requests.get(
+            f"{self.base_url}/task_events/{task_id}",
+            stream=True,
+            timeout=(5, EVENT_READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            event, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                elif not line and data:
+                    yield event, json.loads("\n".join(data))
+                    event, data = None, []
+
+    def _report_stage(self, record, last_stage, progress_container):
+        stage = record.get("stage")
+        if stage and stage != last_stage:
+            progress_container.write(f" - {stage.replace('_', ' ').capitalize()}...")
+        return stage or last_stage
+
+    def poll_task_status(self, task_id, task_type, progress_container, on_update=None):
         """Theo dõi tiến trình cuả task bất đồng bộ
-            Liên tục hỏi sẻver cho tới khi có kqua hoặc thất bại"""
-        
-        while True:
+            Nghe luồng sự kiện (SSE) từ server, nếu luồng bị ngắt thì long-poll
+            cho tới khi có kqua hoặc thất bại.
+            on_update(record) được gọi mỗi khi task thay đổi, vd để hiện kết quả từng phần
+            Nếu người dùng bỏ ngang (Streamlit dừng/chạy lại script) thì huỷ task trên server"""
+        try:
+            return self._wait_for_task(task_id, task_type, progress_container, on_update)
+        except BaseException:
+            # Streamlit stops a rerun by raising inside the script thread
+            self.cancel_task(task_id)
+            raise
+
+    def _wait_for_task(self, task_id, task_type, progress_container, on_update=None):
+        record = None
+        last_stage = None
+        try:
+            for event, record in self._stream_task_events(task_id):
+                if event == "error":
+                    progress_container.error(f"Failed to get {task_type} search status: {record.get('error')}")
+                    return None
+                last_stage = self._report_stage(record, last_stage, progress_container)
+                if on_update:
+                    on_update(record)
+                if record.get("status") in FINISHED_STATUSES:
+                    break
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Event stream unavailable, falling back to long-polling: {str(e)}")
+
+        while record is None or record.get("status") not in FINISHED_STATUSES:
             try:
-                response = requests.get(f"{self.base_url}/task_status/{task_id}")
-                if response.status_code == 200:
-                    result = response.json()
-                    status = result.get("status")
-                    
-                    if status == "completed":
-                        progress_container.success(f"{task_type.capitalize()} search completed!")
-                        return result.get("data")
-                    elif status == "failed":
-                        error_msg = result.get('error', 'Unknown error')
-                        progress_container.error(f"{task_type.capitalize()} search failed: {error_msg}")
-                        return None
-                    
-                    time.sleep(2)
-                else:
+                params = {"wait": LONG_POLL_SECONDS}
+                if record and "version" in record:
+                    params["version"] = record["version"]
+                response = requests.get(
+                    f"{self.base_url}/task_status/{task_id}",
+                    params=params,
+                    timeout=LONG_POLL_SECONDS + 10
+                )
+                if response.status_code != 200:
                     progress_container.error(f"Failed to get {task_type} search status: {response.text}")
                     return None
+                record = response.json()
+                last_stage = self._report_stage(record, last_stage, progress_container)
+                if on_update:
+                    on_update(record)
+                if "version" not in record:
+                    # server without long-poll support answers immediately
+                    time.sleep(2)
             except requests.exceptions.RequestException as e:
                 progress_container.error(f"Network error while polling {task_type} status: {str(e)}")
                 return None
 
-    
\ No newline at end of file
+        if record.get("status") == "completed":
+            progress_container.success(f"{task_type.capitalize()} search completed!")
+            return record.get("data")
+        if record.get("status") == "timed_out":
+            progress_container.error(f"{task_type.capitalize()} search took too long and was stopped.")
+            return None
+        error_msg = record.get('error', 'Unknown error')
+        progress_container.error(f"{task_type.capitalize()} search failed: {error_msg}")
+        return None
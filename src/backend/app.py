@@ -1,120 +1,577 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from Agent.flight import get_flight_url, scrape_flights
 from Agent.hotels import get_hotel_url, scrape_hotels
 from Agent.youtube import get_title, get_youtube_urls, get_content, get_response
-from enum import Enum
-from collections import defaultdict
+from Agent.transcripts import transcript_cache
+from user_input_summary import get_trip_details
+from scheduler import create_scheduler, QueueFullError
+from engine import AsyncEngine
+from singleflight import SingleFlight, make_request_key
+from result_cache import create_result_cache
+from llm_cache import llm_cache
+from flight_grid import FlightGrid
+from Agent.dates import format_flight_date
+from Agent.browser_pool import get_browser_pool, browser_pool_stats
+from task_store import TaskStatus, TERMINAL_STATUSES, create_task_store
+from metrics import REGISTRY, CallbackMetric, task_trace, time_stage
 from waitress import serve
 import requests
 import asyncio
-import uuid
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
 import threading
+import time
+import uuid
+import json
+import os
 
 app = Flask(__name__)
 
-# in-memory storage
-task_results = defaultdict(dict)
-# lock for thread-safe
-task_lock = threading.Lock()
-
-class TaskStatus(Enum):
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-
-loop = asyncio.new_event_loop()
-asyncio.set_event_loop(loop)
-
-def run_async(coro):
-    return loop.run_until_complete(coro)
-
-def update_task_status(task_id, status, data=None, error=None):
-    with task_lock:
-        if data is not None:
-            task_results[task_id].update({
-                'status': status,
-                'data': data
-            })
-        elif error is not None:
-            task_results[task_id].update({
-                'status': status,
-                'error': error
-            })
-        else:
-            task_results[task_id]['status'] = status
+# task records, in memory by default or SQLite via TASK_STORE_BACKEND
+task_store = create_task_store()
+# bounded worker pools, one per search type
+scheduler = create_scheduler()
+# identical in-flight searches share one task
+singleflight = SingleFlight()
+# finished scrapes, keyed like singleflight; prices go stale faster for flights
+flight_cache = create_result_cache("flight", default_ttl=900)
+hotel_cache = create_result_cache("hotel", default_ttl=1800)
 
-def process_flight_search(task_id, origin, destination, start_date, end_date, preferences):
-    try:
-        update_task_status(task_id, TaskStatus.PROCESSING.value)
-        print(f"Start date: {start_date}")
-        url = run_async(get_flight_url(origin, destination, start_date, end_date))
+# upper bound for ?wait= on /task_status, in seconds
+MAX_WAIT_SECONDS = 60
+# SSE keep-alive interval, in seconds
+EVENT_KEEPALIVE_SECONDS = 15
+# widest ±days window accepted by /search_flights_grid
+GRID_MAX_WINDOW = int(os.getenv("GRID_MAX_WINDOW", 3))
+# deadline per task type in seconds, after which the task is TIMED_OUT
+TASK_TIMEOUTS = {
+    "flight": int(os.getenv("FLIGHT_TIMEOUT", 600)),
+    "hotel": int(os.getenv("HOTEL_TIMEOUT", 600)),
+    "youtube": int(os.getenv("YOUTUBE_TIMEOUT", 300)),
+    "grid": int(os.getenv("GRID_TIMEOUT", 3600)),
+    "trip": int(os.getenv("TRIP_TIMEOUT", 600)),
+}
 
-        if not url:
-            raise Exception("Failed to generate flight search URL")
-        
-        flight_results = run_async(scrape_flights(url, preferences))
+# one event loop thread shared by every worker, see engine.py
+engine = AsyncEngine()
 
-        update_task_status(
-            task_id, 
-            TaskStatus.COMPLETED.value,
-            data=flight_results
-        )
+# values kept by the components above, read when /metrics is scraped
+result_caches = {'flight': flight_cache, 'hotel': hotel_cache, 'transcript': transcript_cache}
+REGISTRY.register(CallbackMetric(
+    "travel_queue_depth", "Jobs waiting per worker pool",
+    lambda: [({'pool': name}, stats['queued']) for name, stats in scheduler.stats().items()]
+))
+REGISTRY.register(CallbackMetric(
+    "travel_running_jobs", "Jobs running per worker pool",
+    lambda: [({'pool': name}, stats['running']) for name, stats in scheduler.stats().items()]
+))
+REGISTRY.register(CallbackMetric(
+    "travel_cache_lookups_total", "Result cache lookups by cache and outcome",
+    lambda: [
+        ({'cache': name, 'outcome': outcome}, cache.stats()[outcome])
+        for name, cache in result_caches.items()
+        for outcome in ('memory_hits', 'disk_hits', 'misses')
+    ],
+    type="counter"
+))
+REGISTRY.register(CallbackMetric(
+    "travel_cache_hit_rate", "Share of result cache lookups answered from the cache",
+    lambda: [({'cache': name}, cache.stats()['hit_rate']) for name, cache in result_caches.items()]
+))
+REGISTRY.register(CallbackMetric(
+    "travel_browser_pool_contexts", "Browser contexts in use on pooled browsers",
+    lambda: [({}, sum(stats['active_contexts'] for stats in browser_pool_stats()))]
+))
+REGISTRY.register(CallbackMetric(
+    "travel_task_store_entries", "Task records held by the task store",
+    lambda: [({}, task_store.stats()['entries'])]
+))
+REGISTRY.register(CallbackMetric(
+    "travel_singleflight_requests_total", "Searches started or attached to an identical in-flight search",
+    lambda: [({'outcome': name}, value) for name, value in singleflight.stats().items() if name != 'in_flight'],
+    type="counter"
+))
+
+async def warm_browser_pool():
+    """Launch the pooled browsers before the first search needs them."""
+    try:
+        await get_browser_pool().warm()
     except Exception as e:
-        print(f"Error in flight search task: {str(e)}")
-        update_task_status(
-            task_id,
-            TaskStatus.FAILED.value,
-            error=str(e)
-        )
-    
-def process_hotel_search(task_id, location, check_in, check_out, preferences):
-    try: 
-        update_task_status(task_id, TaskStatus.PROCESSING.value)
+        print(f"Could not pre-launch browsers: {str(e)}")
 
-        url = run_async(get_hotel_url(location, check_in, check_out))
+def task_deadline(kind):
+    return time.monotonic() + TASK_TIMEOUTS[kind]
 
-        if not url:
-            raise Exception("Failed to generate hotel search URL")
+def run_async(coro, task_id=None, deadline=None):
+    """Run `coro` on the engine loop.
 
-        hotel_results = run_async(scrape_hotels(url, preferences))
+    With `task_id` the coroutine stops when the task is cancelled. With
+    `deadline` (a time.monotonic() value) it is cancelled once the
+    deadline passes and TimeoutError is raised.
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            coro.close()
+            raise TimeoutError("Task deadline exceeded")
+    return engine.run(coro, timeout=timeout, task_id=task_id)
 
-        update_task_status(
-            task_id,
-            TaskStatus.COMPLETED.value,
-            data = hotel_results
-        )
-    except Exception as e:
-        print(f"Error in hotel search task: {str(e)}")
+def task_cancelled(task_id):
+    """True once the task is cancelled, here or through another process sharing the store."""
+    if engine.is_cancelled(task_id):
+        return True
+    record = task_store.get(task_id)
+    return record is not None and record.get('status') == TaskStatus.CANCELLED.value
+
+def check_deadline(task_id, deadline):
+    """Stop between synchronous steps once the task is cancelled or out of time."""
+    if task_cancelled(task_id):
+        raise CancelledError()
+    if time.monotonic() > deadline:
+        raise TimeoutError("Task deadline exceeded")
+
+def update_task_status(task_id, status, data=None, error=None, trace=None):
+    """Write the status to the task and to every request aliased to it.
+
+    With `trace` the stage timings so far are stored under ``timings``.
+    """
+    if engine.is_cancelled(task_id) and status != TaskStatus.CANCELLED.value:
+        # a late write from the worker must not resurrect a cancelled task
+        return
+    fields = {'status': status}
+    if data is not None:
+        fields['data'] = data
+    elif error is not None:
+        fields['error'] = error
+    if trace is not None:
+        trace.status = status
+        fields['timings'] = trace.as_dict()
+    singleflight.publish(
+        task_id,
+        lambda tid: task_store.update(tid, **fields),
+        final=status in TERMINAL_STATUSES
+    )
+
+def set_task_stage(task_id, stage):
+    """Publish progress inside the PROCESSING state, e.g. 'building_url' or 'scraping'."""
+    if engine.is_cancelled(task_id):
+        return
+    singleflight.publish(task_id, lambda tid: task_store.update(tid, stage=stage))
+
+@contextmanager
+def task_stage(task_id, stage):
+    """Publish `stage` and time the block in the task's timings and /metrics.
+
+    Raises CancelledError instead when the task was cancelled in the meantime.
+    """
+    if task_cancelled(task_id):
+        raise CancelledError()
+    set_task_stage(task_id, stage)
+    with time_stage(stage):
+        yield
+
+def fail_task(task_id, e, label, trace=None):
+    """Record why a task stopped early: cancelled, timed out or failed."""
+    if isinstance(e, CancelledError) or engine.is_cancelled(task_id):
+        print(f"{label.capitalize()} task {task_id} was cancelled")
+        update_task_status(task_id, TaskStatus.CANCELLED.value, error="Task was cancelled", trace=trace)
+    elif isinstance(e, TimeoutError):
+        print(f"{label.capitalize()} task {task_id} timed out")
+        update_task_status(task_id, TaskStatus.TIMED_OUT.value, error="Task exceeded its deadline", trace=trace)
+    else:
+        print(f"Error in {label} task: {str(e)}")
         update_task_status(
             task_id,
             TaskStatus.FAILED.value,
-            error=str(e)
+            error=str(e),
+            trace=trace
         )
+
+def parse_int_param(value):
+    """Return `value` as an int when it is a whole number (or its string form), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+def cached_task_response(cache, key, data):
+    """Answer from `cache` with an already COMPLETED task, or return None.
+
+    The request body may set ``no_cache`` to skip the lookup or
+    ``max_age`` (seconds) to only accept fresher results. An invalid
+    ``max_age`` is answered with a 400 response.
+    """
+    if data.get('no_cache'):
+        return None
+    max_age = data.get('max_age')
+    if max_age is not None:
+        try:
+            max_age = float(max_age)
+        except (TypeError, ValueError):
+            max_age = None
+        if max_age is None or not max_age >= 0:
+            return jsonify({
+                'error': 'max_age must be a number of seconds, 0 or greater'
+            }), 400
+    cached = cache.get(key, max_age=max_age)
+    if cached is None:
+        return None
+    result, age = cached
+    task_id = str(uuid.uuid4())
+    task_store.create(task_id, {
+        'status': TaskStatus.COMPLETED.value,
+        'data': result,
+        'cached': True,
+        'cache_age': round(age, 1)
+    })
+    return jsonify({
+        'task_id': task_id,
+        'status': TaskStatus.COMPLETED.value,
+        'cached': True
+    })
+
+def enqueue_task(kind, fn, *args, key=None):
+    """Register a PENDING task and queue it on the worker pool for `kind`.
+
+    When `key` matches a search that is already in flight, no new work is
+    queued: the new task_id is aliased to the running task and receives
+    all of its updates.
+    """
+    task_id = str(uuid.uuid4())
+    if key is not None:
+        def create_alias(primary_id):
+            record = task_store.get(primary_id) or {'status': TaskStatus.PENDING.value}
+            task_store.create(task_id, dict(record, alias_of=primary_id))
+
+        primary_id = singleflight.attach(key, task_id, create_alias)
+        if primary_id is not None:
+            return jsonify({
+                'task_id': task_id,
+                'status': task_store.get(task_id)['status'],
+                'alias_of': primary_id
+            })
+
+    task_store.create(task_id, {'status': TaskStatus.PENDING.value})
+    try:
+        position = scheduler.submit(kind, task_id, fn, *args)
+    except QueueFullError as e:
+        singleflight.release(task_id)
+        task_store.delete(task_id)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    return jsonify({
+        'task_id': task_id,
+        'status': TaskStatus.PENDING.value,
+        'queue_position': position
+    })
+
+def submit_when_possible(kind, job_id, fn, *args):
+    """Submit an internal job, waiting for room instead of failing on a full queue."""
+    while True:
+        try:
+            return scheduler.submit(kind, job_id, fn, *args)
+        except QueueFullError as e:
+            time.sleep(min(e.retry_after, 5))
+
+def process_flight_search(task_id, origin, destination, start_date, end_date, preferences, cache_key=None):
+    deadline = task_deadline("flight")
+    with task_trace("flight") as trace:
+        try:
+            update_task_status(task_id, TaskStatus.PROCESSING.value)
+            print(f"Start date: {start_date}")
+            with task_stage(task_id, "building_url"):
+                url = run_async(get_flight_url(origin, destination, start_date, end_date, preferences), task_id, deadline)
+
+            if not url:
+                raise Exception("Failed to generate flight search URL")
+
+            with task_stage(task_id, "scraping"):
+                flight_results = run_async(scrape_flights(url, preferences), task_id, deadline)
+            if cache_key and flight_results:
+                flight_cache.set(cache_key, flight_results)
+
+            update_task_status(
+                task_id,
+                TaskStatus.COMPLETED.value,
+                data=flight_results,
+                trace=trace
+            )
+        except Exception as e:
+            fail_task(task_id, e, "flight search", trace)
+        finally:
+            engine.forget(task_id)
+
+def process_hotel_search(task_id, location, check_in, check_out, preferences, cache_key=None):
+    deadline = task_deadline("hotel")
+    with task_trace("hotel") as trace:
+        try:
+            update_task_status(task_id, TaskStatus.PROCESSING.value)
+
+            with task_stage(task_id, "building_url"):
+                url = run_async(get_hotel_url(location, check_in, check_out, preferences), task_id, deadline)
+
+            if not url:
+                raise Exception("Failed to generate hotel search URL")
+
+            with task_stage(task_id, "scraping"):
+                hotel_results = run_async(scrape_hotels(url, preferences), task_id, deadline)
+            if cache_key and hotel_results:
+                hotel_cache.set(cache_key, hotel_results)
+
+            update_task_status(
+                task_id,
+                TaskStatus.COMPLETED.value,
+                data=hotel_results,
+                trace=trace
+            )
+        except Exception as e:
+            fail_task(task_id, e, "hotel search", trace)
+        finally:
+            engine.forget(task_id)
+
 def process_youtube_search(task_id, user_input):
-    try: 
-        update_task_status(task_id, TaskStatus.PROCESSING.value)
-        title = get_title(user_input)
-        urls = asyncio.run(get_youtube_urls(title))
+    deadline = task_deadline("youtube")
+    with task_trace("youtube") as trace:
+        try:
+            update_task_status(task_id, TaskStatus.PROCESSING.value)
+            with task_stage(task_id, "generating_title"):
+                title = get_title(user_input)
+            with task_stage(task_id, "searching_videos"):
+                urls = run_async(get_youtube_urls(title), task_id, deadline)
 
-        if not urls:
-            raise Exception("Failed to generate youtube search URL")
+            if not urls:
+                raise Exception("Failed to generate youtube search URL")
 
-        content = get_content(urls)
-        response = get_response(user_input, content)
-        update_task_status(
-            task_id,
-            TaskStatus.COMPLETED.value,
-            data = response
-        )
+            with task_stage(task_id, "fetching_transcripts"):
+                content = get_content(urls)
+            check_deadline(task_id, deadline)
+            with task_stage(task_id, "answering"):
+                response = get_response(user_input, content)
+            update_task_status(
+                task_id,
+                TaskStatus.COMPLETED.value,
+                data=response,
+                trace=trace
+            )
+        except Exception as e:
+            fail_task(task_id, e, "youtube search", trace)
+        finally:
+            engine.forget(task_id)
+
+def run_grid_cell(job_id, grid_task_id, grid_deadline, grid, origin, destination, outbound, inbound, preferences, on_done):
+    """Search one date combination of a grid on a flight worker.
+
+    The cell runs under the grid's task_id, so cancelling the grid
+    cancels its cells too.
+    """
+    deadline = min(task_deadline("flight"), grid_deadline)
+    start_date = format_flight_date(outbound)
+    end_date = format_flight_date(inbound)
+    cache_key = make_request_key(
+        "flight",
+        origin=origin,
+        destination=destination,
+        start_date=start_date,
+        end_date=end_date,
+        preferences=preferences
+    )
+    with task_trace("grid_cell") as trace:
+        try:
+            if task_cancelled(grid_task_id):
+                raise CancelledError()
+            cached = flight_cache.get(cache_key)
+            if cached is not None:
+                trace.status = TaskStatus.COMPLETED.value
+                grid.add_result(outbound, inbound, cached[0], cached=True)
+                return
+
+            with time_stage("building_url"):
+                url = run_async(get_flight_url(origin, destination, start_date, end_date, preferences), grid_task_id, deadline)
+            if not url:
+                raise Exception("Failed to generate flight search URL")
+
+            with time_stage("scraping"):
+                flight_results = run_async(scrape_flights(url, preferences), grid_task_id, deadline)
+            if flight_results:
+                flight_cache.set(cache_key, flight_results)
+            trace.status = TaskStatus.COMPLETED.value
+            grid.add_result(outbound, inbound, flight_results)
+        except Exception as e:
+            trace.status = TaskStatus.FAILED.value
+            print(f"Error in flight grid cell {start_date} - {end_date}: {str(e) or type(e).__name__}")
+            grid.add_error(outbound, inbound, str(e) or type(e).__name__)
+        finally:
+            on_done()
+
+def process_flight_grid(task_id, origin, destination, start_date, end_date, preferences, window, max_concurrency):
+    """Fan the date combinations out to the flight pool, at most `max_concurrency` at a time.
+
+    The task data holds the partial price matrix while cells finish.
+    """
+    deadline = task_deadline("grid")
+    with task_trace("grid") as trace:
+        try:
+            update_task_status(task_id, TaskStatus.PROCESSING.value)
+            grid = FlightGrid(start_date, end_date, window)
+            update_task_status(task_id, TaskStatus.PROCESSING.value, data=grid.snapshot())
+
+            slots = threading.Semaphore(max_concurrency)
+            finished = threading.Semaphore(0)
+
+            def on_cell_done():
+                update_task_status(task_id, TaskStatus.PROCESSING.value, data=grid.snapshot())
+                slots.release()
+                finished.release()
+
+            submitted = 0
+            with time_stage("searching_cells"):
+                for i, (outbound, inbound) in enumerate(grid.pairs):
+                    slots.acquire()
+                    if task_cancelled(task_id) or time.monotonic() > deadline:
+                        break
+                    submit_when_possible(
+                        "flight", f"{task_id}:{i}", run_grid_cell,
+                        task_id, deadline, grid, origin, destination, outbound, inbound, preferences, on_cell_done
+                    )
+                    submitted += 1
+                # wait for every submitted cell, even when stopping early
+                for _ in range(submitted):
+                    finished.acquire()
+
+            check_deadline(task_id, deadline)
+            if not grid.completed():
+                raise Exception("None of the date combinations could be searched")
+            update_task_status(task_id, TaskStatus.COMPLETED.value, data=grid.snapshot(), trace=trace)
+        except Exception as e:
+            fail_task(task_id, e, "flight grid", trace)
+        finally:
+            engine.forget(task_id)
+
+def trip_flight_request(details):
+    """The /search_flights parameters of a trip, or None when the trip has no flight."""
+    if not all([details.origin, details.destination, details.start_date, details.end_date]):
+        return None
+    return {
+        'origin': details.origin,
+        'destination': details.destination,
+        'start_date': details.start_date.replace(" 0", " "),
+        'end_date': details.end_date.replace(" 0", " "),
+        'preferences': {
+            "budget": details.budget,
+            "class": details.ticket_class,
+            "airlines": [details.airline] if details.airline else []
+        },
+    }
+
+def trip_hotel_request(details):
+    """The /search_hotels parameters of a trip, or None when the trip has no stay."""
+    location = details.hotel_location or details.destination
+    if not all([location, details.start_date, details.end_date]):
+        return None
+    check_in = details.start_date.replace(" 0", " ")
+    check_out = details.end_date.replace(" 0", " ")
+    return {
+        'location': location,
+        'check_in': check_in,
+        'check_out': check_out,
+        'preferences': {
+            "check_in": check_in,
+            "check_out": check_out,
+            "rating": details.rating,
+            "price": details.price_per_night,
+            "amenities": details.amenities
+        },
+    }
+
+async def search_trip_part(task_id, parts, name, cache, key, build_url, scrape, preferences):
+    """Run one URL -> scrape pipeline of a trip and publish its result as soon as it is ready.
+
+    A failed part is recorded in `parts` and does not stop the other one.
+    """
+    try:
+        cached = cache.get(key)
+        if cached is not None:
+            part = {'status': TaskStatus.COMPLETED.value, 'data': cached[0], 'cached': True}
+        else:
+            with time_stage(f"{name}_building_url"):
+                url = await build_url()
+            if not url:
+                raise Exception(f"Failed to generate {name} search URL")
+            with time_stage(f"{name}_scraping"):
+                results = await scrape(url, preferences)
+            if results:
+                cache.set(key, results)
+            part = {'status': TaskStatus.COMPLETED.value, 'data': results}
     except Exception as e:
-        print(f"Error in youtube search task: {str(e)}")
-        update_task_status(
-            task_id,
-            TaskStatus.FAILED.value,
-            error=str(e)
-        )
-    
+        print(f"Error in trip {name} search: {str(e)}")
+        part = {'status': TaskStatus.FAILED.value, 'error': str(e) or type(e).__name__}
+    # both parts run on the loop thread, so `parts` needs no lock
+    parts[name] = part
+    update_task_status(task_id, TaskStatus.PROCESSING.value, data=dict(parts))
+
+async def search_trip_parts(*parts):
+    await asyncio.gather(*parts)
+
+def process_trip_search(task_id, requirements):
+    """Extract a trip from one request and run its flight and hotel searches concurrently."""
+    deadline = task_deadline("trip")
+    with task_trace("trip") as trace:
+        try:
+            update_task_status(task_id, TaskStatus.PROCESSING.value)
+            with task_stage(task_id, "parsing_request"):
+                details = get_trip_details(requirements)
+            check_deadline(task_id, deadline)
+
+            parts = {'details': details.model_dump()}
+            searches = []
+            flight = trip_flight_request(details)
+            if flight:
+                key = make_request_key("flight", **flight)
+                searches.append(search_trip_part(
+                    task_id, parts, "flight", flight_cache, key,
+                    lambda: get_flight_url(
+                        flight['origin'], flight['destination'], flight['start_date'], flight['end_date'], flight['preferences']
+                    ),
+                    scrape_flights, flight['preferences']
+                ))
+            else:
+                parts['flight'] = {'status': TaskStatus.FAILED.value, 'error': 'Missing origin, destination or dates'}
+            hotel = trip_hotel_request(details)
+            if hotel:
+                key = make_request_key("hotel", **hotel)
+                searches.append(search_trip_part(
+                    task_id, parts, "hotel", hotel_cache, key,
+                    lambda: get_hotel_url(hotel['location'], hotel['check_in'], hotel['check_out'], hotel['preferences']),
+                    scrape_hotels, hotel['preferences']
+                ))
+            else:
+                parts['hotel'] = {'status': TaskStatus.FAILED.value, 'error': 'Missing location or dates'}
+            if not searches:
+                raise Exception("Could not find a flight or a hotel search in the request")
+
+            update_task_status(task_id, TaskStatus.PROCESSING.value, data=dict(parts))
+            with task_stage(task_id, "searching"):
+                run_async(search_trip_parts(*searches), task_id, deadline)
+
+            if not any(parts[name]['status'] == TaskStatus.COMPLETED.value for name in ('flight', 'hotel')):
+                raise Exception("Neither the flight nor the hotel search succeeded")
+            update_task_status(task_id, TaskStatus.COMPLETED.value, data=parts, trace=trace)
+        except Exception as e:
+            fail_task(task_id, e, "trip search", trace)
+        finally:
+            engine.forget(task_id)
+
+
 @app.route('/search_flights', methods=["POST"])
 def search_flights():
     try:
@@ -132,20 +589,70 @@ def search_flights():
                 'error': 'Missing required parameters. Please provide origin, destination, start_date and end_date'
             }), 400
         
-        task_id = str(uuid.uuid4())
-        with task_lock:
-            task_results[task_id] = {'status': TaskStatus.PENDING.value}
-        # tạo luồng mới
-        thread = threading.Thread(
-            target=process_flight_search,
-            args=(task_id, origin, destination, start_date, end_date, preferences),
-            daemon=True # daemon thread tự động dừng luồng khi chương trình chính kết thúc
+        key = make_request_key(
+            "flight",
+            origin=origin,
+            destination=destination,
+            start_date=start_date,
+            end_date=end_date,
+            preferences=preferences
         )
-        thread.start()
+        cached = cached_task_response(flight_cache, key, data)
+        if cached is not None:
+            return cached
+        return enqueue_task("flight", process_flight_search, origin, destination, start_date, end_date, preferences, key, key=key)
+    except Exception as e:
         return jsonify({
-            'task_id': task_id,
-            'status': TaskStatus.PENDING.value
-        })
+            'error': str(e)
+        }), 500
+
+@app.route('/search_flights_grid', methods=["POST"])
+def search_flights_grid():
+    """Search every outbound/return combination within ±window days of the given dates."""
+    try:
+        data = request.get_json()
+
+        origin = data.get('origin')
+        destination = data.get('destination')
+        start_date = data.get('start_date', '').replace(" 0", " ")
+        end_date = data.get('end_date', '').replace(" 0", " ")
+        preferences = data.get('preferences', {})
+
+        if not all([origin, destination, start_date, end_date]):
+            return jsonify({
+                'error': 'Missing required parameters. Please provide origin, destination, start_date and end_date'
+            }), 400
+
+        flight_workers = scheduler.pools["flight"].num_workers
+        window = parse_int_param(data.get('window', 1))
+        if window is None or window < 0:
+            return jsonify({'error': 'window must be a whole number of days, 0 or greater'}), 400
+        max_concurrency = parse_int_param(data.get('max_concurrency', flight_workers))
+        if max_concurrency is None or not 1 <= max_concurrency <= flight_workers:
+            return jsonify({
+                'error': f'max_concurrency must be a whole number between 1 and {flight_workers}'
+            }), 400
+        # wider windows are clamped rather than refused, as before
+        window = min(window, GRID_MAX_WINDOW)
+        try:
+            FlightGrid(start_date, end_date, window)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        key = make_request_key(
+            "flight_grid",
+            origin=origin,
+            destination=destination,
+            start_date=start_date,
+            end_date=end_date,
+            preferences=preferences,
+            window=window
+        )
+        return enqueue_task(
+            "grid", process_flight_grid,
+            origin, destination, start_date, end_date, preferences, window, max_concurrency,
+            key=key
+        )
     except Exception as e:
         return jsonify({
             'error': str(e)
@@ -166,24 +673,45 @@ def search_hotels():
                 'error': 'Missing required parameters. Please provide location, check_in and check_out'
             }), 400
         
-        task_id = str(uuid.uuid4())
-        with task_lock:
-            task_results[task_id] = {'status': TaskStatus.PENDING.value}
-        # tạo luồng mới
-        thread = threading.Thread(
-            target=process_hotel_search,
-            args=(task_id, location, check_in, check_out, preferences),
-            daemon=True # daemon thread tự động dừng luồng khi chương trình chính kết thúc
+        key = make_request_key(
+            "hotel",
+            location=location,
+            check_in=check_in,
+            check_out=check_out,
+            preferences=preferences
         )
-        thread.start()
+        cached = cached_task_response(hotel_cache, key, data)
+        if cached is not None:
+            return cached
+        return enqueue_task("hotel", process_hotel_search, location, check_in, check_out, preferences, key, key=key)
+    except Exception as e:
         return jsonify({
-            'task_id': task_id,
-            'status': TaskStatus.PENDING.value
-        })
+            'error': str(e)
+        }), 500
+@app.route('/search_trip', methods=["POST"])
+def search_trip():
+    """Search the flight and the hotel of a trip described in natural language.
+
+    Both searches run at the same time. The task data holds ``details``
+    (the extracted trip), then ``flight`` and ``hotel`` as each finishes.
+    """
+    try:
+        data = request.get_json()
+
+        requirements = data.get('requirements')
+
+        if not requirements:
+            return jsonify({
+                'error': 'Missing required parameters. Please provide requirements.'
+            }), 400
+
+        key = make_request_key("trip", requirements=requirements)
+        return enqueue_task("trip", process_trip_search, requirements, key=key)
     except Exception as e:
         return jsonify({
             'error': str(e)
         }), 500
+
 @app.route('/search_youtube', methods=["POST"])
 def search_youtube():
     try:
@@ -197,37 +725,159 @@ def search_youtube():
                 'error': 'Missing required parameters. Please provide question.'
             }), 400
         
-        task_id = str(uuid.uuid4())
-        with task_lock:
-            task_results[task_id] = {'status': TaskStatus.PENDING.value}
-        # tạo luồng mới
-        thread = threading.Thread(
-            target=process_youtube_search,
-            args=(task_id, user_input),
-            daemon=True # daemon thread tự động dừng luồng khi chương trình chính kết thúc
-        )
-        thread.start()
-        return jsonify({
-            'task_id': task_id,
-            'status': TaskStatus.PENDING.value
-        })
+        key = make_request_key("youtube", user_input=user_input)
+        return enqueue_task("youtube", process_youtube_search, user_input, key=key)
     except Exception as e:
         return jsonify({
             'error': str(e)
         }), 500
 
 
+def describe_task(task_id, record):
+    """Add the live queue position to a pending task record."""
+    if record.get('status') == TaskStatus.PENDING.value:
+        queued_id = record.get('alias_of', task_id)
+        record = dict(record, queue_position=scheduler.queue_position(queued_id))
+    return record
+
+def is_finished(record):
+    return record.get('status') in TERMINAL_STATUSES
+
 @app.route('/task_status/<task_id>', methods=['GET'])
 def get_status(task_id):
+    """Return the task record.
+
+    With ``?wait=N`` this long-polls: it returns as soon as the record
+    changes from ``?version=V`` (default: the current version), or after N
+    seconds with the unchanged record.
+    """
     try:
-        with task_lock:
-            result = task_results.get(task_id)
+        result = task_store.get(task_id)
         if not result:
             return jsonify({'error': 'Task not found'}), 404
-    
-        return jsonify(result)
+
+        wait = min(request.args.get('wait', 0, type=float), MAX_WAIT_SECONDS)
+        if wait > 0 and not is_finished(result):
+            version = request.args.get('version', result.get('version'), type=int)
+            result = task_store.wait_for_change(task_id, version, wait)
+            if not result:
+                return jsonify({'error': 'Task not found'}), 404
+
+        return jsonify(describe_task(task_id, result))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def format_event(event, record):
+    return f"event: {event}\ndata: {json.dumps(record, default=str)}\n\n"
+
+@app.route('/task_events/<task_id>', methods=['GET'])
+def task_events(task_id):
+    """Stream the task as Server-Sent Events until it finishes.
+
+    Every change of the record is pushed as a ``status`` event, the last
+    one carries the completed data or the error. Idle periods send a
+    comment line to keep proxies from closing the connection.
+    """
+    record = task_store.get(task_id)
+    if not record:
+        return jsonify({'error': 'Task not found'}), 404
+
+    def generate(record):
+        yield format_event("status", describe_task(task_id, record))
+        while not is_finished(record):
+            latest = task_store.wait_for_change(task_id, record.get('version'), EVENT_KEEPALIVE_SECONDS)
+            if latest is None:
+                yield format_event("error", {'error': 'Task not found'})
+                return
+            if latest.get('version') == record.get('version'):
+                if latest.get('status') == TaskStatus.PENDING.value:
+                    # the queue position moves without a new version
+                    yield format_event("status", describe_task(task_id, latest))
+                else:
+                    yield ": keep-alive\n\n"
+            else:
+                yield format_event("status", describe_task(task_id, latest))
+            record = latest
+
+    return Response(
+        generate(record),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/task/<task_id>', methods=['DELETE'])
+def cancel_task(task_id):
+    """Cancel a queued or running task.
+
+    A queued task is removed from its queue. A running task has its
+    coroutines cancelled, which closes its browser. A task aliased to an
+    identical search is only detached. The shared search keeps running
+    while other requests are attached to it.
+
+    A task owned by another process sharing the store is only marked
+    cancelled. Its worker stops at the next stage boundary; requests
+    attached to it there are cancelled along with it.
+    """
+    try:
+        record = task_store.get(task_id)
+        if not record:
+            return jsonify({'error': 'Task not found'}), 404
+        if is_finished(record):
+            return jsonify({'error': 'Task already finished', 'status': record['status']}), 409
+
+        primary_id = record.get('alias_of')
+        if primary_id:
+            singleflight.detach(primary_id, task_id)
+            task_store.update(task_id, status=TaskStatus.CANCELLED.value, error="Task was cancelled")
+            return jsonify({'task_id': task_id, 'status': TaskStatus.CANCELLED.value})
+
+        if singleflight.has_aliases(task_id):
+            return jsonify({'error': 'Task is shared with identical in-flight requests and keeps running'}), 409
+
+        local = task_store.is_local(task_id)
+        never_started = False
+        if local:
+            engine.cancel(task_id)
+            never_started = scheduler.cancel(task_id)
+        # a task owned by another process stops when its worker sees this status
+        cancelled = task_store.update(task_id, status=TaskStatus.CANCELLED.value, error="Task was cancelled")
+        singleflight.release(task_id)
+        if local and (never_started or not cancelled):
+            # no worker will clear the marker: it never ran, or finished first
+            engine.forget(task_id)
+        if not cancelled:
+            return jsonify({'error': 'Task already finished', 'status': (task_store.get(task_id) or record)['status']}), 409
+        return jsonify({'task_id': task_id, 'status': TaskStatus.CANCELLED.value})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the metrics of this process."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    return jsonify({
+        'task_store': task_store.stats(),
+        'scheduler': scheduler.stats(),
+        'singleflight': singleflight.stats(),
+        'browser_pool': browser_pool_stats(),
+        'llm_cache': llm_cache.stats(),
+        'result_cache': {
+            'flight': flight_cache.stats(),
+            'hotel': hotel_cache.stats(),
+            'transcript': transcript_cache.stats()
+        }
+    })
+
 if __name__ == '__main__':
-    serve(app, host='0.0.0.0', port=5000)
\ No newline at end of file
+    engine.submit(warm_browser_pool())
+    # several processes can share one SQLite task store, each on its own PORT.
+    # long-polls and event streams each hold a waitress thread while they wait
+    serve(
+        app,
+        host='0.0.0.0',
+        port=int(os.getenv("PORT", 5000)),
+        threads=int(os.getenv("WAITRESS_THREADS", 32))
+    )
\ No newline at end of file
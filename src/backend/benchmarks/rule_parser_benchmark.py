@@ -0,0 +1,173 @@
+"""Latency and accuracy of rule_parser on a corpus of sample requests.
+
+Run from src/backend:
+
+    python benchmarks/rule_parser_benchmark.py [--repeat 200]
+
+For each parser it reports how many requests were parsed without the
+LLM, how many fields were read, how many of those were right, and the
+parse latency. Dates are resolved against a fixed `TODAY` so the
+expected values do not drift.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent.airports import resolve_airport  # noqa: E402
+from Agent.prices import parse_price  # noqa: E402
+from rule_parser import parse_flight_request, parse_hotel_request  # noqa: E402
+
+TODAY = date(2025, 4, 10)  # a Thursday
+
+FLIGHT_CORPUS = [
+    ("from LAX to NYC from December 1st to December 8th, budget $1000",
+     {"origin": "LAX", "destination": "NYC", "start_date": "2025-12-01", "end_date": "2025-12-08", "budget": "$1000"}),
+    ("I want to fly from New York to Paris on May 20, 2025, and return to New York on May 25. "
+     "With economy class tickets from Air France Airlines.",
+     {"origin": "NYC", "destination": "PAR", "start_date": "2025-05-20", "end_date": "2025-05-25",
+      "ticket_class": "Economy", "airline": "Air France"}),
+    ("Hanoi to Bangkok, June 3 - June 10",
+     {"origin": "HAN", "destination": "BKK", "start_date": "2025-06-03", "end_date": "2025-06-10"}),
+    ("Flights from Hà Nội to Đà Nẵng from 2025-07-01 to 2025-07-05, business class",
+     {"origin": "HAN", "destination": "DAD", "start_date": "2025-07-01", "end_date": "2025-07-05",
+      "ticket_class": "Business"}),
+    ("fly to Tokyo from Ho Chi Minh City next Friday for a week, max 800 USD",
+     {"origin": "SGN", "destination": "TYO", "start_date": "2025-04-11", "end_date": "2025-04-18", "budget": "800 USD"}),
+    ("Round trip SFO to LHR, Dec 1-8, under $1,500, British Airways",
+     {"origin": "SFO", "destination": "LHR", "start_date": "2025-12-01", "end_date": "2025-12-08",
+      "budget": "$1,500", "airline": "British Airways"}),
+    ("Leaving Singapore on 20/06/2025, returning 27/06/2025, destination Seoul, premium economy",
+     {"origin": "SIN", "destination": "SEL", "start_date": "2025-06-20", "end_date": "2025-06-27",
+      "ticket_class": "Premium Economy"}),
+    ("From Sydney to Auckland 5 May to 12 May with Qantas",
+     {"origin": "SYD", "destination": "AKL", "start_date": "2025-05-05", "end_date": "2025-05-12", "airline": "Qantas"}),
+    ("Chicago to Miami tomorrow, back on Sunday",
+     {"origin": "CHI", "destination": "MIA", "start_date": "2025-04-11", "end_date": "2025-04-13"}),
+    ("I need flights between Berlin and Rome from 1st of August to 9th of August, budget of 300 EUR",
+     {"origin": "BER", "destination": "ROM", "start_date": "2025-08-01", "end_date": "2025-08-09", "budget": "300 EUR"}),
+    ("From Hanoi to Saigon on Dec 28 returning Jan 3, Vietnam Airlines, economy",
+     {"origin": "HAN", "destination": "SGN", "start_date": "2025-12-28", "end_date": "2026-01-03",
+      "airline": "Vietnam Airlines", "ticket_class": "Economy"}),
+    ("JFK to CDG in 2 weeks for 10 nights, first class",
+     {"origin": "JFK", "destination": "CDG", "start_date": "2025-04-24", "end_date": "2025-05-04", "ticket_class": "First"}),
+    ("Going from Dubai to Istanbul on March 3rd 2026 to March 9th 2026, budget is 5000 AED",
+     {"origin": "DXB", "destination": "IST", "start_date": "2026-03-03", "end_date": "2026-03-09"}),
+    ("Cheapest way from Kuala Lumpur to Bali sometime in the summer",
+     {"origin": "KUL", "destination": "DPS"}),
+    ("Take me somewhere warm from Boston in February",
+     {"origin": "BOS"}),
+    ("Phu Quoc trip from Hai Phong, from September 2 to September 6, with Vietjet, under 3.000.000 VND",
+     {"origin": "HPH", "destination": "PQC", "start_date": "2025-09-02", "end_date": "2025-09-06",
+      "airline": "Vietjet Air", "budget": "3.000.000 VND"}),
+    ("Hanoi to Dubai on Emirates, May 1 - May 8",
+     {"origin": "HAN", "destination": "DXB", "start_date": "2025-05-01", "end_date": "2025-05-08",
+      "airline": "Emirates"}),
+    ("JFK to LAX with Delta on June 5, back June 9",
+     {"origin": "JFK", "destination": "LAX", "start_date": "2025-06-05", "end_date": "2025-06-09", "airline": "Delta"}),
+    # place names and dates that contain an airline or a cabin word, none may be read as one
+    ("Fly from Hanoi to Dubai, United Arab Emirates from May 1 to May 8",
+     {"origin": "HAN", "destination": "DXB", "start_date": "2025-05-01", "end_date": "2025-05-08"}),
+    ("From Ho Chi Minh City to Can Tho to see the Mekong Delta, June 3 to June 6",
+     {"origin": "SGN", "destination": "VCA", "start_date": "2025-06-03", "end_date": "2025-06-06"}),
+    ("from London, United Kingdom to New York on July 2, back July 12, economy",
+     {"origin": "LON", "destination": "NYC", "start_date": "2025-07-02", "end_date": "2025-07-12",
+      "ticket_class": "Economy"}),
+    ("Fly from Hanoi to Paris in first week of May",
+     {"origin": "HAN", "destination": "PAR"}),
+    ("Paris to Rome June 5 - June 12 with my sister Ana",
+     {"origin": "PAR", "destination": "ROM", "start_date": "2025-06-05", "end_date": "2025-06-12"}),
+]
+
+HOTEL_CORPUS = [
+    ("I'm planning a trip to Paris from May 20, 2025, to May 25, 2025. I'm looking for a hotel with a nightly "
+     "price under 3.000.000 and a rating of 4 stars or higher.",
+     {"location": "PAR", "check_in": "2025-05-20", "check_out": "2025-05-25", "price_per_night": "3.000.000",
+      "rating": "4 stars and up"}),
+    ("Hotel in Da Nang for 3 nights from June 12, under $80 per night, with a pool",
+     {"location": "DAD", "check_in": "2025-06-12", "check_out": "2025-06-15", "price_per_night": "$80",
+      "amenities": "pool"}),
+    ("Looking for a 5-star hotel in Tokyo, Oct 3 to Oct 9, breakfast and gym included",
+     {"location": "TYO", "check_in": "2025-10-03", "check_out": "2025-10-09", "rating": "5 stars",
+      "amenities": "breakfast, fitness center"}),
+    ("Stay near Hoan Kiem in Hanoi 2025-11-01 to 2025-11-04, free wifi, budget 50 USD per night",
+     {"location": "HAN", "check_in": "2025-11-01", "check_out": "2025-11-04", "amenities": "free Wi-Fi",
+      "price_per_night": "50 USD"}),
+    ("Bangkok hotel next Friday for two nights, 4+ stars",
+     {"location": "BKK", "check_in": "2025-04-11", "check_out": "2025-04-13", "rating": "4 stars and up"}),
+    ("Where should I stay in London in December?",
+     {"location": "LON"}),
+    ("A quiet place by the sea with good reviews for my honeymoon",
+     {}),
+    ("Hotel at Nha Trang, 1-5 July, rated at least 4.5, spa and parking",
+     {"location": "CXR", "check_in": "2025-07-01", "check_out": "2025-07-05", "rating": "4.5 stars and up",
+      "amenities": "spa, parking"}),
+]
+
+
+def _same(field, got, expected):
+    if field in ("origin", "destination", "location"):
+        return resolve_airport(got) == expected
+    if field in ("budget", "price_per_night"):
+        return parse_price(got)[0] == parse_price(expected)[0]
+    if field == "amenities":
+        return set(got.split(", ")) == set(expected.split(", "))
+    return got == expected
+
+
+def evaluate(name, parse, corpus, repeat):
+    fully_parsed = 0
+    fields_read = 0
+    fields_right = 0
+    mistakes = []
+    fallbacks = []
+    latencies = []
+    for text, expected in corpus:
+        fields, unresolved = parse(text, TODAY)
+        if not unresolved:
+            fully_parsed += 1
+        else:
+            fallbacks.append((text, unresolved))
+        for field, value in fields.items():
+            if value is None:
+                continue
+            fields_read += 1
+            if field in expected and _same(field, value, expected[field]):
+                fields_right += 1
+            else:
+                mistakes.append((text, field, value, expected.get(field)))
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse(text, TODAY)
+        latencies.append((time.perf_counter() - started) / repeat * 1000)
+
+    expected_fields = sum(len(expected) for _, expected in corpus)
+    print(f"{name}: {len(corpus)} requests")
+    print(f"  parsed without the LLM   {fully_parsed}/{len(corpus)}")
+    print(f"  expected fields read     {fields_right}/{expected_fields}")
+    print(f"  precision of read fields {fields_right}/{fields_read}" +
+          (f" ({fields_right / fields_read:.1%})" if fields_read else ""))
+    print(f"  latency per parse        mean {statistics.mean(latencies):.3f} ms, "
+          f"p50 {statistics.median(latencies):.3f} ms, max {max(latencies):.3f} ms")
+    for text, unresolved in fallbacks:
+        print(f"  left to the LLM: {', '.join(unresolved)} in {text!r}")
+    for text, field, value, expected in mistakes:
+        print(f"  wrong {field}: {value!r}, expected {expected!r} in {text!r}")
+    return fields_read == fields_right
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("--repeat", type=int, default=200, help="parses per request when timing")
+    options = arguments.parse_args()
+    ok = evaluate("flight", parse_flight_request, FLIGHT_CORPUS, options.repeat)
+    ok = evaluate("hotel", parse_hotel_request, HOTEL_CORPUS, options.repeat) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
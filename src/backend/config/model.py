@@ -2,8 +2,16 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, AIMessage
 import os
 from dotenv import load_dotenv
+from metrics import LLMMetricsHandler
 api_key = os.getenv("GOOGLE_API_KEY")
-model = ChatGoogleGenerativeAI(model="gemini-1.5-pro-latest", google_api_key=api_key, streaming=True)
+MODEL_NAME = "gemini-1.5-pro-latest"
+# LLMMetricsHandler counts and times every call for /metrics and the task timings
+model = ChatGoogleGenerativeAI(
+    model=MODEL_NAME,
+    google_api_key=api_key,
+    streaming=True,
+    callbacks=[LLMMetricsHandler(MODEL_NAME)]
+)
 def chat_based_on_context(user_input, messages):
     """
     Trả lời user_input dựa trên lịch sử hội thoại messages bằng mô hình Gemini.
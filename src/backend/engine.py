@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import threading
+from collections import defaultdict
+from concurrent.futures import CancelledError
+
+
+class AsyncEngine:
+    """A single long-lived event loop running in its own daemon thread.
+
+    Worker threads hand coroutines to the loop with ``submit``/``run``
+    instead of driving a loop themselves, so the I/O waits of every
+    running search interleave on one loop. Coroutines run for a task_id
+    can be cancelled together with ``cancel``.
+    """
+
+    def __init__(self, name="async-engine"):
+        self.loop = asyncio.new_event_loop()
+        self._lock = threading.Lock()
+        self._futures = defaultdict(set)
+        self._cancelled = set()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule `coro` on the engine loop and return a concurrent.futures.Future.
+
+        Context variables of the calling thread, such as the current task
+        trace, are visible inside the coroutine.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Cannot block on the engine loop from inside it, await the coroutine instead")
+        context = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(self._in_context(coro, context), self.loop)
+
+    @staticmethod
+    async def _in_context(coro, context):
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    def run(self, coro, timeout=None, task_id=None):
+        """Run `coro` on the engine loop and block the calling thread until it finishes.
+
+        With `timeout` the coroutine is cancelled on the loop, its cleanup
+        awaited, and TimeoutError raised. With `task_id` it is registered so
+        ``cancel(task_id)`` can stop it, which raises CancelledError here.
+        """
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        if task_id is None:
+            return self.submit(coro).result()
+
+        with self._lock:
+            if task_id in self._cancelled:
+                coro.close()
+                raise CancelledError()
+            future = self.submit(coro)
+            self._futures[task_id].add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._futures[task_id].discard(future)
+                if not self._futures[task_id]:
+                    del self._futures[task_id]
+
+    def cancel(self, task_id):
+        """Cancel every coroutine running for `task_id` and refuse new ones."""
+        with self._lock:
+            self._cancelled.add(task_id)
+            futures = list(self._futures.get(task_id, ()))
+        for future in futures:
+            future.cancel()
+        return len(futures)
+
+    def is_cancelled(self, task_id):
+        with self._lock:
+            return task_id in self._cancelled
+
+    def forget(self, task_id):
+        """Drop the cancellation marker once the task has finished."""
+        with self._lock:
+            self._cancelled.discard(task_id)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
@@ -0,0 +1,94 @@
+import threading
+from datetime import timedelta
+from Agent.dates import parse_travel_date, format_flight_date
+from Agent.flight import parse_flight_result, flight_total_price
+
+
+def date_grid(start_date, end_date, window):
+    """List the (outbound, return) datetime pairs within ±`window` days of the requested dates.
+
+    Pairs where the return is not after the outbound date are skipped.
+    """
+    start = parse_travel_date(start_date)
+    end = parse_travel_date(end_date)
+    if start is None or end is None:
+        raise ValueError("Could not parse start_date/end_date")
+    offsets = range(-window, window + 1)
+    outbound_dates = [start + timedelta(days=d) for d in offsets]
+    return_dates = [end + timedelta(days=d) for d in offsets]
+    pairs = [(out, ret) for out in outbound_dates for ret in return_dates if ret > out]
+    return outbound_dates, return_dates, pairs
+
+
+def cell_key(outbound, inbound):
+    return f"{outbound:%Y-%m-%d}|{inbound:%Y-%m-%d}"
+
+
+class FlightGrid:
+    """Collects the cells of a flexible-dates search into a price matrix."""
+
+    def __init__(self, start_date, end_date, window):
+        self.outbound_dates, self.return_dates, self.pairs = date_grid(start_date, end_date, window)
+        self.cells = {}
+        self._lock = threading.Lock()
+
+    def add_result(self, outbound, inbound, result, cached=False):
+        parsed = parse_flight_result(result)
+        total, currency = flight_total_price(parsed)
+        with self._lock:
+            self.cells[cell_key(outbound, inbound)] = {
+                'status': 'completed',
+                'start_date': format_flight_date(outbound),
+                'end_date': format_flight_date(inbound),
+                'total_price': total,
+                'currency': currency,
+                'cached': cached,
+                'outbound_flight': (parsed or {}).get('outbound_flight'),
+                'return_flight': (parsed or {}).get('return_flight'),
+                'raw': None if parsed else result,
+            }
+            return self._snapshot()
+
+    def add_error(self, outbound, inbound, error):
+        with self._lock:
+            self.cells[cell_key(outbound, inbound)] = {
+                'status': 'failed',
+                'start_date': format_flight_date(outbound),
+                'end_date': format_flight_date(inbound),
+                'error': error,
+            }
+            return self._snapshot()
+
+    def completed(self):
+        with self._lock:
+            return sum(1 for cell in self.cells.values() if cell['status'] == 'completed')
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        prices = []
+        for out in self.outbound_dates:
+            row = []
+            for ret in self.return_dates:
+                cell = self.cells.get(cell_key(out, ret))
+                row.append(cell.get('total_price') if cell else None)
+            prices.append(row)
+
+        priced = [cell for cell in self.cells.values() if cell.get('total_price') is not None]
+        cheapest = min(priced, key=lambda cell: cell['total_price']) if priced else None
+        return {
+            'outbound_dates': [f"{d:%Y-%m-%d}" for d in self.outbound_dates],
+            'return_dates': [f"{d:%Y-%m-%d}" for d in self.return_dates],
+            'prices': prices,
+            'cells': dict(self.cells),
+            'finished_cells': len(self.cells),
+            'total_cells': len(self.pairs),
+            'cheapest': {
+                'start_date': cheapest['start_date'],
+                'end_date': cheapest['end_date'],
+                'total_price': cheapest['total_price'],
+                'currency': cheapest['currency'],
+            } if cheapest else None,
+        }
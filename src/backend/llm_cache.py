@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.messages import AIMessage
+from metrics import LLM_CACHE_LOOKUPS, LLM_CACHE_SAVED_SECONDS, current_trace
+
+# set LLM_CACHE=false to send every prompt to the model
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace, so prompts differing only in indentation or line breaks share an entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def model_name(model):
+    return getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+class LLMCache:
+    """Model responses keyed by model name and normalized prompt.
+
+    An in-memory LRU of `max_entries` responses, optionally backed by a
+    SQLite file at `path` so the API and the Streamlit process, and
+    restarts, share answers. Entries older than `ttl` seconds are not
+    served. Each entry keeps how long the original call took, so hits
+    report the latency they saved.
+    """
+
+    def __init__(self, ttl, max_entries=512, path=None, max_rows=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {
+            'memory_hits': 0,
+            'sqlite_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'saved_seconds': 0.0,
+        }
+        if path:
+            conn = self._connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+
+    @staticmethod
+    def key(model, prompt):
+        text = f"{model}\0{normalize_prompt(prompt)}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return ``(response, latency)`` of a fresh entry, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, response, latency = entry
+                if now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    self.counters['saved_seconds'] += latency
+                    return response, latency
+                del self._entries[key]
+
+        if self.path:
+            row = self._connection().execute(
+                "SELECT response, latency, created_at FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                response, latency, created_at = row
+                with self._lock:
+                    self._put(key, created_at, response, latency)
+                    self.counters['sqlite_hits'] += 1
+                    self.counters['saved_seconds'] += latency
+                return response, latency
+
+        with self._lock:
+            self.counters['misses'] += 1
+        return None
+
+    def set(self, key, model, response, latency):
+        created_at = time.time()
+        with self._lock:
+            self._put(key, created_at, response, latency)
+            self.counters['stores'] += 1
+        if not self.path:
+            return
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, latency, created_at) VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, latency, created_at)
+        )
+        # drop expired rows, then the oldest beyond max_rows
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (created_at - self.ttl,))
+        conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_rows,)
+        )
+
+    def stats(self):
+        with self._lock:
+            hits = self.counters['memory_hits'] + self.counters['sqlite_hits']
+            lookups = hits + self.counters['misses']
+            return dict(
+                self.counters,
+                saved_seconds=round(self.counters['saved_seconds'], 3),
+                entries=len(self._entries),
+                hit_rate=hits / lookups if lookups else None,
+                ttl=self.ttl,
+                enabled=LLM_CACHE_ENABLED,
+            )
+
+    def _put(self, key, created_at, response, latency):
+        self._entries[key] = (created_at, response, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit, every statement is its own transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def create_llm_cache():
+    """Build the cache from ``LLM_CACHE_TTL``, ``LLM_CACHE_MAX_ENTRIES`` and ``LLM_CACHE_PATH``."""
+    return LLMCache(
+        ttl=int(os.getenv("LLM_CACHE_TTL", 3600)),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512)),
+        path=os.getenv("LLM_CACHE_PATH") or None,
+        max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", 10000)),
+    )
+
+
+llm_cache = create_llm_cache()
+
+
+def invoke_cached(model, prompt, site):
+    """``model.invoke(prompt)`` through the LLM cache, for call sites whose prompt fully determines the answer.
+
+    `site` names the call site in the metrics. Only the text of the
+    response is cached, it comes back as an AIMessage.
+    """
+    if not LLM_CACHE_ENABLED:
+        return model.invoke(prompt)
+    name = model_name(model)
+    key = LLMCache.key(name, prompt)
+    cached = llm_cache.get(key)
+    trace = current_trace()
+    if cached is not None:
+        response, latency = cached
+        LLM_CACHE_LOOKUPS.inc(site=site, outcome="hit")
+        LLM_CACHE_SAVED_SECONDS.inc(latency, site=site)
+        if trace:
+            trace.add("llm_cache_hits")
+        return AIMessage(content=response)
+
+    LLM_CACHE_LOOKUPS.inc(site=site, outcome="miss")
+    started = time.monotonic()
+    message = model.invoke(prompt)
+    if isinstance(message.content, str) and message.content:
+        llm_cache.set(key, name, message.content, time.monotonic() - started)
+    return message
@@ -0,0 +1,321 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+
+# seconds; browser stages take tens of seconds, LLM calls a few
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """Return (name, labels, value) tuples."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help):
+        super().__init__(name, help)
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._sums[key] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, counts in self._counts.items():
+                labels = dict(key)
+                for bound, count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), count))
+                samples.append((f"{self.name}_sum", labels, self._sums[key]))
+                samples.append((f"{self.name}_count", labels, counts[-1]))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """Reads its samples from `fn` at scrape time, for stats kept elsewhere.
+
+    `fn` returns a list of ``(labels, value)`` pairs.
+    """
+
+    def __init__(self, name, help, fn, type="gauge"):
+        super().__init__(name, help)
+        self.fn = fn
+        self.type = type
+
+    def samples(self):
+        return [(self.name, labels, value) for labels, value in self.fn() if value is not None]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "travel_stage_duration_seconds", "Duration of each pipeline stage by search type"
+))
+TASK_SECONDS = REGISTRY.register(Histogram(
+    "travel_task_duration_seconds", "Duration of whole tasks by search type and final status"
+))
+ACTIVE_BROWSERS = REGISTRY.register(Gauge(
+    "travel_active_browsers", "Browsers currently open by the scrapers"
+))
+BROWSER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "travel_browser_context_wait_seconds", "Time a scraper waited for a pooled browser context",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+))
+PAGE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "travel_page_wait_seconds", "Time scrapers waited on page conditions by scraper, step and outcome",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 10, 15)
+))
+BLOCKED_REQUESTS = REGISTRY.register(Counter(
+    "travel_blocked_requests_total", "Browser requests aborted by scraper profile and kind"
+))
+EXTRACTIONS = REGISTRY.register(Counter(
+    "travel_extractions_total", "DOM extractor runs by extractor and outcome, fallback meaning the agent took over"
+))
+TRANSCRIPT_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "travel_transcript_fetch_seconds", "YouTube transcript download latency by outcome, cache hits excluded",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20)
+))
+AGENT_STEP_SECONDS = REGISTRY.register(Histogram(
+    "travel_agent_step_seconds", "browser_use agent step time by agent and phase, think being the LLM and act the browser",
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+))
+AGENT_RUNS = REGISTRY.register(Counter(
+    "travel_agent_runs_total", "browser_use agent runs by agent and how they ended"
+))
+RULE_PARSES = REGISTRY.register(Counter(
+    "travel_rule_parses_total", "Requests parsed by the rule-based parser alone (rules) or finished by the LLM (llm_fallback)"
+))
+LLM_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "travel_llm_cache_lookups_total", "LLM response cache lookups by call site and outcome"
+))
+LLM_CACHE_SAVED_SECONDS = REGISTRY.register(Counter(
+    "travel_llm_cache_saved_seconds_total", "Model latency avoided by LLM cache hits, from the original calls, by call site"
+))
+LLM_CALLS = REGISTRY.register(Counter(
+    "travel_llm_calls_total", "LLM calls by model and outcome"
+))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "travel_llm_call_duration_seconds", "LLM call latency by model"
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "travel_llm_tokens_total", "LLM tokens by model and kind (input or output), as reported by the provider"
+))
+
+
+class TaskTrace:
+    """Per-task timings and counters, reported in the task result."""
+
+    def __init__(self, search_type):
+        self.search_type = search_type
+        self.status = None
+        self.started = time.monotonic()
+        self.stages = {}
+        self.waits = {}
+        self.agent_steps = []
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = round(self.stages.get(stage, 0) + seconds, 3)
+
+    def record_wait(self, step, seconds):
+        with self._lock:
+            self.waits[step] = round(self.waits.get(step, 0) + seconds, 3)
+
+    def record_agent_step(self, agent, step, think, act):
+        with self._lock:
+            self.agent_steps.append({
+                'agent': agent,
+                'step': step,
+                'think': round(think, 3),
+                'act': round(act, 3),
+            })
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def as_dict(self):
+        with self._lock:
+            timings = {
+                'stages': dict(self.stages),
+                'total': round(time.monotonic() - self.started, 3),
+                **{name: round(value, 3) for name, value in self.counters.items()},
+            }
+            if self.waits:
+                timings['waits'] = dict(self.waits)
+            if self.agent_steps:
+                timings['agent_steps'] = list(self.agent_steps)
+            return timings
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def task_trace(search_type):
+    """Make a TaskTrace current for the calling thread and its engine coroutines.
+
+    On exit the task duration is recorded under the status set on the trace.
+    """
+    trace = TaskTrace(search_type)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        TASK_SECONDS.observe(
+            time.monotonic() - trace.started,
+            search_type=search_type,
+            status=trace.status or "unknown"
+        )
+
+
+@contextmanager
+def time_stage(stage):
+    """Time a block as `stage` of the current task, in the task and in the histograms."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        trace = current_trace()
+        search_type = trace.search_type if trace else "none"
+        STAGE_SECONDS.observe(elapsed, search_type=search_type, stage=stage)
+        if trace:
+            trace.record_stage(stage, elapsed)
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback counting and timing every call made through a model."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = (time.monotonic(), current_trace())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = (time.monotonic(), current_trace())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "success", response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+    @staticmethod
+    def _token_usage(response):
+        usage = {'input': 0, 'output': 0}
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                usage['input'] += metadata.get('input_tokens', 0)
+                usage['output'] += metadata.get('output_tokens', 0)
+        return usage
+
+    def _finish(self, run_id, outcome, response=None):
+        started, trace = self._started.pop(run_id, (None, None))
+        LLM_CALLS.inc(model=self.model_name, outcome=outcome)
+        if started is None:
+            return
+        elapsed = time.monotonic() - started
+        LLM_SECONDS.observe(elapsed, model=self.model_name)
+        if trace:
+            trace.add("llm_calls")
+            trace.add("llm_seconds", elapsed)
+        if response is None:
+            return
+        for kind, tokens in self._token_usage(response).items():
+            if tokens:
+                LLM_TOKENS.inc(tokens, model=self.model_name, kind=kind)
+                if trace:
+                    trace.add(f"llm_{kind}_tokens", tokens)
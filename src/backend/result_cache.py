@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """LRU cache with a TTL, optionally backed by JSON files on disk.
+
+    The memory tier holds up to `max_entries` values. With `disk_dir` set,
+    every value is also written to disk so it survives restarts and is
+    shared by the processes of one host. The disk tier is trimmed to
+    `max_disk_bytes`, least recently used files first. A `ttl` of None
+    keeps values until they are evicted.
+    """
+
+    def __init__(self, name, ttl, max_entries=256, disk_dir=None, max_disk_bytes=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key, max_age=None):
+        """Return ``(value, age_seconds)`` or None on a miss.
+
+        `max_age` lets a caller demand fresher data than the cache TTL.
+        """
+        limit = self._age_limit(max_age)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if limit is None or now - stored_at <= limit:
+                    self._entries.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return value, now - stored_at
+                if self.ttl is not None and now - stored_at > self.ttl:
+                    del self._entries[key]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            stored_at, value = entry
+            if limit is None or now - stored_at <= limit:
+                with self._lock:
+                    self._put(key, stored_at, value)
+                    self.counters['disk_hits'] += 1
+                return value, now - stored_at
+
+        with self._lock:
+            self.counters['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        stored_at = time.time()
+        with self._lock:
+            self._put(key, stored_at, value)
+            self.counters['stores'] += 1
+        self._write_disk(key, stored_at, value)
+
+    def stats(self):
+        with self._lock:
+            hits = self.counters['memory_hits'] + self.counters['disk_hits']
+            lookups = hits + self.counters['misses']
+            return dict(
+                self.counters,
+                entries=len(self._entries),
+                hit_rate=hits / lookups if lookups else None,
+                ttl=self.ttl,
+            )
+
+    def _age_limit(self, max_age):
+        if max_age is None:
+            return self.ttl
+        if self.ttl is None:
+            return max_age
+        return min(max_age, self.ttl)
+
+    def _put(self, key, stored_at, value):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        if self.ttl is not None and time.time() - entry['stored_at'] > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # mtime doubles as last access time for disk eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['stored_at'], entry['value']
+
+    def _write_disk(self, key, stored_at, value):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'key': key, 'stored_at': stored_at, 'value': value}, f, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing {self.name} cache entry: {str(e)}")
+            return
+        self._trim_disk()
+
+    def _trim_disk(self):
+        if not self.max_disk_bytes:
+            return
+        try:
+            files = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")]
+            stats = sorted(((entry.stat(), entry.path) for entry in files), key=lambda item: item[0].st_mtime)
+        except OSError:
+            return
+        total = sum(stat.st_size for stat, _ in stats)
+        for stat, path in stats:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+            with self._lock:
+                self.counters['disk_evictions'] += 1
+
+
+def create_result_cache(name, default_ttl, default_disk_dir=None, default_max_disk_bytes=None):
+    """Build a cache from ``<NAME>_CACHE_TTL``, ``RESULT_CACHE_MAX_ENTRIES`` and ``RESULT_CACHE_DIR``.
+
+    Caches given a `default_disk_dir` keep a disk tier even when
+    ``RESULT_CACHE_DIR`` is unset. ``<NAME>_CACHE_MAX_DISK_BYTES`` overrides
+    ``RESULT_CACHE_MAX_DISK_BYTES`` for one cache.
+    """
+    disk_dir = os.getenv("RESULT_CACHE_DIR")
+    disk_dir = os.path.join(disk_dir, name) if disk_dir else default_disk_dir
+    max_disk_bytes = (
+        os.getenv(f"{name.upper()}_CACHE_MAX_DISK_BYTES")
+        or os.getenv("RESULT_CACHE_MAX_DISK_BYTES")
+        or default_max_disk_bytes
+    )
+    return ResultCache(
+        name,
+        ttl=int(os.getenv(f"{name.upper()}_CACHE_TTL", default_ttl)),
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 256)),
+        disk_dir=disk_dir,
+        max_disk_bytes=int(max_disk_bytes) if max_disk_bytes else None,
+    )
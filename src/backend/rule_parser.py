@@ -0,0 +1,490 @@
+import re
+from datetime import date, timedelta
+from Agent.airports import CITY_AIRPORTS, KNOWN_CODES, normalize_place
+
+# Rule-based extraction of the common request shapes, e.g.
+# "from LAX to NYC from December 1st to December 8th, budget $1000".
+# Each parser returns (fields, unresolved): the fields it is confident
+# about, and the ones the LLM has to fill in.
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10,
+    "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14,
+}
+
+AIRLINES = {
+    "vietnam airlines": "Vietnam Airlines",
+    "vietjet air": "Vietjet Air",
+    "vietjet": "Vietjet Air",
+    "bamboo airways": "Bamboo Airways",
+    "vietravel airlines": "Vietravel Airlines",
+    "air france": "Air France",
+    "british airways": "British Airways",
+    "lufthansa": "Lufthansa",
+    "klm": "KLM",
+    "emirates": "Emirates",
+    "qatar airways": "Qatar Airways",
+    "etihad": "Etihad Airways",
+    "turkish airlines": "Turkish Airlines",
+    "singapore airlines": "Singapore Airlines",
+    "cathay pacific": "Cathay Pacific",
+    "thai airways": "Thai Airways",
+    "korean air": "Korean Air",
+    "asiana": "Asiana Airlines",
+    "japan airlines": "Japan Airlines",
+    "jal": "Japan Airlines",
+    "all nippon airways": "ANA",
+    "ana": "ANA",
+    "eva air": "EVA Air",
+    "china airlines": "China Airlines",
+    "airasia": "AirAsia",
+    "air asia": "AirAsia",
+    "jetstar": "Jetstar",
+    "qantas": "Qantas",
+    "delta": "Delta",
+    "united airlines": "United Airlines",
+    "united": "United Airlines",
+    "american airlines": "American Airlines",
+    "jetblue": "JetBlue",
+    "southwest": "Southwest Airlines",
+    "alaska airlines": "Alaska Airlines",
+    "air canada": "Air Canada",
+    "ryanair": "Ryanair",
+    "easyjet": "easyJet",
+}
+# airline names that are also words or parts of place names, only read
+# right after a cue such as "with Delta" or before "flights"
+AMBIGUOUS_AIRLINES = {"emirates", "delta", "united", "southwest", "ana", "jal"}
+# acronyms that are also given names ("Santa Ana"), only read in capitals
+UPPERCASE_AIRLINES = {"ana", "jal"}
+AIRLINE_CUE_RE = r"\b(?:with|on|via|by|fly(?:ing)?|airlines?|carrier)\s*:?\s+(?:the\s+)?"
+# place names containing an airline name, removed before looking for airlines
+NOT_AIRLINES_RE = re.compile(
+    r"\bunited\s+(?:arab\s+emirates|kingdom|states|nations)\b"
+    r"|\b(?:mekong|red\s+river|nile|mississippi|okavango|danube)\s+delta\b", re.I
+)
+CABINS = {
+    "premium economy": "Premium Economy",
+    "economy": "Economy",
+    "business": "Business",
+    "first": "First",
+}
+AMENITIES = {
+    "pool": "pool",
+    "swimming pool": "pool",
+    "wifi": "free Wi-Fi",
+    "wi-fi": "free Wi-Fi",
+    "breakfast": "breakfast",
+    "parking": "parking",
+    "gym": "fitness center",
+    "fitness": "fitness center",
+    "spa": "spa",
+    "airport shuttle": "airport shuttle",
+    "air conditioning": "air conditioning",
+    "kitchen": "kitchen",
+    "pet friendly": "pet-friendly",
+    "pet-friendly": "pet-friendly",
+}
+
+MONTH_RE = r"(?P<{name}>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+DAY_RE = r"(?P<{name}>\d{{1,2}})(?:st|nd|rd|th)?"
+YEAR_RE = r"(?:,?\s+(?P<{name}>\d{{4}}))?"
+
+# most specific first, a span used by one pattern is not read again by the next
+DATE_PATTERNS = [
+    # "December 1-8", "Dec 1st to 8th, 2025"
+    ("month_range", re.compile(
+        r"\b" + MONTH_RE.format(name="month") + r"\s+" + DAY_RE.format(name="day") +
+        r"\s*(?:-|–|to|until|through)\s*" + DAY_RE.format(name="day2") +
+        r"(?!\s*(?:/|:|am\b|pm\b|\w))" + YEAR_RE.format(name="year"), re.I)),
+    # "1-8 December"
+    ("day_range", re.compile(
+        r"\b" + DAY_RE.format(name="day") + r"\s*(?:-|–|to)\s*" + DAY_RE.format(name="day2") +
+        r"\s+(?:of\s+)?" + MONTH_RE.format(name="month") + YEAR_RE.format(name="year"), re.I)),
+    ("iso", re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b")),
+    ("dmy", re.compile(r"\b(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})\b")),
+    # "May 20, 2025", "Dec 1st", "Sunday, May 18, 2025"
+    ("month_day", re.compile(
+        r"\b" + MONTH_RE.format(name="month") + r"\s+" + DAY_RE.format(name="day") +
+        r"\b(?!\s*(?::|am\b|pm\b|people|persons|guests|adults|nights|days))" + YEAR_RE.format(name="year"), re.I)),
+    # "20 May 2025", "1st of December"
+    ("day_month", re.compile(
+        r"\b" + DAY_RE.format(name="day") + r"\s+(?:of\s+)?" + MONTH_RE.format(name="month") +
+        r"\b" + YEAR_RE.format(name="year"), re.I)),
+    ("relative", re.compile(
+        r"\b(?P<relative>day after tomorrow|today|tonight|tomorrow|"
+        r"(?:next|this|on)\s+(?:" + "|".join(WEEKDAYS) + r")|"
+        r"in\s+(?:\d+|" + "|".join(NUMBER_WORDS) + r")\s+(?:days?|weeks?))\b", re.I)),
+]
+# "for 5 nights", "for a week": the end date when only the start is given
+DURATION_RE = re.compile(
+    r"\bfor\s+(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")\s+(?P<unit>nights?|weeks?)\b", re.I
+)
+
+CURRENCY_RE = r"(?:[$€£¥₫]|\b(?:USD|EUR|GBP|VND|JPY|SGD|AUD|THB|KRW)\b)"
+CURRENCY_WORDS = {"dollars": "USD", "dollar": "USD", "euros": "EUR", "euro": "EUR", "dong": "VND", "đồng": "VND"}
+AMOUNT_RE = r"\d[\d.,]*(?:\s?[kK]\b)?"
+MONEY_RE = (
+    r"(?:" + CURRENCY_RE + r"\s?" + AMOUNT_RE +
+    r"|" + AMOUNT_RE + r"\s?(?:" + CURRENCY_RE + r"|" + "|".join(CURRENCY_WORDS) + r"|đ\b))"
+)
+BUDGET_RE = re.compile(
+    r"\b(?:budget|under|below|less than|max(?:imum)?|up to|within|no more than|at most|cap of)"
+    r"\s*(?:is|of|:|around|about|approximately)?\s*(?P<money>" + MONEY_RE + r")"
+    r"|(?P<money2>" + MONEY_RE + r")\s*(?:budget|max(?:imum)?|or less)", re.I
+)
+NIGHTLY_PRICE_RE = re.compile(
+    r"\b(?:price|rate|cost|budget|pay)[^.;]*?\b(?:under|below|less than|max(?:imum)?|up to|at most|around|about)"
+    r"\s*(?P<money>" + MONEY_RE + r"|" + AMOUNT_RE + r")"
+    r"|\b(?:under|below|less than|max(?:imum)?|up to|at most)\s*(?P<money2>" + MONEY_RE + r")\s*(?:per|a|/)\s*night"
+    r"|\bbudget\s*(?:is|of|:|around|about)?\s*(?P<money3>" + MONEY_RE + r")", re.I
+)
+RATING_RE = re.compile(
+    r"(?P<rating>\d(?:\.\d)?)\s*(?P<plus>\+)?\s*(?:-\s*)?stars?"
+    r"|\b(?:rating|rated)\s*(?:of|at least|above|over|:)?\s*(?P<rating2>\d(?:\.\d)?)", re.I
+)
+RATING_MINIMUM_RE = re.compile(r"\b(?:or (?:higher|more|above|better)|and up|at least|minimum|min\.?|\+)", re.I)
+
+FROM_WORDS = {"from", "leaving", "departing", "depart", "out"}
+TO_WORDS = {"to", "into", "visit", "visiting", "destination"}
+RETURN_WORDS = {"return", "returning", "back", "home"}
+STAY_WORDS = {"in", "at", "near", "around", "to"}
+
+WORD_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)?", re.UNICODE)
+
+_LONGEST_PLACE = max(len(name.split()) for name in CITY_AIRPORTS)
+
+
+def _words(text):
+    return [(match.group(0), match.start(), match.end()) for match in WORD_RE.finditer(text)]
+
+
+def find_places(text):
+    """Places of the local airport index mentioned in `text`, as (name as written, start, end, code).
+
+    City names match with or without diacritics, codes only when written
+    in capitals and known, so "USD" or "May" are not read as airports.
+    """
+    words = _words(text)
+    places = []
+    i = 0
+    while i < len(words):
+        for n in range(min(_LONGEST_PLACE, len(words) - i), 0, -1):
+            start, end = words[i][1], words[i + n - 1][2]
+            written = text[start:end]
+            if n == 1 and re.fullmatch(r"[A-Z]{3}", written) and written in KNOWN_CODES:
+                code = written
+            else:
+                code = CITY_AIRPORTS.get(normalize_place(written))
+            if code:
+                places.append((written, start, end, code))
+                i += n
+                break
+        else:
+            i += 1
+    return places
+
+
+def _word_before(text, position, count=2):
+    """The last `count` words before `position`, stopping at punctuation and numbers."""
+    clause = re.split(r"[^\w\s'’]|\d", text[:position])[-1]
+    return [word.lower() for word, _, _ in _words(clause)[-count:]]
+
+
+def find_route(text):
+    """Return (origin, destination) as written in `text`, either None when unclear."""
+    places = find_places(text)
+    origin = destination = None
+    unmarked = []
+    for written, start, end, code in places:
+        before = _word_before(text, start)
+        if before and before[-1] in TO_WORDS and len(before) > 1 and before[-2] in RETURN_WORDS:
+            continue
+        if before and before[-1] in RETURN_WORDS:
+            continue
+        if before and (before[-1] in FROM_WORDS or before[-2:] == ["out", "of"]):
+            origin = origin or (written, code)
+        elif before and before[-1] in TO_WORDS:
+            destination = destination or (written, code)
+        else:
+            unmarked.append((written, code))
+    # "LAX to NYC", "between Hanoi and Bangkok": the first place is the origin
+    for place in unmarked:
+        if origin is None and (destination is None or place[1] != destination[1]):
+            origin = place
+        elif destination is None and place[1] != origin[1]:
+            destination = place
+    if origin and destination and origin[1] == destination[1]:
+        return None, None
+    return (origin[0] if origin else None), (destination[0] if destination else None)
+
+
+def _next_year_if_past(day, month, today):
+    try:
+        candidate = date(today.year, month, day)
+    except ValueError:
+        return None
+    if candidate < today:
+        try:
+            candidate = date(today.year + 1, month, day)
+        except ValueError:
+            return None
+    return candidate
+
+
+def _make_date(day, month, year, today):
+    try:
+        day = int(day)
+        month = int(month) if str(month).isdigit() else MONTHS[month.lower().rstrip(".")]
+        if year:
+            return date(int(year), month, day)
+        return _next_year_if_past(day, month, today)
+    except (ValueError, KeyError):
+        return None
+
+
+def _count(word):
+    return int(word) if word.isdigit() else NUMBER_WORDS.get(word.lower())
+
+
+def _relative_date(phrase, today):
+    phrase = " ".join(phrase.lower().split())
+    if phrase in ("today", "tonight"):
+        return today
+    if phrase == "tomorrow":
+        return today + timedelta(days=1)
+    if phrase == "day after tomorrow":
+        return today + timedelta(days=2)
+    match = re.fullmatch(r"in (\w+) (day|week)s?", phrase)
+    if match:
+        count = _count(match.group(1))
+        return today + timedelta(days=count * (7 if match.group(2) == "week" else 1)) if count else None
+    modifier, weekday = phrase.split()
+    ahead = (WEEKDAYS.index(weekday) - today.weekday()) % 7
+    if modifier == "next" and ahead == 0:
+        ahead = 7
+    return today + timedelta(days=ahead)
+
+
+def find_dates(text, today=None):
+    """Dates mentioned in `text`, in reading order.
+
+    Understands ISO and day/month/year dates, month names with or without
+    a year ("Dec 1st", "20 May 2025"), ranges ("December 1-8") and
+    relative days ("tomorrow", "next Friday", "in 2 weeks"). A date
+    without a year is the next one on or after `today`; a second date
+    earlier than the first rolls over to the next year.
+    """
+    today = today or date.today()
+    taken = []
+    found = []
+    for kind, pattern in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if any(match.start() < end and start < match.end() for start, end in taken):
+                continue
+            groups = match.groupdict()
+            if kind == "relative":
+                dates = [_relative_date(groups["relative"], today)]
+            elif kind in ("month_range", "day_range"):
+                dates = [
+                    _make_date(groups["day"], groups["month"], groups["year"], today),
+                    _make_date(groups["day2"], groups["month"], groups["year"], today),
+                ]
+            else:
+                dates = [_make_date(groups["day"], groups["month"], groups["year"], today)]
+            if None in dates:
+                continue
+            taken.append((match.start(), match.end()))
+            found.extend((match.start(), value) for value in dates)
+    found.sort(key=lambda item: item[0])
+    dates = [value for _, value in found]
+    # "Dec 28 to Jan 3" without years: the return is in the next year
+    for i in range(1, len(dates)):
+        if dates[i] < dates[i - 1]:
+            try:
+                dates[i] = dates[i].replace(year=dates[i].year + 1)
+            except ValueError:
+                pass
+    return dates
+
+
+def find_date_range(text, today=None):
+    """Return (start, end) dates of the trip, either None when not found."""
+    dates = find_dates(text, today)
+    if not dates:
+        return None, None
+    start = dates[0]
+    end = dates[1] if len(dates) > 1 else None
+    if end is None:
+        match = DURATION_RE.search(text)
+        if match:
+            count = _count(match.group("count"))
+            if count:
+                end = start + timedelta(days=count * (7 if match.group("unit").lower().startswith("week") else 1))
+    return start, end
+
+
+def _money(text):
+    text = " ".join(text.split())
+    for word, code in CURRENCY_WORDS.items():
+        if re.search(rf"\b{word}\b", text, re.I):
+            return re.sub(rf"\s*\b{word}\b", f" {code}", text, flags=re.I)
+    return text
+
+
+def find_budget(text):
+    match = BUDGET_RE.search(text)
+    if not match:
+        return None
+    return _money(match.group("money") or match.group("money2"))
+
+
+def find_nightly_price(text):
+    match = NIGHTLY_PRICE_RE.search(text)
+    if not match:
+        return None
+    return _money(match.group("money") or match.group("money2") or match.group("money3"))
+
+
+def find_cabin(text):
+    # a bare "first" is usually a date ("in the first week of May")
+    match = re.search(
+        r"\b(premium economy|economy|business|first)\s+(?:class|cabin)\b|\b(premium economy|economy)\b"
+        r"|\b(?:fly(?:ing)?|in|seats? in)\s+(business)\b", text, re.I
+    )
+    if not match:
+        return None
+    name = next(group for group in match.groups() if group)
+    return CABINS[" ".join(name.lower().split())]
+
+
+def _airline_pattern(name):
+    if name in UPPERCASE_AIRLINES:
+        return rf"\b(?-i:{re.escape(name.upper())})\b"
+    return rf"\b{re.escape(name)}\b"
+
+
+def find_airline(text):
+    text = NOT_AIRLINES_RE.sub(" ", text)
+    for name in sorted(AIRLINES, key=len, reverse=True):
+        pattern = _airline_pattern(name)
+        if name in AMBIGUOUS_AIRLINES:
+            pattern = rf"{AIRLINE_CUE_RE}{pattern}|{pattern}(?=\s+(?:airlines?|flights?)\b)"
+        if re.search(pattern, text, re.I):
+            return AIRLINES[name]
+    return None
+
+
+def mentions_airline(text):
+    """Whether `text` may name an airline find_airline did not read, e.g. a bare "Delta"."""
+    text = NOT_AIRLINES_RE.sub(" ", text)
+    names = "|".join(_airline_pattern(name) for name in sorted(AMBIGUOUS_AIRLINES))
+    return _has(rf"\b(airlines?|airways|carrier)\b|{names}", text)
+
+
+def find_rating(text):
+    match = RATING_RE.search(text)
+    if not match:
+        return None
+    rating = match.group("rating") or match.group("rating2")
+    tail = text[match.start():match.end() + 20]
+    if match.group("plus") or RATING_MINIMUM_RE.search(tail) or RATING_MINIMUM_RE.search(text[max(0, match.start() - 12):match.start()]):
+        return f"{rating} stars and up"
+    return f"{rating} stars"
+
+
+def find_amenities(text):
+    lowered = text.lower()
+    found = []
+    for keyword, amenity in AMENITIES.items():
+        if re.search(rf"\b{re.escape(keyword)}\b", lowered) and amenity not in found:
+            found.append(amenity)
+    return ", ".join(found) or None
+
+
+def _has(pattern, text):
+    return re.search(pattern, text, re.I) is not None
+
+
+def parse_flight_request(text, today=None):
+    """Extract the FlightDetails fields of a request without the LLM.
+
+    Returns ``(fields, unresolved)``. Dates are YYYY-MM-DD like the LLM
+    is asked for. An optional field the request does not mention is None
+    and resolved; one it seems to mention but that could not be read is
+    left to the LLM.
+    """
+    fields = {}
+    unresolved = []
+
+    origin, destination = find_route(text)
+    for name, value in (("origin", origin), ("destination", destination)):
+        if value:
+            fields[name] = value
+        else:
+            unresolved.append(name)
+
+    start, end = find_date_range(text, today)
+    if start:
+        fields["start_date"] = start.isoformat()
+    else:
+        unresolved.append("start_date")
+    if end:
+        fields["end_date"] = end.isoformat()
+    else:
+        unresolved.append("end_date")
+
+    optional = (
+        ("budget", find_budget(text), r"\b(budget|under|below|max|up to|cheap)\b|" + CURRENCY_RE),
+        ("ticket_class", find_cabin(text), r"\b(class|cabin|business)\b"),
+        ("airline", find_airline(text), mentions_airline),
+    )
+    for name, value, cue in optional:
+        if value:
+            fields[name] = value
+        elif cue(text) if callable(cue) else _has(cue, text):
+            unresolved.append(name)
+        else:
+            fields[name] = None
+    return fields, unresolved
+
+
+def parse_hotel_request(text, today=None):
+    """Extract the HotelDetails fields of a request without the LLM, as ``(fields, unresolved)``."""
+    fields = {}
+    unresolved = []
+
+    places = find_places(text)
+    stay = [place for place in places if (_word_before(text, place[1], 1) or [""])[0] in STAY_WORDS]
+    if stay or len({place[3] for place in places}) == 1:
+        fields["location"] = (stay or places)[0][0]
+    else:
+        unresolved.append("location")
+
+    check_in, check_out = find_date_range(text, today)
+    if check_in and check_out:
+        fields["check_in"] = check_in.isoformat()
+        fields["check_out"] = check_out.isoformat()
+    else:
+        unresolved.extend(["check_in", "check_out"])
+
+    optional = (
+        ("price_per_night", find_nightly_price(text), r"\b(price|budget|per night|nightly|cheap|under)\b|" + CURRENCY_RE),
+        ("rating", find_rating(text), r"\b(stars?|rating|rated)\b"),
+        ("amenities", find_amenities(text), r"\b(amenit\w*|facilit\w*|must have)\b"),
+    )
+    for name, value, cue in optional:
+        if value:
+            fields[name] = value
+        elif _has(cue, text):
+            unresolved.append(name)
+        else:
+            fields[name] = None
+    return fields, unresolved
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Used for Retry-After until a pool has finished at least one job
+DEFAULT_JOB_SECONDS = 120
+
+
+class QueueFullError(Exception):
+    """Raised when a worker pool has no room left in its queue."""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"The {pool_name} queue is full, please retry later")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """A fixed number of worker threads draining a bounded FIFO queue.
+
+    Jobs are called as ``fn(task_id, *args)`` so the existing
+    ``process_*_search`` functions can be submitted unchanged.
+    """
+
+    def __init__(self, name, num_workers, max_queue):
+        self.name = name
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._avg_duration = None
+        for i in range(num_workers):
+            threading.Thread(
+                target=self._worker,
+                name=f"{name}-worker-{i}",
+                daemon=True
+            ).start()
+
+    def submit(self, task_id, fn, *args):
+        """Queue a job and return its 1-based position in the queue."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(self.name, self._estimate_wait(len(self._queue)))
+            self._queue.append((task_id, fn, args))
+            position = len(self._queue)
+            self._cond.notify()
+        return position
+
+    def cancel(self, task_id):
+        """Remove a job that has not started yet. Returns True if it was queued."""
+        with self._cond:
+            for job in self._queue:
+                if job[0] == task_id:
+                    self._queue.remove(job)
+                    return True
+        return False
+
+    def queue_position(self, task_id):
+        with self._cond:
+            for i, (queued_id, _, _) in enumerate(self._queue):
+                if queued_id == task_id:
+                    return i + 1
+        return None
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.num_workers,
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'avg_job_seconds': self._avg_duration,
+            }
+
+    def _estimate_wait(self, queued):
+        avg = self._avg_duration or DEFAULT_JOB_SECONDS
+        return max(1, int(avg * (queued + 1) / self.num_workers))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                task_id, fn, args = self._queue.popleft()
+                self._running += 1
+
+            started = time.monotonic()
+            try:
+                fn(task_id, *args)
+            except Exception as e:
+                # process_* functions report their own errors, this is a last resort
+                print(f"Unhandled error in {self.name} worker for task {task_id}: {str(e)}")
+            finally:
+                duration = time.monotonic() - started
+                with self._cond:
+                    self._running -= 1
+                    if self._avg_duration is None:
+                        self._avg_duration = duration
+                    else:
+                        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+
+class TaskScheduler:
+    """One worker pool per search type."""
+
+    def __init__(self):
+        self.pools = {}
+
+    def add_pool(self, name, num_workers, max_queue):
+        self.pools[name] = WorkerPool(name, num_workers, max_queue)
+        return self.pools[name]
+
+    def submit(self, name, task_id, fn, *args):
+        return self.pools[name].submit(task_id, fn, *args)
+
+    def cancel(self, task_id):
+        return any(pool.cancel(task_id) for pool in self.pools.values())
+
+    def queue_position(self, task_id):
+        for pool in self.pools.values():
+            position = pool.queue_position(task_id)
+            if position is not None:
+                return position
+        return None
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+def create_scheduler():
+    """Build the scheduler from ``<TYPE>_WORKERS`` / ``<TYPE>_MAX_QUEUE`` env vars."""
+    scheduler = TaskScheduler()
+    # grid workers only coordinate, their cells run on the flight pool.
+    # trip workers mostly wait on the engine loop for their two browsers
+    pools = [("flight", 2, 10), ("hotel", 2, 10), ("youtube", 2, 10), ("grid", 1, 5), ("trip", 2, 10)]
+    for name, workers, max_queue in pools:
+        scheduler.add_pool(
+            name,
+            int(os.getenv(f"{name.upper()}_WORKERS", workers)),
+            int(os.getenv(f"{name.upper()}_MAX_QUEUE", max_queue))
+        )
+    return scheduler
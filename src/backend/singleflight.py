@@ -0,0 +1,96 @@
+import json
+import threading
+from collections import defaultdict
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_request_key(kind, **fields):
+    """Build a stable key for a search request.
+
+    Strings are lower-cased with whitespace collapsed and dicts are
+    serialized with sorted keys, so requests that only differ in
+    formatting share a key.
+    """
+    return kind + ":" + json.dumps(_normalize(fields), sort_keys=True, separators=(",", ":"))
+
+
+class SingleFlight:
+    """Attach identical in-flight requests to the task already running them.
+
+    The first task for a key becomes the primary. Later tasks with the same
+    key become aliases of it until the primary publishes a final status.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._primary_by_key = {}
+        self._key_by_primary = {}
+        self._aliases = defaultdict(list)
+        self.counters = {
+            'started': 0,
+            'deduplicated': 0,
+        }
+
+    def attach(self, key, task_id, on_alias):
+        """Register `task_id` for `key`.
+
+        If a task with the same key is in flight, ``on_alias(primary_id)``
+        runs under the lock, so no update of the primary is missed, and the
+        primary id is returned. Otherwise `task_id` becomes the primary and
+        None is returned.
+        """
+        with self._lock:
+            primary = self._primary_by_key.get(key)
+            if primary is None:
+                self._primary_by_key[key] = task_id
+                self._key_by_primary[task_id] = key
+                self.counters['started'] += 1
+                return None
+            on_alias(primary)
+            self._aliases[primary].append(task_id)
+            self.counters['deduplicated'] += 1
+            return primary
+
+    def publish(self, task_id, write, final=False):
+        """Call ``write(id)`` for the task and every alias attached to it.
+
+        With `final` the key is released first, so requests arriving after
+        this start a new task instead of attaching to a finished one.
+        """
+        with self._lock:
+            ids = [task_id] + self._aliases.get(task_id, [])
+            if final:
+                self.release(task_id)
+            for tid in ids:
+                write(tid)
+
+    def has_aliases(self, task_id):
+        with self._lock:
+            return bool(self._aliases.get(task_id))
+
+    def detach(self, primary_id, task_id):
+        """Stop sending the primary's updates to an alias."""
+        with self._lock:
+            aliases = self._aliases.get(primary_id)
+            if aliases and task_id in aliases:
+                aliases.remove(task_id)
+
+    def release(self, task_id):
+        with self._lock:
+            key = self._key_by_primary.pop(task_id, None)
+            if key is not None:
+                self._primary_by_key.pop(key, None)
+            self._aliases.pop(task_id, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, in_flight=len(self._primary_by_key))
@@ -0,0 +1,515 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from enum import Enum
+
+
+class TaskStatus(Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
+
+# tasks in these states are finished and may be evicted
+TERMINAL_STATUSES = {
+    TaskStatus.COMPLETED.value,
+    TaskStatus.FAILED.value,
+    TaskStatus.CANCELLED.value,
+    TaskStatus.TIMED_OUT.value,
+}
+
+
+# identifies this server process in the SQLite store. A restarted server
+# often gets its old PID back (PID 1 in a container), never this id
+BOOT_ID = uuid.uuid4().hex
+
+
+def record_size(record):
+    """Approximate the memory held by a task record by its JSON size."""
+    return len(json.dumps(record, default=str))
+
+
+class TaskStore(ABC):
+    """Interface shared by the task store backends.
+
+    Records are plain JSON-serializable dicts holding at least ``status``
+    and, once finished, ``data`` or ``error``. Every write bumps the
+    record's ``version`` so readers can wait for the next change. A
+    record in a terminal status is final: later updates are refused.
+    """
+
+    # how often wait_for_change re-reads a record when the backend cannot notify
+    poll_interval = 0.25
+
+    @abstractmethod
+    def create(self, task_id, record):
+        """Store `record` as version 1 of `task_id`, replacing any earlier record."""
+
+    @abstractmethod
+    def get(self, task_id):
+        """Return the record of `task_id`, or None if it does not exist or has expired."""
+
+    @abstractmethod
+    def update(self, task_id, **fields):
+        """Set `fields` on the record and bump its version.
+
+        Returns False, writing nothing, when the record already has a terminal status.
+        """
+
+    @abstractmethod
+    def delete(self, task_id):
+        """Remove the record of `task_id`."""
+
+    @abstractmethod
+    def sweep(self):
+        """Drop expired records and return how many were dropped."""
+
+    @abstractmethod
+    def stats(self):
+        """Return counters and limits for /stats."""
+
+    def is_local(self, task_id):
+        """True when `task_id` was created by this process and runs on its workers.
+
+        Stores shared between processes override this.
+        """
+        return True
+
+    def wait_for_change(self, task_id, version, timeout):
+        """Block until the record's version differs from `version` or `timeout` passes.
+
+        Returns the latest record, or None if the task does not exist.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            record = self.get(task_id)
+            remaining = deadline - time.monotonic()
+            if record is None or record.get('version') != version or remaining <= 0:
+                return record
+            time.sleep(min(self.poll_interval, remaining))
+
+    def start_sweeper(self, interval):
+        threading.Thread(
+            target=self._sweep_forever,
+            args=(interval,),
+            name="task-store-sweeper",
+            daemon=True
+        ).start()
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping task store: {str(e)}")
+
+
+class MemoryTaskStore(TaskStore):
+    """In-memory task records with TTL and LRU eviction.
+
+    Finished tasks expire `ttl` seconds after they reach a terminal status.
+    When `max_entries` or `max_bytes` is exceeded the least recently used
+    finished tasks are evicted first. Pending and processing tasks are never
+    evicted, their number is already bounded by the scheduler queues.
+    """
+
+    def __init__(self, ttl=3600, max_entries=1000, max_bytes=None, sweep_interval=60):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._records = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.counters = {
+            'expired': 0,
+            'evicted_entries': 0,
+            'evicted_bytes': 0,
+        }
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def create(self, task_id, record):
+        with self._lock:
+            self._put(task_id, dict(record, version=1))
+            self._enforce_limits()
+            self._changed.notify_all()
+
+    def get(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None:
+                return None
+            if self._is_expired(record, time.time()):
+                self._remove(task_id)
+                self.counters['expired'] += 1
+                return None
+            self._records.move_to_end(task_id)
+            return {k: v for k, v in record.items() if not k.startswith('_')}
+
+    def update(self, task_id, **fields):
+        with self._lock:
+            record = dict(self._records.get(task_id, {}))
+            if record.get('status') in TERMINAL_STATUSES:
+                return False
+            record.update(fields)
+            record['version'] = record.get('version', 0) + 1
+            if record.get('status') in TERMINAL_STATUSES:
+                record.setdefault('_finished_at', time.time())
+            self._put(task_id, record)
+            self._enforce_limits()
+            self._changed.notify_all()
+        return True
+
+    def delete(self, task_id):
+        with self._lock:
+            self._remove(task_id)
+            self._changed.notify_all()
+
+    def wait_for_change(self, task_id, version, timeout):
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._records.get(task_id, {}).get('version') != version,
+                timeout
+            )
+        return self.get(task_id)
+
+    def sweep(self):
+        """Drop every finished task whose TTL has passed."""
+        now = time.time()
+        with self._lock:
+            expired = [task_id for task_id, record in self._records.items() if self._is_expired(record, now)]
+            for task_id in expired:
+                self._remove(task_id)
+            self.counters['expired'] += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self.counters,
+                entries=len(self._records),
+                bytes=self._total_bytes,
+                ttl=self.ttl,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                backend="memory",
+            )
+
+    def _put(self, task_id, record):
+        self._remove(task_id)
+        self._records[task_id] = record
+        self._sizes[task_id] = record_size(record)
+        self._total_bytes += self._sizes[task_id]
+
+    def _remove(self, task_id):
+        if self._records.pop(task_id, None) is not None:
+            self._total_bytes -= self._sizes.pop(task_id)
+
+    def _is_expired(self, record, now):
+        finished_at = record.get('_finished_at')
+        return self.ttl is not None and finished_at is not None and now - finished_at > self.ttl
+
+    def _over_limits(self):
+        if self.max_entries is not None and len(self._records) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._total_bytes > self.max_bytes
+
+    def _enforce_limits(self):
+        if not self._over_limits():
+            return
+        # oldest first, only finished tasks are candidates
+        for task_id in [t for t, r in self._records.items() if r.get('status') in TERMINAL_STATUSES]:
+            if not self._over_limits():
+                break
+            self.counters['evicted_entries'] += 1
+            self.counters['evicted_bytes'] += self._sizes[task_id]
+            self._remove(task_id)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task records in a SQLite database running in WAL mode.
+
+    Every waitress process on the host can point at the same file, so a
+    task started by one process can be polled through any other and
+    survives restarts. Limits behave like MemoryTaskStore, ordered by last
+    access time. Tasks left unfinished by a process that is no longer
+    alive are marked failed when a store is opened.
+
+    Reads never take the write lock: access times are noted in memory and
+    written in one batch every `access_flush_interval` seconds, or before
+    the limits are enforced.
+    """
+
+    # seconds between batched writes of the access times noted by get()
+    access_flush_interval = 30
+
+    def __init__(self, path, ttl=3600, max_entries=1000, max_bytes=None, sweep_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # task_id -> time of the last read not yet written
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # counters are per process
+        self.counters = {
+            'expired': 0,
+            'evicted_entries': 0,
+            'evicted_bytes': 0,
+        }
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    owner_pid INTEGER NOT NULL,
+                    owner_boot TEXT,
+                    accessed_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+            if 'owner_boot' not in columns:
+                # databases created before owner_boot existed
+                conn.execute("ALTER TABLE tasks ADD COLUMN owner_boot TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_accessed_at ON tasks (accessed_at)")
+        self.recover_orphans()
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        # take the write lock up front so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _write(self, conn, task_id, record):
+        encoded = json.dumps(record, default=str)
+        finished_at = time.time() if record.get('status') in TERMINAL_STATUSES else None
+        conn.execute(
+            """
+            INSERT INTO tasks (task_id, status, record, size, owner_pid, owner_boot, accessed_at, finished_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(task_id) DO UPDATE SET
+                status = excluded.status,
+                record = excluded.record,
+                size = excluded.size,
+                accessed_at = excluded.accessed_at,
+                finished_at = COALESCE(tasks.finished_at, excluded.finished_at)
+            """,
+            (task_id, record.get('status', ''), encoded, len(encoded),
+             os.getpid(), BOOT_ID, time.time(), finished_at)
+        )
+
+    def create(self, task_id, record):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self._write(conn, task_id, dict(record, version=1))
+            self._enforce_limits(conn)
+
+    def get(self, task_id):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT record, finished_at FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record, finished_at = row
+        if self.ttl is not None and finished_at is not None and time.time() - finished_at > self.ttl:
+            self.delete(task_id)
+            self.counters['expired'] += 1
+            return None
+        self._touch(task_id)
+        return json.loads(record)
+
+    def wait_for_change(self, task_id, version, timeout):
+        """Like TaskStore.wait_for_change, but polls only the version column of the JSON.
+
+        Long-poll and SSE clients each poll several times a second, so the
+        loop neither decodes the record nor notes an access until it returns.
+        """
+        deadline = time.monotonic() + timeout
+        conn = self._connection()
+        while True:
+            row = conn.execute(
+                "SELECT json_extract(record, '$.version') FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            remaining = deadline - time.monotonic()
+            if row is None or row[0] != version or remaining <= 0:
+                return self.get(task_id)
+            time.sleep(min(self.poll_interval, remaining))
+
+    def _touch(self, task_id):
+        with self._accessed_lock:
+            self._accessed[task_id] = time.time()
+            due = time.monotonic() - self._last_flush >= self.access_flush_interval
+        if due:
+            with self._transaction() as conn:
+                self._flush_access_times(conn)
+
+    def _flush_access_times(self, conn):
+        """Write the access times noted since the last flush, inside the caller's transaction."""
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+            self._last_flush = time.monotonic()
+        if accessed:
+            conn.executemany(
+                "UPDATE tasks SET accessed_at = MAX(accessed_at, ?) WHERE task_id = ?",
+                [(accessed_at, task_id) for task_id, accessed_at in accessed.items()]
+            )
+
+    def update(self, task_id, **fields):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT record, finished_at FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row and row[1] is not None:
+                # e.g. a worker in this process finishing a task another process cancelled
+                return False
+            record = json.loads(row[0]) if row else {}
+            record.update(fields)
+            record['version'] = record.get('version', 0) + 1
+            self._write(conn, task_id, record)
+            self._enforce_limits(conn)
+        return True
+
+    def is_local(self, task_id):
+        row = self._connection().execute(
+            "SELECT owner_pid, owner_boot FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return row is not None and row[0] == os.getpid() and row[1] == BOOT_ID
+
+    def delete(self, task_id):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def sweep(self):
+        if self.ttl is None:
+            return 0
+        with self._transaction() as conn:
+            self._flush_access_times(conn)
+            expired = conn.execute(
+                "DELETE FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.ttl,)
+            ).rowcount
+        self.counters['expired'] += expired
+        return expired
+
+    def recover_orphans(self):
+        """Fail unfinished tasks whose owning process has died.
+
+        A task written under this PID but another BOOT_ID belongs to an
+        earlier server that had the same PID, and is failed too.
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT task_id, owner_pid, owner_boot FROM tasks WHERE finished_at IS NULL"
+        ).fetchall()
+        for task_id, owner_pid, owner_boot in rows:
+            if owner_pid == os.getpid():
+                if owner_boot == BOOT_ID:
+                    continue
+            elif _pid_alive(owner_pid):
+                continue
+            self.update(
+                task_id,
+                status=TaskStatus.FAILED.value,
+                error="The server restarted before the task finished"
+            )
+
+    def stats(self):
+        conn = self._connection()
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tasks").fetchone()
+        return dict(
+            self.counters,
+            entries=entries,
+            bytes=total_bytes,
+            ttl=self.ttl,
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            backend="sqlite",
+        )
+
+    def _enforce_limits(self, conn):
+        terminal = tuple(TERMINAL_STATUSES)
+        placeholders = ",".join("?" * len(terminal))
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tasks").fetchone()
+        over_entries = max(0, entries - self.max_entries) if self.max_entries is not None else 0
+        over_bytes = max(0, total_bytes - self.max_bytes) if self.max_bytes is not None else 0
+        if not over_entries and not over_bytes:
+            return
+        # eviction goes by last access, so write the pending reads first
+        self._flush_access_times(conn)
+        candidates = conn.execute(
+            f"SELECT task_id, size FROM tasks WHERE status IN ({placeholders}) ORDER BY accessed_at",
+            terminal
+        )
+        evicted = []
+        for task_id, size in candidates:
+            if over_entries <= 0 and over_bytes <= 0:
+                break
+            evicted.append(task_id)
+            over_entries -= 1
+            over_bytes -= size
+            self.counters['evicted_entries'] += 1
+            self.counters['evicted_bytes'] += size
+        conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(t,) for t in evicted])
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_task_store():
+    """Build the task store selected by ``TASK_STORE_BACKEND`` (``memory`` or ``sqlite``).
+
+    Limits come from ``TASK_TTL``, ``TASK_STORE_MAX_ENTRIES`` and
+    ``TASK_STORE_MAX_BYTES``, the SQLite file from ``TASK_STORE_PATH``.
+    """
+    max_bytes = os.getenv("TASK_STORE_MAX_BYTES")
+    options = dict(
+        ttl=int(os.getenv("TASK_TTL", 3600)),
+        max_entries=int(os.getenv("TASK_STORE_MAX_ENTRIES", 1000)),
+        max_bytes=int(max_bytes) if max_bytes else None,
+        sweep_interval=int(os.getenv("TASK_STORE_SWEEP_INTERVAL", 60)),
+    )
+    backend = os.getenv("TASK_STORE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteTaskStore(os.getenv("TASK_STORE_PATH", "tasks.db"), **options)
+    if backend != "memory":
+        raise ValueError(f"Unknown TASK_STORE_BACKEND: {backend}")
+    return MemoryTaskStore(**options)
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# the backend imports its modules relative to src/backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def on_page():
+    """Run ``await fn(page)`` on a headless Chromium page showing a fixture.
+
+    Skips the test when Playwright or its Chromium build is not installed.
+    """
+    async_api = pytest.importorskip("playwright.async_api")
+
+    def run(fixture, fn):
+        async def main():
+            async with async_api.async_playwright() as playwright:
+                try:
+                    browser = await playwright.chromium.launch()
+                except async_api.Error as error:
+                    pytest.skip(f"Chromium is not installed: {error.message.splitlines()[0]}")
+                try:
+                    page = await browser.new_page()
+                    await page.set_content(read_fixture(fixture))
+                    return await fn(page)
+                finally:
+                    await browser.close()
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,39 @@
+import pytest
+
+from Agent.airports import resolve_airport, search_airport
+
+
+@pytest.mark.parametrize("name, code", [
+    ("JFK", "JFK"),
+    ("jfk", "JFK"),
+    ("Hanoi (HAN)", "HAN"),
+    ("Noi Bai International Airport (han)", "HAN"),
+    ("Hanoi", "HAN"),
+    ("Hà Nội", "HAN"),
+    ("Hồ Chí Minh", "SGN"),
+    ("Sài Gòn", "SGN"),
+    ("Đà Nẵng", "DAD"),
+    ("Đà Lạt", "DLI"),
+    ("Huế", "HUI"),
+    ("Phú Quốc", "PQC"),
+    ("Paris, France", "PAR"),
+    ("New York City", "NYC"),
+    ("  london  ", "LON"),
+    ("Atlantis", None),
+    ("", None),
+    (None, None),
+])
+def test_resolve_airport(name, code):
+    assert resolve_airport(name) == code
+
+
+@pytest.mark.parametrize("code, airport", [
+    ("NYC", "JFK"),
+    ("LON", "LHR"),
+    ("PAR", "CDG"),
+    ("SEL", "ICN"),
+    ("HAN", "HAN"),
+    ("LGA", "LGA"),
+])
+def test_search_airport(code, airport):
+    assert search_airport(code) == airport
@@ -0,0 +1,118 @@
+import json
+from html.parser import HTMLParser
+
+import pytest
+
+from Agent.flight_extractor import extract_flights, parse_flight_label, pick_best_flight
+from conftest import read_fixture
+
+
+class _CardLabels(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.labels = {"shown": [], "template": []}
+        self.in_template = False
+
+    def handle_starttag(self, tag, attrs):
+        label = dict(attrs).get("aria-label") or ""
+        if tag == "template":
+            self.in_template = True
+        elif tag == "div" and label.startswith("From "):
+            self.labels["template" if self.in_template else "shown"].append(label)
+
+    def handle_endtag(self, tag):
+        if tag == "template":
+            self.in_template = False
+
+
+def flights(fixture, part="shown"):
+    """Parsed result cards of a fixture; ``part="template"`` for the list swapped in on click."""
+    parser = _CardLabels()
+    parser.feed(read_fixture(fixture))
+    return [parse_flight_label(label) for label in parser.labels[part]]
+
+
+def test_parse_round_trip_nonstop():
+    assert flights("google_flights_round_trip.html")[0] == {
+        "start_time": "6:00 AM on Tuesday, June 3",
+        "end_time": "8:10 AM on Tuesday, June 3",
+        "origin": "Noi Bai International Airport",
+        "destination": "Tan Son Nhat International Airport",
+        "price": "2,459,000 VND",
+        "num_stops": 0,
+        "duration": "2h 10m",
+        "airline": "Vietnam Airlines",
+        "stop_locations": "",
+    }
+
+
+def test_parse_layover():
+    flight = flights("google_flights_round_trip.html")[2]
+    assert flight["num_stops"] == 1
+    assert flight["duration"] == "6h 35m"
+    assert flight["stop_locations"] == "Da Nang International Airport (3h 10m)"
+
+
+def test_parse_multi_stop_with_overnight_layover():
+    flight = flights("google_flights_round_trip.html")[3]
+    assert flight["num_stops"] == 2
+    assert flight["airline"] == "Vietnam Airlines, Thai"
+    assert flight["end_time"] == "12:20 AM on Wednesday, June 4"
+    assert flight["stop_locations"] == "Suvarnabhumi Airport (1h 20m), Singapore Changi Airport (6h 45m)"
+
+
+def test_parse_one_way():
+    first, _, _, last = flights("google_flights_one_way.html")
+    assert first["price"] == "612 USD"
+    assert first["end_time"] == "9:05 AM on Monday, May 19"
+    assert last["stop_locations"] == "Boston Logan International Airport (2h 0m), Humberto Delgado Airport (3h 5m)"
+
+
+def test_parse_skips_cards_without_flight_details():
+    assert flights("google_flights_round_trip.html")[4] is None
+    assert parse_flight_label("") is None
+
+
+@pytest.mark.parametrize("preferences, best", [
+    (None, 2),
+    ({}, 2),
+    # preferred airlines come before cheaper flights
+    ({"airlines": ["Vietnam Airlines"]}, 0),
+    ({"airlines": ["vietjet"]}, 1),
+    # no preferred airline on the page, so the cheapest
+    ({"airlines": ["Qantas"]}, 2),
+    # the preferred airline over budget is still preferred
+    ({"airlines": ["Vietnam Airlines"], "budget": "2,000,000 VND"}, 0),
+    ({"airlines": ["Vietnam Airlines", "VietJet"], "budget": "2,000,000 VND"}, 1),
+])
+def test_pick_best_outbound(preferences, best):
+    candidates = [flight for flight in flights("google_flights_round_trip.html") if flight]
+    assert pick_best_flight(candidates, preferences) == best
+
+
+def test_pick_best_breaks_price_ties_by_duration():
+    assert pick_best_flight(flights("google_flights_round_trip.html", "template"), {}) == 1
+
+
+def test_pick_best_breaks_price_ties_by_stops():
+    assert pick_best_flight(flights("google_flights_one_way.html"), {}) == 2
+
+
+def test_pick_best_within_budget():
+    candidates = flights("google_flights_one_way.html")
+    assert pick_best_flight(candidates, {"airlines": ["Air France", "Delta"], "budget": "$700"}) == 0
+    assert pick_best_flight(candidates, {"airlines": ["Delta"], "budget": "$700"}) == 1
+
+
+def test_extract_round_trip(on_page):
+    result = json.loads(on_page("google_flights_round_trip.html", lambda page: extract_flights(page, {})))
+    assert result["outbound_flight"]["airline"] == "Bamboo Airways"
+    # equal totals on the return list, the shorter flight wins
+    assert result["return_flight"]["start_time"] == "8:00 AM on Tuesday, June 10"
+    assert result["return_flight"]["duration"] == "2h 5m"
+
+
+def test_extract_one_way(on_page):
+    result = json.loads(on_page("google_flights_one_way.html", lambda page: extract_flights(page, {"airlines": ["Air France"]})))
+    assert result["outbound_flight"]["airline"] == "Air France"
+    assert result["return_flight"] is None
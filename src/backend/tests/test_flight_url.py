@@ -0,0 +1,147 @@
+import base64
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from Agent.flight_url import ALL_RESULTS, ONE_WAY, ROUND_TRIP, build_flight_url, encode_tfs, seat_class
+
+# copied from Google Flights: TPE -> MYJ on 2024-05-28, back on 2024-05-30,
+# one adult in economy (also the example URL of the fast-flights README)
+GOOGLE_TPE_MYJ = (
+    "CBwQAhoeEgoyMDI0LTA1LTI4agcIARIDVFBFcgcIARIDTVlKGh4SCjIwMjQtMDUtMzBqBwgBEgNNWUpyBwgBEgNUUEVA"
+    "AUgBcAGCAQsI____________AZgBAQ"
+)
+
+
+def _varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def decode(data):
+    """Protobuf fields of `data` as ``[(number, value)]``, nested messages left as bytes."""
+    fields = []
+    position = 0
+    while position < len(data):
+        key, position = _varint(data, position)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, position = _varint(data, position)
+        elif wire == 2:
+            length, position = _varint(data, position)
+            value = data[position:position + length]
+            position += length
+        else:
+            raise ValueError(f"unexpected wire type {wire}")
+        fields.append((number, value))
+    return fields
+
+
+def decode_tfs(tfs):
+    return decode(base64.urlsafe_b64decode(tfs + "=" * (-len(tfs) % 4)))
+
+
+def search(url):
+    """Legs, passengers, seat and trip of a Google Flights URL."""
+    query = parse_qs(urlparse(url).query)
+    fields = decode_tfs(query["tfs"][0])
+    legs = []
+    for number, leg in fields:
+        if number != 3:
+            continue
+        leg = dict(decode(leg))
+        legs.append((
+            leg[2].decode(),
+            dict(decode(leg[13])),
+            dict(decode(leg[14])),
+        ))
+    return {
+        "legs": legs,
+        "passengers": [value for number, value in fields if number == 8],
+        "seat": dict(fields)[9],
+        "trip": dict(fields)[19],
+        "hl": query["hl"][0],
+    }
+
+
+def test_encode_tfs_matches_google_round_trip():
+    tfs = encode_tfs([("2024-05-28", "TPE", "MYJ"), ("2024-05-30", "MYJ", "TPE")])
+    assert tfs == GOOGLE_TPE_MYJ
+
+
+def test_encode_tfs_writes_google_header_fields():
+    fields = decode_tfs(encode_tfs([("2025-06-01", "HAN", "SGN")], trip=ONE_WAY))
+    header = [(number, value) for number, value in fields if number != 3]
+    assert header[:2] == [(1, 28), (2, 2)]
+    assert (14, 1) in header
+    assert decode(dict(header)[16]) == [(1, ALL_RESULTS)]
+    assert [number for number, _ in fields] == sorted(number for number, _ in fields)
+
+
+def test_build_flight_url_round_trip():
+    url = build_flight_url("TPE", "MYJ", "2024-05-28", "2024-05-30")
+    assert url == f"https://www.google.com/travel/flights/search?tfs={GOOGLE_TPE_MYJ}&hl=en"
+
+
+def test_build_flight_url_one_way():
+    result = search(build_flight_url("Hà Nội", "Đà Nẵng", "June 3, 2025"))
+    assert result["trip"] == ONE_WAY
+    assert result["legs"] == [("2025-06-03", {1: 1, 2: b"HAN"}, {1: 1, 2: b"DAD"})]
+
+
+def test_build_flight_url_passenger_counts():
+    url = build_flight_url("SGN", "BKK", "2025-06-03", "2025-06-10",
+                           adults=2, children=1, infants_in_seat=1, infants_on_lap=1)
+    result = search(url)
+    assert result["trip"] == ROUND_TRIP
+    assert result["passengers"] == [1, 1, 2, 3, 4]
+
+
+def test_build_flight_url_at_least_one_adult():
+    assert search(build_flight_url("SGN", "BKK", "2025-06-03", adults=0))["passengers"] == [1]
+
+
+@pytest.mark.parametrize("ticket_class, seat", [
+    (None, 1),
+    ("Economy", 1),
+    ("Premium Economy", 2),
+    ("premium-economy class", 2),
+    ("Business", 3),
+    ("First class", 4),
+    ("unknown", 1),
+])
+def test_build_flight_url_cabin_classes(ticket_class, seat):
+    assert seat_class(ticket_class) == seat
+    url = build_flight_url("JFK", "CDG", "2025-05-18", ticket_class=ticket_class)
+    assert search(url)["seat"] == seat
+
+
+def test_build_flight_url_searches_main_airport_of_metropolitan_codes():
+    # only single airports have been seen encoded in Google's URLs
+    result = search(build_flight_url("New York", "Paris", "2025-05-20", "2025-05-25"))
+    assert result["legs"] == [
+        ("2025-05-20", {1: 1, 2: b"JFK"}, {1: 1, 2: b"CDG"}),
+        ("2025-05-25", {1: 1, 2: b"CDG"}, {1: 1, 2: b"JFK"}),
+    ]
+    assert search(build_flight_url("LON", "TYO", "2025-05-20"))["legs"][0][1:] == (
+        {1: 1, 2: b"LHR"}, {1: 1, 2: b"HND"}
+    )
+
+
+def test_build_flight_url_language():
+    assert search(build_flight_url("HAN", "SGN", "2025-06-03", language="vi"))["hl"] == "vi"
+
+
+@pytest.mark.parametrize("origin, destination, start_date, end_date", [
+    ("Atlantis", "HAN", "2025-06-03", None),
+    ("HAN", "SGN", "sometime soon", None),
+    ("HAN", "SGN", "2025-06-03", "later"),
+])
+def test_build_flight_url_unresolved(origin, destination, start_date, end_date):
+    assert build_flight_url(origin, destination, start_date, end_date) is None
@@ -0,0 +1,129 @@
+import pytest
+
+from Agent.hotel_extractor import (
+    HOTEL_NAME_SELECTOR,
+    READ_CARDS_JS,
+    HotelRecord,
+    _nights,
+    extract_hotels,
+    parse_hotel_card,
+    rank_hotels,
+)
+
+# what READ_CARDS_JS returns for cards of the fixtures
+LA_SIESTA_CARD = {
+    "name": "Hanoi La Siesta Hotel Trendy",
+    "text": "Hanoi La Siesta Hotel Trendy\n4.7 (2.3K)\n4-star hotel\n0.4 km from Hoan Kiem Lake\n"
+            "Free Wi-Fi\nFree breakfast\nSpa\nFree Wi-Fi\n$95",
+    "rating_label": "4.7 out of 5 stars from 2,315 reviews",
+    "labels": ["4.7 out of 5 stars from 2,315 reviews", "Prices starting from $95, nightly"],
+    "amenities": ["Free Wi-Fi", "Free breakfast", "Spa", "Free Wi-Fi"],
+    "url": "https://www.google.com/travel/hotels/entity/hanoi-la-siesta",
+}
+SALA_CARD = {
+    "name": "Sala Danang Beach Hotel",
+    "text": "Sala Danang Beach Hotel\n4.7 (2.8K)\n36-38 Lam Hoang Street, Son Tra District\nPool\nSpa\nDeal 1.320.000 ₫",
+    "rating_label": "4.7 out of 5 stars from 2,890 reviews",
+    "labels": ["4.7 out of 5 stars from 2,890 reviews"],
+    "amenities": ["Pool", "Spa"],
+    "url": "https://www.google.com/travel/hotels/entity/sala-danang",
+}
+
+
+def hotel(name, price, rating):
+    return HotelRecord(name=name, price_per_night=price, rating=rating)
+
+
+def test_parse_card():
+    assert parse_hotel_card(LA_SIESTA_CARD, nights=3) == HotelRecord(
+        name="Hanoi La Siesta Hotel Trendy",
+        price_per_night="95 $",
+        total_price="285 $",
+        rating=4.7,
+        reviews=2315,
+        address="0.4 km from Hoan Kiem Lake",
+        amenities=["Free Wi-Fi", "Free breakfast", "Spa"],
+        url="https://www.google.com/travel/hotels/entity/hanoi-la-siesta",
+    )
+
+
+def test_parse_card_price_from_text_in_dong():
+    record = parse_hotel_card(SALA_CARD, nights=2)
+    assert record.price_per_night == "1,320,000 ₫"
+    assert record.total_price == "2,640,000 ₫"
+    assert record.address == "36-38 Lam Hoang Street, Son Tra District"
+
+
+def test_parse_card_without_nights_or_price():
+    assert parse_hotel_card(LA_SIESTA_CARD).total_price is None
+    record = parse_hotel_card(dict(LA_SIESTA_CARD, labels=[], text="Hanoi La Siesta Hotel Trendy\nCheck availability"))
+    assert record.price_per_night is None
+    assert record.total_price is None
+
+
+def test_parse_card_without_name():
+    assert parse_hotel_card(dict(LA_SIESTA_CARD, name="  ")) is None
+
+
+@pytest.mark.parametrize("check_in, check_out, nights", [
+    ("2025-06-03", "2025-06-06", 3),
+    ("June 3, 2025", "Tuesday, June 10, 2025", 7),
+    ("30/06/2025", "02/07/2025", 2),
+    ("2025-06-06", "2025-06-03", None),
+    ("2025-06-03", "2025-06-03", None),
+    ("2025-06-03", None, None),
+    ("next week", "2025-06-06", None),
+])
+def test_nights(check_in, check_out, nights):
+    assert _nights(check_in, check_out) == nights
+
+
+def test_rank_by_rating_then_price():
+    hotels = [hotel("A", "$95", 4.7), hotel("B", "$320", 4.8), hotel("C", "$80", 4.7), hotel("D", None, None)]
+    assert [h.name for h in rank_hotels(hotels, {})] == ["B", "C", "A", "D"]
+
+
+def test_rank_within_budget_and_rating_first():
+    hotels = [hotel("A", "$95", 4.7), hotel("B", "$320", 4.8), hotel("C", "$18", 4.3), hotel("D", "$140", 4.6)]
+    ranked = rank_hotels(hotels, {"price": "$150", "rating": "4.5 stars and up"})
+    assert [h.name for h in ranked] == ["A", "D", "B", "C"]
+
+
+def test_rank_unpriced_hotels_do_not_fit_a_budget():
+    hotels = [hotel("A", None, 4.9), hotel("B", "₫650,000", 4.2)]
+    assert [h.name for h in rank_hotels(hotels, {"price": "₫1,000,000"})] == ["B", "A"]
+
+
+def test_read_cards_skips_non_hotel_headings(on_page):
+    async def read(page):
+        return await page.evaluate(READ_CARDS_JS, HOTEL_NAME_SELECTOR)
+
+    cards = on_page("google_travel_hotels_vnd.html", read)
+    assert [card["name"] for card in cards] == [
+        "À La Carte Da Nang Beach", "Sala Danang Beach Hotel", "Fivitel Boutique Da Nang",
+    ]
+    records = [parse_hotel_card(card, nights=2) for card in cards]
+    assert [record.price_per_night for record in records] == ["1,850,000 ₫", "1,320,000 ₫", "650,000 ₫"]
+    assert [record.total_price for record in records] == ["3,700,000 ₫", "2,640,000 ₫", "1,300,000 ₫"]
+    assert records[0].reviews == 6210
+    assert records[0].amenities == ["Pool", "Free Wi-Fi", "Air-conditioned"]
+    assert records[0].url == "https://www.google.com/travel/hotels/entity/a-la-carte-da-nang"
+
+
+def test_extract_follows_pages(on_page):
+    async def extract(page):
+        return await extract_hotels(page, {"price": "$150", "rating": "4.5"}, "2025-06-03", "2025-06-05")
+
+    hotels = on_page("google_travel_hotels_paginated.html", extract)
+    # the unpriced card on page 1 only reaches a price at the whole list and
+    # is skipped, La Siesta is on both pages and kept once
+    assert [h.name for h in hotels] == [
+        "Hanoi La Siesta Hotel Trendy",
+        "Hotel de l'Opera Hanoi - MGallery",
+        "Sofitel Legend Metropole Hanoi",
+        "Tirant Hotel",
+        "Little Charm Hanoi Hostel",
+    ]
+    assert hotels[0].total_price == "190 $"
+    assert hotels[3].price_per_night == "1,250 $"
+    assert hotels[2].address == "15 Ngo Quyen Street, Hoan Kiem District"
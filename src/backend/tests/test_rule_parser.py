@@ -0,0 +1,107 @@
+import pytest
+
+from benchmarks.rule_parser_benchmark import FLIGHT_CORPUS, HOTEL_CORPUS, TODAY, _same
+from rule_parser import (
+    find_airline,
+    find_budget,
+    find_cabin,
+    find_date_range,
+    find_route,
+    mentions_airline,
+    parse_flight_request,
+    parse_hotel_request,
+)
+
+
+def _check(fields, expected):
+    """Every field read matches the corpus and every expected field was read."""
+    for field, value in fields.items():
+        if value is not None:
+            assert field in expected, f"read {field}={value!r} that the request does not give"
+            assert _same(field, value, expected[field]), f"{field}: {value!r}, expected {expected[field]!r}"
+    for field in expected:
+        assert fields.get(field) is not None, f"{field} was not read"
+
+
+@pytest.mark.parametrize("text, expected", FLIGHT_CORPUS, ids=[text[:40] for text, _ in FLIGHT_CORPUS])
+def test_parse_flight_request(text, expected):
+    fields, _ = parse_flight_request(text, TODAY)
+    _check(fields, expected)
+
+
+@pytest.mark.parametrize("text, expected", HOTEL_CORPUS, ids=[text[:40] for text, _ in HOTEL_CORPUS])
+def test_parse_hotel_request(text, expected):
+    fields, _ = parse_hotel_request(text, TODAY)
+    _check(fields, expected)
+
+
+@pytest.mark.parametrize("text, route", [
+    ("from LAX to NYC", ("LAX", "NYC")),
+    ("fly to Tokyo from Ho Chi Minh City", ("Ho Chi Minh City", "Tokyo")),
+    ("flights between Berlin and Rome", ("Berlin", "Rome")),
+    ("from Hanoi to Saigon, returning to Hanoi", ("Hanoi", "Saigon")),
+    # the same city twice is no route, the origin is left to the LLM
+    ("Hanoi to Hà Nội", (None, "Hà Nội")),
+])
+def test_find_route(text, route):
+    assert find_route(text) == route
+
+
+@pytest.mark.parametrize("text, start, end", [
+    ("Dec 28 returning Jan 3", "2025-12-28", "2026-01-03"),
+    ("from 20/06/2025 to 27/06/2025", "2025-06-20", "2025-06-27"),
+    ("next Friday for a week", "2025-04-11", "2025-04-18"),
+    ("in 2 weeks for 10 nights", "2025-04-24", "2025-05-04"),
+    ("sometime in the summer", None, None),
+])
+def test_find_date_range(text, start, end):
+    found = find_date_range(text, TODAY)
+    assert tuple(d.isoformat() if d else None for d in found) == (start, end)
+
+
+@pytest.mark.parametrize("text, budget", [
+    ("budget $1000", "$1000"),
+    ("max 800 USD", "800 USD"),
+    ("under 3.000.000 VND", "3.000.000 VND"),
+    ("Dec 1-8, British Airways", None),
+])
+def test_find_budget(text, budget):
+    assert find_budget(text) == budget
+
+
+@pytest.mark.parametrize("text, cabin", [
+    ("economy class tickets", "Economy"),
+    ("flying business", "Business"),
+    ("premium economy", "Premium Economy"),
+    ("JFK to CDG, first class", "First"),
+    # a date, not a cabin
+    ("in the first week of May", None),
+    ("on the first of June", None),
+    ("business trip to Hanoi", None),
+])
+def test_find_cabin(text, cabin):
+    assert find_cabin(text) == cabin
+
+
+@pytest.mark.parametrize("text, airline", [
+    ("with Air France Airlines", "Air France"),
+    ("Hanoi to Dubai on Emirates", "Emirates"),
+    ("JFK to LAX with Delta", "Delta"),
+    ("with Vietjet", "Vietjet Air"),
+    # place names that contain an airline name
+    ("to Dubai, United Arab Emirates", None),
+    ("to see the Mekong Delta", None),
+    ("from London, United Kingdom", None),
+    ("with my sister Ana", None),
+])
+def test_find_airline(text, airline):
+    assert find_airline(text) == airline
+
+
+@pytest.mark.parametrize("text, mentioned", [
+    ("a flight on a small carrier", True),
+    ("Fly from Hanoi to Dubai, United Arab Emirates", False),
+    ("to see the Mekong Delta", False),
+])
+def test_mentions_airline(text, mentioned):
+    assert mentions_airline(text) is mentioned
@@ -0,0 +1,76 @@
+import pytest
+
+from Agent import youtube_search
+from Agent.youtube_search import extract_initial_data, parse_video_results, search_videos
+from conftest import read_fixture
+
+RESULTS_PAGE = read_fixture("youtube_results.html")
+
+
+def test_extract_initial_data_var_marker():
+    data = extract_initial_data(RESULTS_PAGE)
+    assert data["estimatedResults"] == "48213577"
+    # "</script>" inside a string is escaped in the page and must not end the JSON
+    assert data["refinements"][1] == "hanoi food </script> tour"
+
+
+def test_extract_initial_data_window_marker():
+    page = RESULTS_PAGE.replace("var ytInitialData = ", 'window["ytInitialData"] = ')
+    assert 'var ytInitialData' not in page
+    assert extract_initial_data(page) == extract_initial_data(RESULTS_PAGE)
+
+
+def test_extract_initial_data_missing():
+    with pytest.raises(ValueError):
+        extract_initial_data("<html><body>Before you continue to YouTube</body></html>")
+
+
+def test_parse_video_results():
+    videos = parse_video_results(extract_initial_data(RESULTS_PAGE))
+    assert videos[0] == {
+        "video_id": "dQ8bXq0Yk2c",
+        "url": "https://www.youtube.com/watch?v=dQ8bXq0Yk2c",
+        "title": "HANOI TRAVEL GUIDE 2025 | 15 Things to Know Before You Go",
+        "duration": "18:42",
+        "views": "1,284,331 views",
+        "channel": "Lost LeBlanc",
+    }
+    assert videos[1]["duration"] == "1:02:07"
+    assert videos[1]["title"] == "Hanoi Old Quarter Street Food Tour \U0001F1FB\U0001F1F3"
+
+
+def test_parse_video_results_skips_live_duplicates_ads_and_shorts():
+    ids = [video["video_id"] for video in parse_video_results(extract_initial_data(RESULTS_PAGE))]
+    # page order, the repeat in "People also watched" kept once
+    assert ids == ["dQ8bXq0Yk2c", "Lq3kX9v2mTs", "Wb7hN4cR1aE", "Pq5Zr8tYu1o"]
+    assert "Jx1LiveNow0" not in ids
+
+
+def test_parse_video_results_empty():
+    assert parse_video_results({"contents": {}}) == []
+
+
+class _Response:
+    text = RESULTS_PAGE
+
+    def raise_for_status(self):
+        pass
+
+
+class _Session:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append((url, params))
+        return _Response()
+
+
+def test_search_videos(monkeypatch):
+    session = _Session()
+    monkeypatch.setattr(youtube_search, "_session", session)
+    videos = search_videos("hanoi travel guide", limit=2)
+    assert [video["video_id"] for video in videos] == ["dQ8bXq0Yk2c", "Lq3kX9v2mTs"]
+    assert session.requests == [
+        ("https://www.youtube.com/results", {"search_query": "hanoi travel guide", "hl": "en"}),
+    ]
@@ -1,10 +1,17 @@
 from langchain.output_parsers import PydanticOutputParser
 from datetime import datetime
 from config.model import model
+from llm_cache import invoke_cached
+from metrics import RULE_PARSES
+from rule_parser import parse_flight_request, parse_hotel_request
 from pydantic import BaseModel, Field
 from typing import Optional
 import json
+import os
 import re
+
+# set RULE_PARSER=false to send every request to the LLM
+RULE_PARSER_ENABLED = os.getenv("RULE_PARSER", "true").lower() in ("1", "true", "yes")
 def clean_json_response(response):
     """Remove markdown code block and convert to valid JSON"""
     match = re.search(r"```json\n(.*?)\n```", response, re.DOTALL)
@@ -32,7 +39,9 @@ parser = PydanticOutputParser(pydantic_object=FlightDetails)
 def correct_date_field_flight(json_data):
     dates = ["start_date", "end_date"]  # Các trường ngày cần xử lý
     for date in dates:
-        date_str = json_data[date]
+        date_str = json_data.get(date)
+        if not date_str:
+            continue
         try:
             # Chuyển đổi từ định dạng YYYY-MM-DD sang đối tượng datetime
             dt = datetime.strptime(date_str, "%Y-%m-%d")
@@ -43,6 +52,21 @@ def correct_date_field_flight(json_data):
             print(f"Date correction failed for {date}: {e}")
     return json_data
 def get_flight_details(requirements):
+    """Extract the FlightDetails of a request.
+
+    The rule-based parser handles the common phrasings without a model
+    call; the LLM is only asked when it leaves fields unresolved, and its
+    answer never overrides a value the rules read.
+    """
+    fields = {}
+    if RULE_PARSER_ENABLED:
+        fields, unresolved = parse_flight_request(requirements)
+        if not unresolved:
+            RULE_PARSES.inc(parser="flight", outcome="rules")
+            return FlightDetails(**correct_date_field_flight(fields))
+        RULE_PARSES.inc(parser="flight", outcome="llm_fallback")
+        print(f"Rule parser left {', '.join(unresolved)} to the LLM")
+
     prompt = f"""
         Extract detailed travel information from the user's input.
         Ensure the result is returned as valid JSON in the following format:
@@ -53,9 +77,41 @@ def get_flight_details(requirements):
         {requirements}
     """
     
-    response = model.invoke(prompt).content  
-    json_response = correct_date_field_flight(clean_json_response(response)  )
-    return FlightDetails(**json_response) 
+    response = invoke_cached(model, prompt, "flight_details").content
+    json_response = clean_json_response(response)
+    # the LLM only fills what the rules could not read
+    json_response.update({name: value for name, value in fields.items() if value is not None})
+    return FlightDetails(**correct_date_field_flight(json_response))
+
+
+class TripDetails(BaseModel):
+    origin: Optional[str] = Field(None, description="Origin location")
+    destination: Optional[str] = Field(None, description="Destination location")
+    start_date: Optional[str] = Field(None, description="Departure date, also the hotel check-in date (YYYY-MM-DD)")
+    end_date: Optional[str] = Field(None, description="Return date, also the hotel check-out date (YYYY-MM-DD)")
+    budget: Optional[str] = Field(None, description="Flight budget")
+    ticket_class: Optional[str] = Field(None, description="Ticket class")
+    airline: Optional[str] = Field(None, description="Airline")
+    hotel_location: Optional[str] = Field(None, description="Where to stay, if different from the destination")
+    price_per_night: Optional[str] = Field(None, description="Hotel price per night with currency")
+    rating: Optional[str] = Field(None, description="Hotel rating")
+    amenities: Optional[str] = Field(None, description="Hotel amenities")
+# Flight and hotel details in one call, for /search_trip
+trip_parser = PydanticOutputParser(pydantic_object=TripDetails)
+def get_trip_details(requirements):
+    prompt = f"""
+        Extract the flight and hotel information for this trip from the user's input.
+        Ensure the result is returned as valid JSON in the following format:
+
+        {trip_parser.get_format_instructions()}
+
+        User input:
+        {requirements}
+    """
+
+    response = invoke_cached(model, prompt, "trip_details").content
+    json_response = correct_date_field_flight(clean_json_response(response))
+    return TripDetails(**json_response)
 
 
 class HotelDetails(BaseModel):
@@ -68,6 +124,16 @@ class HotelDetails(BaseModel):
 # Create parser
 hotel_parser = PydanticOutputParser(pydantic_object=HotelDetails)
 def get_hotel_details(summary_text):
+    """Extract the HotelDetails of a request, by rules first like get_flight_details."""
+    fields = {}
+    if RULE_PARSER_ENABLED:
+        fields, unresolved = parse_hotel_request(summary_text)
+        if not unresolved:
+            RULE_PARSES.inc(parser="hotel", outcome="rules")
+            return HotelDetails(**fields)
+        RULE_PARSES.inc(parser="hotel", outcome="llm_fallback")
+        print(f"Rule parser left {', '.join(unresolved)} to the LLM")
+
     prompt = f"""
         Extract the most relevant hotel information from the following summary text.
         Ensure the result is returned as valid JSON in the following format:
@@ -78,8 +144,10 @@ def get_hotel_details(summary_text):
         {summary_text}
     """
     
-    response = model.invoke(prompt).content
+    response = invoke_cached(model, prompt, "hotel_details").content
     json_data = clean_json_response(response)
+    # the LLM only fills what the rules could not read
+    json_data.update({name: value for name, value in fields.items() if value is not None})
     return HotelDetails(**json_data)
 
 
@@ -120,7 +188,7 @@ def get_restaurant_details(summary_text):
         {summary_text}
     """
     
-    response = model.invoke(prompt).content
+    response = invoke_cached(model, prompt, "restaurant_details").content
     json_data = correct_date_field(clean_json_response(response))
     return RestaurantDetails(**json_data)
 
@@ -6,6 +6,8 @@ FLIGHT_DESCRIPTION_PLACEHOLDER = """Example: I want to fly from LAX to NYC from
 Budget around $1000 for flight"""
 HOTEL_DESCRIPTION_PLACEHOLDER = """Example: I'm planning a trip to Paris from May 20, 2025, to May 25, 2025. 
 I'm looking for a hotel with a nightly price under 3.000.000 and a rating of 4 stars or higher."""
+TRIP_DESCRIPTION_PLACEHOLDER = """Example: I want to fly from Hanoi to Paris from May 20, 2025 to May 25, 2025, economy class.
+I need a hotel near the city center under 150 EUR per night with a rating of 4 stars or higher."""
 
 # Loading States
 LOADING_STATES = {
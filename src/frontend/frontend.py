@@ -235,6 +235,89 @@ def render_hotel_search_tab():
         display_parsed_hotel_details(parsed_data)
         progress_container = st.container()
         search_hotel_options(parsed_data, requirements, progress_container)
+def search_trip_options(requirements, progress_container):
+    """Search flight and hotel together, showing each summary as soon as its search is done."""
+    with progress_container.status("✨ Finding the best options for you...", state="running", expanded=True):
+        try:
+            st.write("🧳 Searching flights and hotels at the same time..")
+            try:
+                trip_response = api_client.search_trip(requirements)
+            except Exception as e:
+                st.error(f"An error occurred while searching for your trip: {str(e)}")
+                return False
+
+            shown = set()
+            def show_parts(record):
+                parts = record.get("data") or {}
+                details = parts.get("details") or {}
+                if details and "details" not in shown:
+                    shown.add("details")
+                    st.json(details)
+                for name in ("flight", "hotel"):
+                    part = parts.get(name)
+                    if not part or name in shown:
+                        continue
+                    shown.add(name)
+                    if part.get("status") != "completed":
+                        st.warning(f"{name.capitalize()} search failed: {part.get('error')}")
+                    elif name == "flight":
+                        st.markdown(travel_summary.get_flight_summary(
+                            part["data"],
+                            requirements,
+                            origin=details.get("origin"),
+                            destination=details.get("destination"),
+                            start_date=details.get("start_date"),
+                            end_date=details.get("end_date"),
+                        ))
+                    else:
+                        st.markdown(travel_summary.get_hotel_summary(
+                            part["data"],
+                            requirements,
+                            location=details.get("hotel_location") or details.get("destination"),
+                            check_in=details.get("start_date"),
+                            check_out=details.get("end_date"),
+                        ))
+
+            trip_task_id = trip_response.json().get("task_id")
+            trip_results = api_client.poll_task_status(trip_task_id, "trip", st, on_update=show_parts)
+            if not trip_results:
+                st.error(SEARCH_INCOMPLETE)
+                return False
+            show_parts({"data": trip_results})
+
+            st.success(SEARCH_COMPLETED)
+            details = trip_results.get("details") or {}
+            st.session_state.travel_context.update({
+                "origin": details.get("origin"),
+                "destination": details.get("destination"),
+                "start_date": details.get("start_date"),
+                "end_date": details.get("end_date"),
+                "flights": (trip_results.get("flight") or {}).get("data"),
+                "hotels": (trip_results.get("hotel") or {}).get("data"),
+            })
+            st.session_state.switch_to_result = True
+            return True
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
+            return False
+
+def render_trip_search_tab():
+    st.header("Tell us about your trip")
+
+    requirements = st.text_area(
+        "Describe your flight and stay in natural language",
+        height=200,
+        help=TRAVEL_DESCRIPTION_HELP,
+        placeholder=TRIP_DESCRIPTION_PLACEHOLDER,
+        key="trip_requirements"
+    )
+    if st.button("Search", key="trip_search_button"):
+        if not requirements:
+            st.warning(MISSING_DESCRIPTION_ERROR)
+            st.stop()
+
+        progress_container = st.container()
+        search_trip_options(requirements, progress_container)
 def clean_response(text):
     text = re.sub(r'\s*•\s*', '\n- ', text)  
     text = re.sub(r'\.\s*', '.\n', text)     
@@ -414,11 +497,13 @@ def main():
     initialize_session_state()
     
     st.title("AI Travel Assistant 🧳")
-    flight_tab, hotel_tab, research_tab, ytb_rv_tab = st.tabs(["Flight", "Hotel", "Research Assistant", "Youtube Review"])
+    flight_tab, hotel_tab, trip_tab, research_tab, ytb_rv_tab = st.tabs(["Flight", "Hotel", "Trip", "Research Assistant", "Youtube Review"])
     with flight_tab:
         render_flight_search_tab()
     with hotel_tab:
         render_hotel_search_tab()
+    with trip_tab:
+        render_trip_search_tab()
     with research_tab:
         render_research_tab()
     with ytb_rv_tab: